@@ -3,7 +3,7 @@ from datetime import datetime
 from airflow import DAG
 from airflow.operators.python import PythonOperator
 
-from FundExtractor import run_daily, run_kuvera
+from FundExtractor import run_daily, run_kuvera, run_forecast
 from AzureDataExtractor import hit_data_factory_api
 
 with DAG(
@@ -22,19 +22,11 @@ with DAG(
         }
     )
 
-    run_pipeline_1 = PythonOperator(
-        task_id='kuvera_1',
+    run_kuvera_pipeline = PythonOperator(
+        task_id='kuvera',
         python_callable=run_kuvera,
         op_kwargs={
-            'operation': 'isinDivReinvestment'
-        }
-    )
-
-    run_pipeline_2 = PythonOperator(
-        task_id='kuvera_2',
-        python_callable=run_kuvera,
-        op_kwargs={
-            'operation': 'isinGrowth'
+            'operation': 'all'
         }
     )
 
@@ -47,4 +39,13 @@ with DAG(
         }
     )
 
-    run_pipeline >> [run_pipeline_1, run_pipeline_2] >> data_factory_pipeline
+    run_forecast_pipeline = PythonOperator(
+        task_id='forecast',
+        python_callable=run_forecast,
+        op_kwargs={
+            'config_path': 'run_time_config.json'
+        }
+    )
+
+    # forecasts read the NAVs the data factory loaded, not the raw extracts
+    run_pipeline >> run_kuvera_pipeline >> data_factory_pipeline >> run_forecast_pipeline
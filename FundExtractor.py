@@ -4,44 +4,50 @@ from dotenv import load_dotenv
 
 from extractions import MFDaily, MFHistoricalActuals, check_results, KuveraPortfolioInformation
 from extractions.metadata import MFMetaData
+from extractions.watermarks import ACTIVE
 
-from models.base import Base
-from sqlalchemy import create_engine
+from models.base import Base, MutualFundNAV
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import sessionmaker
 from database.router import get_engine
+from database.bulk_load import BulkLoader, LOAD_MODES, dedupe_nav, iter_parquet_batches
+from forecasting.batch_forecast import ALGORITHMS, FORECAST_HORIZON, FORECAST_PATH, BatchForecaster, write_forecasts
 
 from logger import get_logger
 
 load_dotenv()
 log = get_logger(__file__)
 
-def run_daily(config_path: str, search_new: bool):
+INGESTION_MODES = ('process', 'async')
+
+def run_daily(config_path: str, search_new: bool, mode: str = 'process', stream: bool = False):
     """
         Run daily extraction.
     """
     data = MFDaily(config_path)
-    result = data.extract_daily(search_for_new_schemes=search_new)
+    result = data.extract_daily(search_for_new_schemes=search_new, mode=mode, stream=stream)
     if result is None:
         log.alert('No Data Found For Above Selection')
     else:
         log.success('Data Extraction Sucessfull')
 
 
-def run_historical():
+def run_historical(consolidated: bool = False):
     """
         Run historical actuals extraction and check results.
     """
     data = MFHistoricalActuals()
-    result = data.Extract_All_Data()
+    result = data.Extract_All_Data(consolidated=consolidated)
     check_results(result)
 
 
-def run_metadata(config_path: str):
+def run_metadata(config_path: str, mode: str = 'process'):
     """
         Prepare runtime config for metadata.
     """
     client = MFMetaData()
-    client.prepare_run_time_config(config_path)
+    client.prepare_run_time_config(config_path, mode=mode)
 
 
 def run_create_db():
@@ -52,16 +58,86 @@ def run_create_db():
     Session = sessionmaker(bind=engine) # test if session can be made
     log.separator()
     log.start('Creating Database')
+    existing = set(inspect(engine).get_table_names())
     Base.metadata.create_all(engine)
+    for table in Base.metadata.sorted_tables: # create_all skips the indexes of tables that already exist
+        if table.name not in existing:
+            continue
+        present = {index['name'] for index in inspect(engine).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in present:
+                continue
+            if table.name == MutualFundNAV.__tablename__ and index.unique:
+                dedupe_nav(engine) # earlier append loads may have repeated (scheme_code, date)
+            try:
+                index.create(engine)
+            except IntegrityError as e:
+                raise RuntimeError(
+                    f'Cannot create unique index {index.name} on {table.name}: duplicate keys remain. '
+                    'Remove them (e.g. database.bulk_load.dedupe_nav) and re-run create-db.'
+                ) from e
     log.separator()
 
 
-def run_kuvera(operation: str):
+def run_kuvera(operation: str, mode: str = 'process'):
     """
         Run Kuvera portfolio information extraction.
     """
     x = KuveraPortfolioInformation()
-    x.start_extract_kuvera(operation)
+    x.start_extract_kuvera(operation, mode=mode)
+
+
+def run_compact(root: str, ingest: list = None):
+    """
+        Merge the small files of the partitioned NAV dataset, optionally ingesting loose parquet files first.
+    """
+    import glob
+    from utilities.nav_dataset import NavDataset
+
+    if not root:
+        raise ValueError('Set --root or NAV_DATASET_DIR to locate the NAV dataset')
+
+    dataset = NavDataset(root)
+    for pattern in ingest or []:
+        log.info(f'Ingested {dataset.add_files(sorted(glob.glob(pattern, recursive=True)))} files from {pattern}')
+    log.separator()
+    log.start('Compacting NAV dataset')
+    dataset.compact()
+    log.separator()
+
+
+def run_load(patterns: list, batch_rows: int, mode: str = 'append'):
+    """
+        Bulk load parquet NAV extracts into the configured database, 'merge' upserts on (scheme_code, date).
+    """
+    import glob
+
+    paths = sorted({path for pattern in patterns for path in glob.glob(pattern, recursive=True)})
+    if not paths:
+        log.alert('No Extracts Found For Above Selection')
+        return
+
+    engine = get_engine(db_type=os.environ.get('DATABASE_TYPE'))
+    log.separator()
+    log.start(f'Bulk loading {len(paths)} extracts')
+    BulkLoader(engine).load(iter_parquet_batches(paths, batch_rows), mode=mode)
+    log.separator()
+
+
+def run_forecast(config_path: str, algorithms: list = None, horizon: int = None, output: str = None):
+    """
+        Forecast every active scheme in the run-time config with every algorithm and write the results.
+    """
+    scheme_codes = MFDaily(config_path).watermarks.codes(ACTIVE)
+    log.separator()
+    log.start(f'Forecasting {len(scheme_codes)} schemes')
+    table, errors = BatchForecaster(
+        horizon=horizon or FORECAST_HORIZON,
+        algorithms=algorithms or ALGORITHMS
+    ).run(scheme_codes)
+    check_results(errors)
+    log.success(f'Forecasts written to {write_forecasts(table, output or FORECAST_PATH)}')
+    log.separator()
 
 
 def main():
@@ -82,8 +158,24 @@ def main():
         dest='search_for_new_schemes',
         help='Search for new schemes in daily extraction'
     )
+    daily_parser.add_argument(
+        '--mode',
+        choices=INGESTION_MODES,
+        default='process',
+        help='Fetch with a process pool or the asyncio engine'
+    )
+    daily_parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Stream full histories and stop reading at each scheme watermark'
+    )
 
     hist_parser = subparsers.add_parser('historical', help='Extract historical actuals')
+    hist_parser.add_argument(
+        '--consolidated',
+        action='store_true',
+        help='Write a few bucketed parquet files and one metadata table instead of files per scheme'
+    )
 
     meta_parser = subparsers.add_parser('metadata', help='Prepare runtime config for metadata')
     meta_parser.add_argument(
@@ -91,27 +183,101 @@ def main():
         default='data.json',
         help='Path to the metadata config JSON file'
     )
+    meta_parser.add_argument(
+        '--mode',
+        choices=INGESTION_MODES,
+        default='process',
+        help='Fetch with a process pool or the asyncio engine'
+    )
 
     db_parser = subparsers.add_parser('create-db', help='Create database tables')
 
     kuvera_parser = subparsers.add_parser('kuvera', help='Extract Kuvera portfolio information')
     kuvera_parser.add_argument(
         'operation',
-        help='Mode of operation for Kuvera extraction (e.g., isinDivReinvestment)'
+        help='ISIN type(s) for Kuvera extraction: isinDivReinvestment, isinGrowth, a comma separated list or all'
+    )
+    kuvera_parser.add_argument(
+        '--mode',
+        choices=INGESTION_MODES,
+        default='process',
+        help='Fetch with a process pool or the asyncio engine'
+    )
+
+    compact_parser = subparsers.add_parser('compact', help='Compact the partitioned NAV dataset')
+    compact_parser.add_argument(
+        '--root',
+        default=os.environ.get('NAV_DATASET_DIR'),
+        help='Dataset root directory (defaults to NAV_DATASET_DIR)'
+    )
+    compact_parser.add_argument(
+        '--ingest',
+        action='append',
+        metavar='GLOB',
+        help='Parquet files to add before compacting, e.g. "daily_extracts/**/*.parquet" (repeatable)'
+    )
+
+    load_parser = subparsers.add_parser('load', help='Bulk load parquet NAV extracts into the database')
+    load_parser.add_argument(
+        'extracts',
+        nargs='+',
+        metavar='GLOB',
+        help='Parquet extracts to load, e.g. "daily_extracts/**/*.parquet"'
+    )
+    load_parser.add_argument(
+        '--batch-rows',
+        type=int,
+        default=100_000,
+        help='Rows per Arrow batch streamed into the database'
+    )
+    load_parser.add_argument(
+        '--mode',
+        choices=LOAD_MODES,
+        default='append',
+        help="Plain inserts (default) or 'merge' : a staging-table upsert on (scheme_code, date) that makes reruns no-ops"
+    )
+
+    forecast_parser = subparsers.add_parser('forecast', help='Precompute forecasts for every active scheme')
+    forecast_parser.add_argument(
+        '--config', '-c',
+        default='run_time_config.json',
+        help='Path to the runtime config JSON file'
+    )
+    forecast_parser.add_argument(
+        '--algorithm',
+        action='append',
+        dest='algorithms',
+        choices=ALGORITHMS,
+        help='Algorithm to run (repeatable, defaults to all)'
+    )
+    forecast_parser.add_argument(
+        '--horizon',
+        type=int,
+        help='Days to forecast (defaults to FORECAST_HORIZON)'
+    )
+    forecast_parser.add_argument(
+        '--output',
+        help='Storage path of the parquet file to write (defaults to FORECAST_PATH)'
     )
 
     args = parser.parse_args()
 
     if args.command == 'daily':
-        run_daily(args.config, args.search_for_new_schemes)
+        run_daily(args.config, args.search_for_new_schemes, args.mode, args.stream)
     elif args.command == 'historical':
-        run_historical()
+        run_historical(args.consolidated)
     elif args.command == 'metadata':
-        run_metadata(args.config)
+        run_metadata(args.config, args.mode)
     elif args.command == 'create-db':
         run_create_db()
     elif args.command == 'kuvera':
-        run_kuvera(args.operation)
+        run_kuvera(args.operation, args.mode)
+    elif args.command == 'compact':
+        run_compact(args.root, args.ingest)
+    elif args.command == 'load':
+        run_load(args.extracts, args.batch_rows, args.mode)
+    elif args.command == 'forecast':
+        run_forecast(args.config, args.algorithms, args.horizon, args.output)
     else:
         parser.print_help()
 
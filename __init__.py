@@ -1,5 +1,6 @@
-from .api import RequestMixin, MPTask, KuveraTask
+from .api import RequestMixin, MPTask, KuveraTask, HistoryTask, DailyBatchTask, HistoricalBatchTask
 from .dates import DateTimeMixin
+from .async_engine import AsyncIngestionEngine
 
 r'''
  __  __     ______   __     __         __     ______   __     ______     ______    
@@ -14,5 +15,9 @@ __all__ = [
     'RequestMixin',
     'DateTimeMixin',
     'MPTask',
-    'KuveraTask'
+    'KuveraTask',
+    'HistoryTask',
+    'DailyBatchTask',
+    'HistoricalBatchTask',
+    'AsyncIngestionEngine'
 ]
\ No newline at end of file
@@ -23,20 +23,24 @@
                                                                            
 
 import os
-import time
 import requests
 from abc import ABC
 
-from typing import NamedTuple
+from typing import Dict, Iterable, NamedTuple, Tuple
 
 from datetime import datetime
-from decimal import Decimal
 
 from models.base import MutualFundNAV, MutualFundScheme, KuveraPotfolioInformation
 from models.pandas_schema import METADATA_SCHEMA, NAV_SCHEMA
 from database.router import get_engine, get_session
 
 from.kuvera_uti import create_from_json
+from .rate_limit import get_rate_limiter
+from .http_session import get_http_session
+from .http_cache import get_response_cache
+from .streaming import HistoryStreamParser, STREAM_CHUNK
+from .dates import DateTimeMixin
+from .storage import get_storage
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -59,19 +63,120 @@ class KuveraTask(NamedTuple):
         Encapsulates all arguments needed by the worker / individual API calls.
 
         - base_url: the root endpoint string (e.g. "https://mf.captnemo.in/kuvera")
-        - scheme_code: a string identifier for the fund/scheme
-        - isn: The isin to hit Kuvera
+        - isin: The isin to hit Kuvera, results are keyed by it (one ISIN can serve several schemes)
+        - type_code: the ISIN type it was requested for (isinGrowth / isinDivReinvestment)
 
     """
     base_url: str
-    scheme_code : str
-    isn: str
+    isin: str
     type_code : str
 
+class HistoryTask(NamedTuple):
+    """
+        Encapsulates all arguments needed to stream a full history down to a watermark.
+
+        - base_url: the root endpoint string (e.g. "https://api.mfapi.in/mf")
+        - scheme_code: a string identifier for the fund/scheme
+        - cutoff: 'DD-MM-YYYY' watermark, only entries after it are kept
+
+    """
+    base_url: str
+    scheme_code: str
+    cutoff: str
+
+class DailyBatchTask(NamedTuple):
+    """
+        A slice of the daily run handled end to end (fetch -> filter -> normalize -> write) by one worker.
+
+        - base_url: the root endpoint string (e.g. "https://api.mfapi.in/mf")
+        - batch_id: names the batch in the results
+        - schemes: (scheme_code, cutoff 'DD-MM-YYYY', latest) per scheme
+        - stream: parse full histories incrementally down to the cutoff
+        - insert_date: run-level load timestamp shared by every batch of the run
+
+    """
+    base_url: str
+    batch_id: str
+    schemes: Tuple[Tuple[str, str, bool], ...]
+    stream: bool = False
+    insert_date: datetime = None
+
+class HistoricalBatchTask(NamedTuple):
+    """
+        Every scheme of one output bucket, loaded by a single worker into one consolidated file.
+
+        - base_url: the root endpoint string (e.g. "https://api.mfapi.in/mf")
+        - run_id: identifies the historical run, shared by all buckets
+        - bucket: partition number, `scheme_code % buckets`
+        - scheme_codes: the schemes of this bucket
+        - root: local directory the historicaldata/ tree is written under
+        - insert_date: run-level load timestamp shared by every bucket of the run
+
+    """
+    base_url: str
+    run_id: str
+    bucket: int
+    scheme_codes: Tuple[str, ...]
+    root: str = '.'
+    insert_date: datetime = None
+
 # Global To Keep Consider in worker Processes
-_engine = None
 _Session = None
 
+def rate_limited_get(url: str, timeout: int = 10, retries: int = 3, headers: dict = None, stream: bool = False):
+    '''
+        GET through the shared per-host rate limiter on the pooled keep-alive session of this process.
+        Throttled answers (429 / 5xx) slow the host down and are retried after `Retry-After`.
+    '''
+    limiter = get_rate_limiter(url)
+    session = get_http_session()
+    for attempt in range(retries + 1):
+        limiter.acquire()
+        response = session.get(url, timeout=timeout, headers=headers, stream=stream)
+        throttled = limiter.feedback(response.status_code, response.headers.get('Retry-After'))
+        if not throttled or attempt == retries:
+            return response
+        response.close()
+
+def _cached_response(url: str, body: bytes) -> requests.Response:
+    '''
+        Wrap a cached body into a `requests.Response` so callers cannot tell it from a live one.
+    '''
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response._content = body
+    response.headers['Content-Type'] = 'application/json'
+    return response
+
+def cached_get(url: str, timeout: int = 10):
+    '''
+        `rate_limited_get` behind the on-disk response cache (enabled by HTTP_CACHE_DIR).
+        Fresh entries are served locally, stale ones are revalidated with a conditional GET.
+    '''
+    cache = get_response_cache()
+    if cache is None:
+        return rate_limited_get(url, timeout=timeout)
+
+    entry = cache.lookup(url)
+    if entry and cache.is_fresh(entry):
+        return _cached_response(url, cache.load(entry))
+
+    response = rate_limited_get(url, timeout=timeout, headers=cache.conditional_headers(entry))
+    if response.status_code == 304 and entry:
+        return _cached_response(url, cache.revalidated(entry))
+    if response.status_code == 200:
+        cache.store(url, response.content, response.headers)
+    return response
+
+def is_inactive(last_nav_date: str, today: datetime = None) -> bool:
+    '''
+        True when a scheme's latest NAV ('DD-MM-YYYY') is older than last calendar year,
+        historical loads record such schemes as 'no need' instead of writing their history.
+    '''
+    today = today or datetime.today()
+    return datetime.strptime(last_nav_date, '%d-%m-%Y').year < today.year - 1
+
 class RequestMixin(ABC):
 
     '''
@@ -105,7 +210,7 @@ class RequestMixin(ABC):
             url = self.BASE_URL
 
         try:
-            response = requests.get(url, timeout=10)
+            response = cached_get(url, timeout=10)
             response.raise_for_status()
 
         except requests.exceptions.RequestException as e:
@@ -135,7 +240,7 @@ class RequestMixin(ABC):
             url = self.BASE_URL
 
         try:
-            response = requests.get(url, timeout=10)
+            response = cached_get(url, timeout=10)
             response.raise_for_status()
 
         except requests.exceptions.RequestException as e:
@@ -150,12 +255,11 @@ class RequestMixin(ABC):
     @staticmethod
     def init_db():
         """
-            Lazily initialize the Engine and Sessionmaker in each worker process.
+            Sessionmaker of this process from the engine registry, which re-creates pools after a fork.
         """
-        global _engine, _Session
-        if _Session is None:
-            # _engine = get_engine()
-            _Session = get_session(db_type=os.environ.get('DATABASE_TYPE'))
+        global _Session
+        _Session = get_session(db_type=os.environ.get('DATABASE_TYPE'))
+        return _Session
 
     @staticmethod
     def _mp_worker(task : MPTask):
@@ -168,8 +272,12 @@ class RequestMixin(ABC):
                  
             task = MPTask(base_url: str, scheme_code: str, latest_flag: bool)
             Lives at module scope so that ProcessPoolExecutor can pickle it.
+            A HistoryTask is handed over to `_mp_worker_since`.
 
         """
+        if isinstance(task, HistoryTask):
+            return RequestMixin._mp_worker_since(task)
+
         base_url, scheme_code, latest = task
 
         if scheme_code:
@@ -181,8 +289,7 @@ class RequestMixin(ABC):
             url = base_url
 
         try:
-            response = requests.get(url, timeout=10)
-            time.sleep(0.2)
+            response = cached_get(url, timeout=10)
             response.raise_for_status()
         except Exception as e:
             return scheme_code, e
@@ -192,6 +299,151 @@ class RequestMixin(ABC):
         except ValueError:
             return scheme_code, RuntimeError(f"Invalid JSON received from {url}")
 
+    @staticmethod
+    def _mp_worker_since(task : HistoryTask):
+
+        """
+           __
+          /__)  _  _     _   _ _/   _
+         / (   (- (/ (/ (- _)  /  _)
+                  /   
+                 
+            task = HistoryTask(base_url: str, scheme_code: str, cutoff: str)
+            Streams the full history and stops reading at the first entry on or before the cutoff,
+            so memory and parse time follow the number of new days, not the fund's lifetime.
+
+        """
+        base_url, scheme_code, cutoff = task
+        url = f"{base_url}/{scheme_code}"
+        parser = HistoryStreamParser(DateTimeMixin.serialize(cutoff))
+
+        try:
+            cache = get_response_cache()
+            entry = cache.lookup(url) if cache else None
+            if entry and cache.is_fresh(entry):
+                parser.feed(cache.load(entry))
+            else:
+                response = rate_limited_get(url, timeout=10, stream=True)
+                try:
+                    response.raise_for_status()
+                    for chunk in response.iter_content(chunk_size=STREAM_CHUNK):
+                        if parser.feed(chunk):
+                            break
+                finally:
+                    response.close()
+            return scheme_code, parser.close()
+        except ValueError:
+            return scheme_code, RuntimeError(f"Invalid JSON received from {url}")
+        except Exception as e:
+            return scheme_code, e
+
+    @staticmethod
+    def _daily_output_path() -> str:
+        '''
+            Blob path of one daily extract file.
+        '''
+        import uuid
+
+        today = datetime.today()
+        return f"daily_extracts/{today.year}/{today.month:02}/{today.day:02}/mf_daily_navs_{uuid.uuid4().__str__()}_{today.year}_{today.month:02}_{today.day:02}.parquet"
+
+    @staticmethod
+    def write_daily_batch(fetched: Iterable[Tuple[str, object, str]], insert_date: datetime = None) -> Dict:
+        '''
+            Filter and normalize each (scheme_code, payload, cutoff) as it arrives, so a payload is
+            dropped as soon as its new rows are extracted, then write the batch as one sorted parquet file.
+
+            The file is staged in a temp file and uploaded through the configured storage backend.
+            With NAV_DATASET_DIR set the rows are also appended to the partitioned NAV dataset.
+            Every row gets the same `insert_date`, the run's timestamp when the caller passes one.
+            Returns the manifest :
+
+                {'path', 'rows', 'max_date', 'watermarks' : {code: 'DD-MM-YYYY'}, 'errors' : {code: exc}, 'empty' : [code],
+                 'malformed' : {code: rows skipped for a date that is not 'DD-MM-YYYY'}}
+        '''
+        import tempfile
+        import numpy as np
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        from .normalize import normalize_nav_payloads
+        from .nav_dataset import get_nav_dataset
+        from .parquet_profile import write_nav
+
+        dataset = get_nav_dataset()
+        insert_date = insert_date or datetime.now()
+        tables = []
+        path = RequestMixin._daily_output_path()
+        fd, local_path = tempfile.mkstemp(suffix='.parquet')
+        os.close(fd)
+
+        manifest = {'path': None, 'rows': 0, 'max_date': None, 'watermarks': {}, 'errors': {}, 'empty': [], 'malformed': {}}
+        try:
+            for scheme_code, payload, cutoff in fetched:
+                if isinstance(payload, Exception):
+                    manifest['errors'][scheme_code] = payload
+                    continue
+
+                entries = payload.get('data') or []
+                dates = DateTimeMixin.parse_dates([entry['date'] for entry in entries], errors='coerce')
+                if malformed := int(np.isnat(dates).sum()): # one bad row must not fail the whole batch
+                    manifest['malformed'][scheme_code] = malformed
+                newer = dates > np.datetime64(DateTimeMixin.serialize(cutoff), 'D') # NaT never passes the cutoff
+                entries = [entry for entry, keep in zip(entries, newer) if keep]
+                if not entries:
+                    manifest['empty'].append(scheme_code)
+                    continue
+
+                table = normalize_nav_payloads([{'meta': payload.get('meta'), 'data': entries}], insert_date).select(NAV_SCHEMA)
+                tables.append(table) # only the rows past the watermark are kept
+
+                manifest['rows'] += table.num_rows
+                manifest['watermarks'][str(scheme_code)] = entries[0].get('date')
+                if newest := pc.max(table['date']).as_py():
+                    manifest['max_date'] = max(manifest['max_date'] or newest, newest)
+
+            if not tables:
+                return manifest
+
+            table = pa.concat_tables(tables)
+            write_nav(table, local_path) # one sorted file per batch
+            if dataset is not None:
+                dataset.write(table)
+
+            manifest['path'] = get_storage().upload_file(local_path, path)
+        finally:
+            os.remove(local_path)
+
+        if manifest['max_date']:
+            manifest['max_date'] = manifest['max_date'].isoformat()
+        return manifest
+
+    @staticmethod
+    def _mp_worker_daily(task : DailyBatchTask):
+
+        """
+           __
+          /__)  _  _     _   _ _/   _
+         / (   (- (/ (/ (- _)  /  _)
+                  /   
+                 
+            task = DailyBatchTask(base_url: str, batch_id: str, schemes: tuple, stream: bool)
+            Fetches, filters, normalizes and writes a whole batch inside the worker,
+            only the manifest travels back to the parent process.
+
+        """
+        def fetched():
+            for scheme_code, cutoff, latest in task.schemes:
+                if task.stream and not latest:
+                    sub_task = HistoryTask(task.base_url, scheme_code, cutoff)
+                else:
+                    sub_task = MPTask(task.base_url, scheme_code, latest)
+                yield scheme_code, RequestMixin._mp_worker(sub_task)[1], cutoff
+
+        try:
+            return task.batch_id, RequestMixin.write_daily_batch(fetched(), task.insert_date)
+        except Exception as e:
+            return task.batch_id, e
+
     @staticmethod
     def _mp_worker_kuvera(task : KuveraTask):
 
@@ -201,30 +453,28 @@ class RequestMixin(ABC):
          / (   (- (/ (/ (- _)  /  _)
                   /   
                  
-            task = MPTask(base_url: str, scheme_code: str, latest_flag: bool)
+            task = KuveraTask(base_url: str, isin: str, type_code: str)
             Lives at module scope so that ProcessPoolExecutor can pickle it.
 
         """
-        base_url, scheme_code, isin, type_code = task
+        base_url, isin, type_code = task
 
         url = f"{base_url}/{isin}"
 
-        response = requests.get(url, timeout=10)
-        time.sleep(0.2)
+        response = cached_get(url, timeout=10)
 
         if response.status_code == 200:
             data =  response.json()[-1]
         else:
-            return scheme_code, response.status_code
+            return isin, response.status_code
 
         try:
-            data['scheme_code'] = scheme_code
             data['isin'] = isin
             # data['isn_code'] = isin
             data['type_code'] = type_code
-            return scheme_code, data
+            return isin, data
         except ValueError:
-            return scheme_code, RuntimeError(f"Invalid JSON received from {url}")
+            return isin, RuntimeError(f"Invalid JSON received from {url}")
                 
     @staticmethod   
     def _mp_worker_db(task: MPTask):
@@ -240,8 +490,8 @@ class RequestMixin(ABC):
 
         """
         # RequestMixin.init_db()
-        import pandas as pd
-        from azure.storage.blob import BlobServiceClient
+        from .normalize import normalize_nav_payloads
+        from .parquet_profile import metadata_table, write_nav, write_parquet
         import uuid
 
         base_url, scheme_code, latest = task
@@ -252,8 +502,7 @@ class RequestMixin(ABC):
             url = base_url
 
         try:
-            resp = requests.get(url, timeout=10)
-            time.sleep(0.2)
+            resp = cached_get(url, timeout=10)
             resp.raise_for_status()
         except Exception as e:
             return scheme_code, e
@@ -262,12 +511,6 @@ class RequestMixin(ABC):
             payload = resp.json()
         except ValueError:
             return scheme_code, RuntimeError(f"Invalid JSON received from {url}")
-        
-        # account_url = os.getenv('ACCOUNT_URL')
-        # sas_token = os.getenv('SAS_TOKEN')
-        # container_name = os.getenv('CONTAINER_NAME')
-
-        # blob_service_client = BlobServiceClient(account_url, credential=sas_token)
 
         try:
             # with _Session() as session:
@@ -296,45 +539,27 @@ class RequestMixin(ABC):
                 'isin_growth' : fund_scheme_data.get("isin_growth"),
                 'isin_div_reinvestment' : fund_scheme_data.get("isin_div_reinvestment")
             }
-            metadata_dataframe = pd.DataFrame([metadata_mappings],columns=METADATA_SCHEMA)
+            metadata_dataframe = metadata_table([metadata_mappings])
 
             path = f"historicaldata/metadata/mf_historical_{fund_scheme_data.get('scheme_code')}_{unique_id}_metadata.parquet"
-            # blob_service_client.get_container_client(container_name).upload_blob(path, metadata_dataframe.to_parquet())
-            metadata_dataframe.to_parquet(path, index=False)
+            write_parquet(metadata_dataframe, path)
 
             scheme_code = fund_scheme_data.get("scheme_code")
             fund_nav_historical =  payload.get('data')
             first_date = fund_nav_historical[0].get('date')
-            mappings = []
-            date_obj =  datetime.strptime(first_date, '%d-%m-%Y')
             
-            if int(date_obj.year) not in (2025, 2024):
+            if is_inactive(first_date):
                 return scheme_code, {
                     'status' : payload.get("status"),
-                    'date' : 'no need'
+                    'date' : 'no need',
+                    'last_date' : first_date
                 }
 
             # Push Data of NAV to Database
-            for item in fund_nav_historical:
-                try:
-                    date_str = item.get('date')
-                    nav_str  = item.get('nav')
-                    nav_date = datetime.strptime(date_str, "%d-%m-%Y").date()
-                    nav_val  = Decimal(nav_str)
-                    mappings.append({
-                        'insert_date' : datetime.now(),
-                        'scheme_code': scheme_code,
-                        'date': nav_date,
-                        'nav': nav_val
-                    })
-                except Exception:
-                    continue
-
             try:
-                dataframe = pd.DataFrame(mappings,columns=NAV_SCHEMA)
+                table = normalize_nav_payloads([payload]).select(NAV_SCHEMA)
                 path = f'historicaldata/neededdata/mf_historical_{fund_scheme_data.get("scheme_code")}_{unique_id}_historical_data.parquet'
-                # blob_service_client.get_container_client(container_name).upload_blob(path, dataframe.to_parquet())
-                dataframe.to_parquet(path, index=False)
+                write_nav(table, path)
                 # with _Session() as session:
                 #     if mappings:
                 #         session.bulk_insert_mappings(MutualFundNAV, mappings)
@@ -353,6 +578,59 @@ class RequestMixin(ABC):
             'date' : first_date
         }
     
+    @staticmethod
+    def _mp_worker_historical(task: HistoricalBatchTask):
+        """
+           __
+          /__)  _  _     _   _ _/   _
+         / (   (- (/ (/ (- _)  /  _)
+                  /   
+                 
+            task = HistoricalBatchTask(base_url: str, run_id: str, bucket: int, scheme_codes: tuple, root: str)
+            Consolidated version of `_mp_worker_db` : NAV rows of the whole bucket are buffered
+            into large row groups of a single parquet file, metadata rows go back to the parent
+            which writes one metadata table for the run.
+
+        """
+        from .normalize import normalize_nav_payloads
+        from .historical_writer import BufferedParquetWriter, bucket_path
+
+        results, metadata = {}, []
+        insert_date = task.insert_date or datetime.now()
+        writer = BufferedParquetWriter(bucket_path(task.root, task.run_id, task.bucket))
+        try:
+            with writer: # closed on errors too, so the file handle never leaks
+                for code in task.scheme_codes:
+                    scheme_code, payload = RequestMixin._mp_worker(MPTask(task.base_url, code, False))
+                    if isinstance(payload, Exception):
+                        results[scheme_code] = payload
+                        continue
+
+                    try:
+                        fund_scheme_data = payload.get('meta')
+                        metadata.append({column: fund_scheme_data.get(column) for column in METADATA_SCHEMA})
+
+                        first_date = payload.get('data')[0].get('date')
+                        if is_inactive(first_date): # no NAV this year or last
+                            results[scheme_code] = {'status': payload.get('status'), 'date': 'no need', 'last_date': first_date}
+                            continue
+
+                        writer.write(normalize_nav_payloads([payload], insert_date).select(NAV_SCHEMA))
+                        results[scheme_code] = {'status': payload.get('status'), 'date': first_date}
+                    except Exception as db_err:
+                        results[scheme_code] = db_err
+            path = writer.path if writer.row_groups else None
+        except Exception as e:
+            return task.bucket, e
+
+        return task.bucket, {
+            'path': path,
+            'rows': writer.rows,
+            'row_groups': writer.row_groups,
+            'metadata': metadata,
+            'results': results,
+        }
+
     @staticmethod
     def _mp_worker_db_dump(payloads):
         """
@@ -366,12 +644,10 @@ class RequestMixin(ABC):
             Tosses requests to Database in ORM
         """
         # RequestMixin.init_db()
-        import pandas as pd
-        from azure.storage.blob import BlobServiceClient
-        import uuid
+        from .normalize import normalize_nav_payloads
+        from .parquet_profile import nav_parquet_bytes
 
         try:
-            mappings = []
             code_mappings = {}
             for payload in payloads:
                 fund_scheme_data = payload.get('meta')
@@ -379,32 +655,10 @@ class RequestMixin(ABC):
                 fund_nav_historical =  payload.get('data')
                 first_date = fund_nav_historical[0].get('date')
                 code_mappings[scheme_code] = first_date
-                for item in fund_nav_historical:
-                    try:
-                        date_str = item.get('date')
-                        nav_str  = item.get('nav')
-                        nav_date = datetime.strptime(date_str, "%d-%m-%Y").date()
-                        nav_val  = Decimal(nav_str)
-                        mappings.append({
-                            'insert_date' : datetime.now(),
-                            'scheme_code': scheme_code,
-                            'date': nav_date,
-                            'nav': nav_val
-                        })
-                    except Exception:
-                        continue
 
             try:
-                dataframe = pd.DataFrame(mappings,columns=['insert_date','scheme_code','date','nav'])
-
-                account_url = os.getenv('ACCOUNT_URL')
-                sas_token = os.getenv('SAS_TOKEN')
-                container_name = os.getenv('CONTAINER_NAME')
-                today = datetime.today()
-                path = f"daily_extracts/{today.year}/{today.month:02}/{today.day:02}/mf_daily_navs_{uuid.uuid4().__str__()}_{today.year}_{today.month:02}_{today.day:02}.parquet"
-
-                blob_service_client = BlobServiceClient(account_url, credential=sas_token)
-                blob_service_client.get_container_client(container_name).upload_blob(path, dataframe.to_parquet())
+                table = normalize_nav_payloads(payloads).select(NAV_SCHEMA)
+                get_storage().upload(RequestMixin._daily_output_path(), nav_parquet_bytes(table))
 
                 # with _Session() as session:
                 #     if mappings:
@@ -433,17 +687,11 @@ class RequestMixin(ABC):
         """
         # RequestMixin.init_db()
 
-        import pandas as pd
-        from azure.storage.blob import BlobServiceClient
+        from .parquet_profile import kuvera_table, parquet_bytes
         import uuid
 
-        account_url = os.getenv('ACCOUNT_URL')
-        sas_token = os.getenv('SAS_TOKEN')
-        container_name = os.getenv('CONTAINER_NAME')
         unique_id = uuid.uuid4().__str__()
 
-        blob_service_client = BlobServiceClient(account_url, credential=sas_token)
-
         try:
             mappings = []
             code_mappings = len(payloads)
@@ -455,12 +703,12 @@ class RequestMixin(ABC):
 
             try:
                 
-                dataframe = pd.DataFrame(mappings)
+                dataframe = kuvera_table(mappings)
 
                 today = datetime.today()
 
                 path = f"kuveraextracts/{today.year}/{today.month:02}/{today.day:02}/mf_kuvera_information_{unique_id}_{today.year}_{today.month:02}_{today.day:02}.parquet"
-                blob_service_client.get_container_client(container_name).upload_blob(path, dataframe.to_parquet())
+                get_storage().upload(path, parquet_bytes(dataframe))
 
                 # with _Session() as session:
                 #     if mappings:
@@ -0,0 +1,87 @@
+#           _
+#  __ _ _ _(_)_ __  __ _
+# / _` | '_| | '  \/ _` |
+# \__,_|_| |_|_|_|_\__,_|
+#
+# Fit-once ARIMA forecasting : the whole horizon with prediction intervals from one MLE fit.
+
+import os
+from typing import NamedTuple, Sequence
+
+import numpy as np
+
+ARIMA_ORDER = (2, 1, 2)
+ARIMA_HISTORY_WINDOW = int(os.environ.get('ARIMA_HISTORY_WINDOW', 100))  # most recent NAVs used for the fit
+
+
+class ForecastResult(NamedTuple):
+    mean: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+
+
+class ArimaForecaster:
+    '''
+        ARIMA(p, d, q) fitted once, then forecast for any horizon from the fitted state space.
+
+            forecaster = ArimaForecaster().fit(navs)
+            result = forecaster.forecast(30)        # mean, lower, upper for days 1..30
+
+        For rolling use new observations update the filtered state with the fitted parameters
+        instead of re-running the MLE :
+
+            forecaster.append(new_navs)   # extend the sample
+            forecaster.apply(new_navs)    # same parameters on a fresh sample (sliding window)
+    '''
+
+    def __init__(self, order: tuple = ARIMA_ORDER, alpha: float = 0.05, history_window: int = ARIMA_HISTORY_WINDOW):
+        self.order = tuple(order)
+        self.alpha = alpha
+        self.history_window = history_window
+        self._results = None
+
+    @property
+    def fitted(self) -> bool:
+        return self._results is not None
+
+    def _results_or_raise(self):
+        if self._results is None:
+            raise RuntimeError('ArimaForecaster is not fitted, call fit() first')
+        return self._results
+
+    def fit(self, history: Sequence[float]) -> 'ArimaForecaster':
+        '''
+            One MLE fit on the last `history_window` observations.
+        '''
+        from statsmodels.tsa.arima.model import ARIMA
+
+        endog = np.asarray(history, dtype='float64')[-self.history_window:]
+        self._results = ARIMA(endog, order=self.order).fit()
+        return self
+
+    def forecast(self, steps: int, alpha: float = None) -> ForecastResult:
+        '''
+            Mean path and (1 - alpha) prediction interval for the next `steps` observations.
+        '''
+        prediction = self._results_or_raise().get_forecast(steps=steps)
+        interval = np.asarray(prediction.conf_int(alpha=self.alpha if alpha is None else alpha))
+        return ForecastResult(
+            mean=np.asarray(prediction.predicted_mean),
+            lower=interval[:, 0],
+            upper=interval[:, 1],
+        )
+
+    def append(self, observations: Sequence[float]) -> 'ArimaForecaster':
+        '''
+            Extend the sample with new observations, keeping the fitted parameters.
+        '''
+        self._results = self._results_or_raise().append(np.asarray(observations, dtype='float64'), refit=False)
+        return self
+
+    def apply(self, observations: Sequence[float]) -> 'ArimaForecaster':
+        '''
+            Run the fitted parameters over a new sample, e.g. the latest window of NAVs.
+        '''
+        endog = np.asarray(observations, dtype='float64')[-self.history_window:]
+        self._results = self._results_or_raise().apply(endog, refit=False)
+        return self
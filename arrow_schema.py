@@ -0,0 +1,83 @@
+#                                   _
+#  __ _ _ _ _ _ _____ __ __  ___ __| |_  ___ _ __  __ _
+# / _` | '_| '_/ _ \ V  V / (_-</ _| ' \/ -_) '  \/ _` |
+# \__,_|_| |_| \___/\_/\_/  /__/\__|_||_\___|_|_|_\__,_|
+#
+# Explicit Arrow schemas for the parquet extracts, column order follows pandas_schema.py.
+
+import pyarrow as pa
+from sqlalchemy import Date, DateTime, Float, Integer, JSON, Numeric
+
+from .base import KuveraPotfolioInformation
+from .pandas_schema import FORECAST_SCHEMA, METADATA_SCHEMA, NAV_SCHEMA
+
+NAV_DECIMAL = pa.decimal128(38, 5)  # MutualFundNAV.nav Numeric(38, 5)
+
+NAV_TYPES = {
+    'decimal': NAV_DECIMAL,
+    'float64': pa.float64(),
+}
+
+
+def nav_arrow_schema(nav_type: str = 'decimal') -> pa.Schema:
+    '''
+        NAV_SCHEMA with the NAV column as exact decimal128(38, 5) or float64.
+    '''
+    types = {
+        'insert_date': pa.timestamp('us'),
+        'scheme_code': pa.int64(),
+        'date': pa.date32(),
+        'nav': NAV_TYPES[nav_type],
+    }
+    return pa.schema([pa.field(name, types[name], nullable=name == 'insert_date') for name in NAV_SCHEMA])
+
+
+METADATA_ARROW_SCHEMA = pa.schema(
+    [pa.field('scheme_code', pa.int64(), nullable=False)]
+    + [pa.field(name, pa.string()) for name in METADATA_SCHEMA if name != 'scheme_code']
+)
+
+
+def _arrow_type(column) -> pa.DataType:
+    '''
+        SQLAlchemy column type -> Arrow type. JSON is kept as its serialized text.
+    '''
+    kind = column.type
+    if isinstance(kind, DateTime):
+        return pa.timestamp('us')
+    if isinstance(kind, Date):
+        return pa.date32()
+    if isinstance(kind, Integer):
+        return pa.int64()
+    if isinstance(kind, (Float, Numeric)):
+        return pa.float64()
+    return pa.string()
+
+
+KUVERA_JSON_COLUMNS = tuple(
+    column.name for column in KuveraPotfolioInformation.__table__.columns if isinstance(column.type, JSON)
+)
+
+KUVERA_ARROW_SCHEMA = pa.schema([
+    pa.field(column.name, _arrow_type(column))
+    for column in KuveraPotfolioInformation.__table__.columns
+    if column.name != 'id'
+])
+
+
+FORECAST_TYPES = {
+    'run_date': pa.date32(),
+    'scheme_code': pa.int64(),
+    'algorithm': pa.string(),
+    'as_of': pa.date32(),      # newest NAV the forecast was computed from
+    'step': pa.int16(),
+    'date': pa.date32(),
+    'nav': pa.float64(),
+    'lower': pa.float64(),     # prediction interval, where the algorithm provides one
+    'upper': pa.float64(),
+}
+
+FORECAST_ARROW_SCHEMA = pa.schema([
+    pa.field(name, FORECAST_TYPES[name], nullable=name in ('lower', 'upper'))
+    for name in FORECAST_SCHEMA
+])
@@ -0,0 +1,201 @@
+#  __ _ ____  _ _ _  __
+# / _` (_-< || | ' \/ _|
+# \__,_/__/\_, |_||_\__|
+#          |__/
+#
+# Asyncio ingestion engine, a drop-in for the process pool fan-out.
+
+import os
+import json
+import asyncio
+from typing import Dict, Iterable, List, Tuple, Union
+
+from .api import MPTask, KuveraTask, HistoryTask
+from .dates import DateTimeMixin
+from .streaming import HistoryStreamParser, STREAM_CHUNK
+from .rate_limit import get_rate_limiter
+from .http_session import get_async_session, pool_size
+from .http_cache import get_response_cache
+
+from logger import get_logger
+
+log = get_logger('AsyncIngestion')
+
+Task = Union[MPTask, KuveraTask, HistoryTask]
+
+
+class AsyncIngestionEngine:
+    '''
+        Runs `MPTask` / `KuveraTask` / `HistoryTask` inputs on a single event loop with a bounded number of in-flight requests.
+
+        Mirrors the workers in `RequestMixin` so the result contract stays the same :
+            {scheme_code : payload | Exception}
+
+        Note : IO bound work does not need OS processes, one loop with `concurrency` sockets is enough.
+    '''
+
+    def __init__(self, concurrency: int = None, timeout: int = 10, retries: int = 3, pool: int = None):
+        self.concurrency = concurrency or int(os.environ.get('INGESTION_CONCURRENCY', 16))
+        self.timeout = timeout
+        self.retries = retries
+        self.pool = pool or pool_size()
+
+    @staticmethod
+    def _url_for(task: Task) -> str:
+        '''
+            Build the url exactly the way the process workers do.
+        '''
+        if isinstance(task, KuveraTask):
+            return f"{task.base_url}/{task.isin}"
+
+        if isinstance(task, HistoryTask):
+            return f"{task.base_url}/{task.scheme_code}"
+
+        if task.scheme_code:
+            if task.latest:
+                return f"{task.base_url}/{task.scheme_code}/latest"
+            return f"{task.base_url}/{task.scheme_code}"
+        return task.base_url
+
+    async def _get(self, session, url: str) -> Tuple[int, bytes]:
+        '''
+            GET through the response cache and the shared per-host rate limiter,
+            throttled answers are retried. Returns (status, body).
+            The cache's SQLite index and body files are read and written in worker threads.
+        '''
+        cache = get_response_cache()
+        entry = await asyncio.to_thread(cache.lookup, url) if cache else None
+        if entry and cache.is_fresh(entry):
+            return 200, await asyncio.to_thread(cache.load, entry)
+
+        limiter = get_rate_limiter(url)
+        headers = cache.conditional_headers(entry) if cache else None
+        for attempt in range(self.retries + 1):
+            await limiter.acquire_async()
+            async with session.get(url, headers=headers) as response:
+                status, body = response.status, await response.read()
+                throttled = await limiter.feedback_async(status, response.headers.get('Retry-After'))
+                if not throttled or attempt == self.retries:
+                    break
+
+        if status == 304 and entry:
+            return 200, await asyncio.to_thread(cache.revalidated, entry)
+        if status == 200 and cache:
+            await asyncio.to_thread(cache.store, url, body, response.headers)
+        return status, body
+
+    async def _fetch_mf(self, session, task: MPTask):
+        '''
+            Async twin of `RequestMixin._mp_worker`.
+        '''
+        url = self._url_for(task)
+        try:
+            status, body = await self._get(session, url)
+        except Exception as e:
+            return task.scheme_code, e
+
+        if status >= 400:
+            return task.scheme_code, RuntimeError(f"{status} Error for url: {url}")
+        try:
+            return task.scheme_code, json.loads(body)
+        except ValueError:
+            return task.scheme_code, RuntimeError(f"Invalid JSON received from {url}")
+
+    async def _fetch_kuvera(self, session, task: KuveraTask):
+        '''
+            Async twin of `RequestMixin._mp_worker_kuvera`.
+        '''
+        url = self._url_for(task)
+        try:
+            status, body = await self._get(session, url)
+            if status != 200:
+                return task.isin, status
+            data = json.loads(body)[-1]
+        except Exception as e:
+            return task.isin, e
+
+        data['isin'] = task.isin
+        data['type_code'] = task.type_code
+        return task.isin, data
+
+    async def _fetch_since(self, session, task: HistoryTask):
+        '''
+            Async twin of `RequestMixin._mp_worker_since`, stops reading the body at the cutoff.
+        '''
+        url = self._url_for(task)
+        parser = HistoryStreamParser(DateTimeMixin.serialize(task.cutoff))
+        try:
+            cache = get_response_cache()
+            entry = await asyncio.to_thread(cache.lookup, url) if cache else None
+            if entry and cache.is_fresh(entry):
+                parser.feed(await asyncio.to_thread(cache.load, entry))
+                return task.scheme_code, parser.close()
+
+            limiter = get_rate_limiter(url)
+            for attempt in range(self.retries + 1):
+                await limiter.acquire_async()
+                async with session.get(url) as response:
+                    throttled = await limiter.feedback_async(response.status, response.headers.get('Retry-After'))
+                    if throttled and attempt < self.retries:
+                        continue
+                    if response.status >= 400:
+                        return task.scheme_code, RuntimeError(f"{response.status} Error for url: {url}")
+                    async for chunk in response.content.iter_chunked(STREAM_CHUNK):
+                        if parser.feed(chunk):
+                            break
+                    break
+            return task.scheme_code, parser.close()
+        except ValueError:
+            return task.scheme_code, RuntimeError(f"Invalid JSON received from {url}")
+        except Exception as e:
+            return task.scheme_code, e
+
+    async def _bounded(self, semaphore, session, task: Task):
+        async with semaphore:
+            if isinstance(task, KuveraTask):
+                return await self._fetch_kuvera(session, task)
+            if isinstance(task, HistoryTask):
+                return await self._fetch_since(session, task)
+            return await self._fetch_mf(session, task)
+
+    async def run_async(self, tasks: Iterable[Task]) -> Dict[str, object]:
+        '''
+            Fetch every task with at most `concurrency` requests in flight.
+        '''
+        tasks: List[Task] = list(tasks)
+        results: Dict[str, object] = {}
+        total: int = len(tasks)
+        completed: int = 0
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        log.separator()
+        log.start(f'Start Processing of {total} with {self.concurrency} concurrent requests.\n')
+
+        async with get_async_session(timeout=self.timeout, limit=self.pool) as session:
+            pending = [
+                asyncio.ensure_future(self._bounded(semaphore, session, task))
+                for task in tasks
+            ]
+            for future in asyncio.as_completed(pending):
+                code, payload = await future
+                results[code] = payload
+                completed += 1
+
+                if os.environ.get('SHOW_PROGRESS'):
+                    log.progress(completed, total, "Processing", show_bar=True)
+                else:
+                    log.debug(f"\rCompleted {completed}/{total}")
+
+        if os.environ.get('SHOW_PROGRESS'):
+            log.progress_finish(f'Completed Processing of {total}')
+
+        log.separator()
+
+        return results
+
+    def run(self, tasks: Iterable[Task]) -> Dict[str, object]:
+        '''
+            Blocking entrypoint for synchronous callers (CLI / Airflow tasks).
+        '''
+        return asyncio.run(self.run_async(tasks))
@@ -18,6 +18,7 @@ from sqlalchemy import (
     Float,
     JSON,
     DateTime,
+    Index,
     Text
 )
 
@@ -61,6 +62,19 @@ class MutualFundNAV(Base):
         Numeric(38, 5), nullable=False, comment="Net Asset Value with highest precision"
     )
 
+    __table_args__ = (
+        # one NAV per scheme and day, and per-fund date range reads become index seeks.
+        # nav is carried in the index leaf (INCLUDE) where the dialect supports it.
+        Index(
+            "uq_mutual_fund_nav_scheme_code_date",
+            "scheme_code",
+            "date",
+            unique=True,
+            postgresql_include=["nav"],
+            mssql_include=["nav"],
+        ),
+    )
+
 
 class KuveraPotfolioInformation(Base):
     __tablename__ = "kuvera_potfolio_information"
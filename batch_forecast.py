@@ -0,0 +1,305 @@
+#  _          _      _       __                        _
+# | |__  __ _| |_ __| |_    / _|___ _ _ ___ __ __ _ __| |_
+# | '_ \/ _` |  _/ _| ' \  |  _/ _ \ '_/ -_) _/ _` (_-<  _|
+# |_.__/\__,_|\__\__|_||_| |_| \___/_| \___\__\__,_/__/\__|
+#
+# Nightly batch forecasts for every active scheme, written to one parquet file in storage the dashboard reads.
+
+import os
+from datetime import date, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from models.arrow_schema import FORECAST_ARROW_SCHEMA
+from utilities.parquet_profile import parquet_bytes
+from utilities.storage import StorageBackend, get_storage
+
+from logger import get_logger
+
+log = get_logger('BatchForecast')
+
+FORECAST_HORIZON = int(os.environ.get('FORECAST_HORIZON', 30))  # days, the dashboard slider maximum
+FORECAST_HISTORY_WINDOW = int(os.environ.get('FORECAST_HISTORY_WINDOW', 100))  # NAVs per fund, as on the dashboard
+FORECAST_MIN_HISTORY = int(os.environ.get('FORECAST_MIN_HISTORY', 0))  # NAVs the statistical models need, 0 : half the window
+FORECAST_LOOKBACK_DAYS = int(os.environ.get('FORECAST_LOOKBACK_DAYS', 200))  # calendar days read to cover the window
+FORECAST_CHUNK_SIZE = int(os.environ.get('FORECAST_CHUNK_SIZE', 50))  # schemes per worker task
+FORECAST_WORKERS = int(os.environ.get('FORECAST_WORKERS', os.cpu_count() or 1))
+FORECAST_LSTM_BATCH_SIZE = int(os.environ.get('FORECAST_LSTM_BATCH_SIZE', 256))
+FORECAST_PATH = os.environ.get('FORECAST_PATH', 'forecasts/nav_forecasts.parquet')  # storage path, see get_storage
+
+ALGORITHMS = ('linear_regression', 'arima', 'exponential_smoothing', 'lstm_shared')
+STATSMODELS_ALGORITHMS = ('arima', 'exponential_smoothing')
+FORECAST_SORT_KEYS = [('scheme_code', 'ascending'), ('algorithm', 'ascending'), ('step', 'ascending')]
+
+
+class ForecastTask(NamedTuple):
+    chunk_id: str
+    run_date: date
+    horizon: int
+    algorithms: Tuple[str, ...]
+    schemes: Tuple[Tuple[int, date, Tuple[float, ...]], ...]  # (scheme_code, as_of, navs oldest first)
+    min_history: int = 2  # shorter histories are reported as errors instead of being fitted
+
+
+def _linear_regression(navs: np.ndarray, steps: int):
+    '''
+        Least squares line through the window, extended `steps` days.
+    '''
+    slope, intercept = np.polyfit(np.arange(len(navs)), navs, 1)
+    return slope * np.arange(len(navs), len(navs) + steps) + intercept, None, None
+
+
+def _arima(navs: np.ndarray, steps: int):
+    from .arima import ArimaForecaster
+
+    result = ArimaForecaster(history_window=len(navs)).fit(navs).forecast(steps)
+    return result.mean, result.lower, result.upper
+
+
+def _exponential_smoothing(navs: np.ndarray, steps: int):
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+    fitted = ExponentialSmoothing(navs, trend='add', seasonal=None, initialization_method='estimated').fit()
+    return np.asarray(fitted.forecast(steps)), None, None
+
+
+FORECASTERS = {
+    'linear_regression': _linear_regression,
+    'arima': _arima,
+    'exponential_smoothing': _exponential_smoothing,
+}
+
+
+def forecast_table(
+    run_date: date,
+    algorithm: str,
+    scheme_codes: Sequence[int],
+    as_of: Sequence[date],
+    mean: np.ndarray,
+    lower: Optional[np.ndarray] = None,
+    upper: Optional[np.ndarray] = None
+) -> pa.Table:
+    '''
+        (schemes, steps) forecasts -> FORECAST_ARROW_SCHEMA rows, built column by column.
+    '''
+    mean = np.atleast_2d(np.asarray(mean, dtype='float64'))
+    schemes, steps = mean.shape
+    step = np.tile(np.arange(1, steps + 1, dtype='int16'), schemes)
+    as_of = np.repeat(np.asarray(as_of, dtype='datetime64[D]'), steps)
+
+    def bound(values):
+        if values is None:
+            return pa.nulls(schemes * steps, pa.float64())
+        return pa.array(np.atleast_2d(np.asarray(values, dtype='float64')).ravel())
+
+    return pa.table({
+        'run_date': pa.array(np.full(schemes * steps, np.datetime64(run_date, 'D'))),
+        'scheme_code': pa.array(np.repeat(np.asarray(scheme_codes, dtype='int64'), steps)),
+        'algorithm': pa.array([algorithm] * (schemes * steps)),
+        'as_of': pa.array(as_of),
+        'step': pa.array(step),
+        'date': pa.array(as_of + step.astype('timedelta64[D]')),
+        'nav': pa.array(mean.ravel()),
+        'lower': bound(lower),
+        'upper': bound(upper),
+    }).cast(FORECAST_ARROW_SCHEMA)
+
+
+def _forecast_chunk(task: ForecastTask):
+    '''
+        Lives at module scope so that ProcessPoolExecutor can pickle it.
+        Returns (chunk_id, {'table': forecasts, 'errors': {'scheme_code:algorithm': exception}}).
+    '''
+    if set(task.algorithms) & set(STATSMODELS_ALGORITHMS):
+        import warnings
+        from statsmodels.tools.sm_exceptions import ConvergenceWarning, EstimationWarning
+
+        # statsmodels fit chatter, once per fit : any other warning still surfaces
+        warnings.simplefilter('ignore', ConvergenceWarning)
+        warnings.simplefilter('ignore', EstimationWarning)
+
+    tables, errors = [], {}
+    for algorithm in task.algorithms:
+        for scheme_code, as_of, navs in task.schemes:
+            try:
+                if len(navs) < task.min_history:
+                    raise ValueError(f'{len(navs)} NAVs, {algorithm} needs at least {task.min_history}')
+                mean, lower, upper = FORECASTERS[algorithm](np.asarray(navs, dtype='float64'), task.horizon)
+                tables.append(forecast_table(task.run_date, algorithm, [scheme_code], [as_of], mean, lower, upper))
+            except Exception as e:
+                errors[f'{scheme_code}:{algorithm}'] = e
+    table = pa.concat_tables(tables) if tables else FORECAST_ARROW_SCHEMA.empty_table()
+    return task.chunk_id, {'table': table, 'errors': errors}
+
+
+def load_histories(
+    scheme_codes: Iterable[int],
+    history_window: int = FORECAST_HISTORY_WINDOW,
+    today: date = None
+) -> Dict[int, Tuple[date, np.ndarray]]:
+    '''
+        {scheme_code: (newest NAV date, last `history_window` NAVs oldest first)}, read in one
+        pass from the NAV dataset (NAV_DATASET_DIR) or, when it is not configured, the database.
+    '''
+    from utilities.nav_dataset import get_nav_dataset
+
+    scheme_codes = [int(code) for code in scheme_codes]
+    start = (today or date.today()) - timedelta(days=FORECAST_LOOKBACK_DAYS)
+
+    dataset = get_nav_dataset()
+    if dataset is not None:
+        navs = dataset.read(scheme_codes, start=start, columns=['scheme_code', 'date', 'nav']).to_pandas()
+    else:
+        from sqlalchemy import text
+        from database.router import get_engine
+
+        engine = get_engine(db_type=os.environ.get('DATABASE_TYPE'))
+        with engine.connect() as connection:
+            navs = pd.read_sql(
+                text('SELECT scheme_code, date, nav FROM mutual_fund_nav WHERE date >= :start'),
+                connection, params={'start': start}
+            )
+        navs = navs[navs['scheme_code'].isin(scheme_codes)]
+
+    if navs.empty:
+        return {}
+    navs['date'] = pd.to_datetime(navs['date'])
+    navs['nav'] = navs['nav'].astype('float64')
+    navs = (
+        navs.sort_values(['scheme_code', 'date'])
+        .drop_duplicates(['scheme_code', 'date'], keep='last')
+        .groupby('scheme_code', sort=False)
+        .tail(history_window)
+    )
+    return {
+        int(code): (group['date'].iloc[-1].date(), group['nav'].to_numpy())
+        for code, group in navs.groupby('scheme_code', sort=False)
+    }
+
+
+class BatchForecaster:
+    '''
+        Forecasts every scheme with every algorithm in one run :
+
+            - statistical models : chunks of schemes fanned out over a process pool, fitted
+                                   on at least `min_history` NAVs (half the window by default)
+            - lstm_shared : one model with a direct multi-horizon head, trained on the windows of
+                            all funds (each scaled on its own) and forecast in one batched call. It is
+                            not the per-fund LSTM of the dashboard, hence its own algorithm name
+
+            table, errors = BatchForecaster().run(scheme_codes)
+            write_forecasts(table)
+    '''
+
+    def __init__(
+        self,
+        horizon: int = FORECAST_HORIZON,
+        algorithms: Sequence[str] = ALGORITHMS,
+        history_window: int = FORECAST_HISTORY_WINDOW,
+        chunk_size: int = FORECAST_CHUNK_SIZE,
+        workers: int = FORECAST_WORKERS,
+        min_history: int = FORECAST_MIN_HISTORY
+    ):
+        unknown = set(algorithms) - set(ALGORITHMS)
+        if unknown:
+            raise ValueError(f'Unknown algorithms {sorted(unknown)}, expected some of {ALGORITHMS}')
+        self.horizon = horizon
+        self.algorithms = tuple(algorithms)
+        self.history_window = history_window
+        self.min_history = max(2, min_history or history_window // 2)
+        self.chunk_size = chunk_size
+        self.workers = workers
+
+    def run(self, scheme_codes: Iterable[int], run_date: date = None) -> Tuple[pa.Table, Dict[str, Exception]]:
+        run_date = run_date or date.today()
+        histories = load_histories(scheme_codes, self.history_window, run_date)
+        log.info(f'Forecasting {len(histories)} schemes x {len(self.algorithms)} algorithms, {self.horizon} days')
+
+        tables, errors = [], {}
+        statistical = tuple(algorithm for algorithm in self.algorithms if algorithm in FORECASTERS)
+        if statistical and histories:
+            schemes = [(code, as_of, tuple(navs)) for code, (as_of, navs) in histories.items()]
+            tasks = [
+                ForecastTask(
+                    chunk_id=f'chunk_{index // self.chunk_size}',
+                    run_date=run_date,
+                    horizon=self.horizon,
+                    algorithms=statistical,
+                    schemes=tuple(schemes[index:index + self.chunk_size]),
+                    min_history=self.min_history
+                )
+                for index in range(0, len(schemes), self.chunk_size)
+            ]
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                for chunk_id, result in executor.map(_forecast_chunk, tasks):
+                    tables.append(result['table'])
+                    errors.update(result['errors'])
+
+        if 'lstm_shared' in self.algorithms:
+            table, skipped = self._lstm(histories, run_date)
+            tables.append(table)
+            errors.update(skipped)
+
+        table = pa.concat_tables(tables) if tables else FORECAST_ARROW_SCHEMA.empty_table()
+        log.info(f'Forecast {table.num_rows} rows, {len(errors)} errors')
+        return table, errors
+
+    def _lstm(
+        self,
+        histories: Dict[int, Tuple[date, np.ndarray]],
+        run_date: date
+    ) -> Tuple[pa.Table, Dict[str, Exception]]:
+        '''
+            The shared model needs a full window per fund, shorter histories come back as errors.
+        '''
+        from .lstm import LSTMConfig, train_lstm
+
+        full = {code: history for code, history in histories.items() if len(history[1]) == self.history_window}
+        skipped = {
+            f'{code}:lstm_shared': ValueError(f'{len(navs)} NAVs, lstm_shared needs {self.history_window}')
+            for code, (_, navs) in histories.items() if code not in full
+        }
+        if skipped:
+            log.warning(f'LSTM skips {len(skipped)} schemes with fewer than {self.history_window} NAVs')
+        if not full:
+            return FORECAST_ARROW_SCHEMA.empty_table(), skipped
+
+        codes = list(full)
+        batch = np.stack([full[code][1] for code in codes])
+        model = train_lstm(batch, LSTMConfig(horizon=self.horizon, batch_size=FORECAST_LSTM_BATCH_SIZE))
+        table = forecast_table(run_date, 'lstm_shared', codes, [full[code][0] for code in codes], model.forecast(batch, self.horizon))
+        return table, skipped
+
+
+def write_forecasts(table: pa.Table, path: str = FORECAST_PATH, storage: StorageBackend = None) -> str:
+    '''
+        Replace the forecast file in storage, sorted so a single scheme read skips row groups.
+    '''
+    storage = storage or get_storage()
+    return storage.upload(path, parquet_bytes(table.sort_by(FORECAST_SORT_KEYS), sorting=FORECAST_SORT_KEYS))
+
+
+def read_forecasts(
+    scheme_code,
+    algorithm: str = None,
+    path: str = FORECAST_PATH,
+    storage: StorageBackend = None
+) -> Optional[pd.DataFrame]:
+    '''
+        Precomputed forecasts of one scheme (optionally one algorithm), None when there are none.
+    '''
+    storage = storage or get_storage()
+    try:
+        data = storage.download(path)
+    except FileNotFoundError:
+        return None
+    filters = [('scheme_code', '=', int(scheme_code))]
+    if algorithm:
+        filters.append(('algorithm', '=', algorithm))
+    frame = pq.read_table(pa.BufferReader(data), filters=filters).to_pandas()
+    return frame if len(frame) else None
@@ -0,0 +1,902 @@
+#    __                __                  __
+#   / /  ___ ___  ____/ /  __ _  ___ _____/ /__ ___
+#  / _ \/ -_) _ \/ __/ _ \/  ' \/ _ `/ __/  '_/(_-<
+# /_.__/\__/_//_/\__/_//_/_/_/_/\_,_/_/ /_/\_\/___/
+#
+# Local benchmarks against a mock mfapi / Kuvera server, no network needed.
+#
+#   python benchmarks.py ingestion --schemes 500 --workers 6 --concurrency 32
+
+import os
+import gzip
+import json
+import hashlib
+import tempfile
+import time
+import sys
+import argparse
+import subprocess
+import requests
+import threading
+import tracemalloc
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ProcessPoolExecutor
+
+from utilities import RequestMixin, MPTask, AsyncIngestionEngine
+from utilities.rate_limit import get_rate_limiter, log_rate_limit_stats
+
+from logger import get_logger
+
+log = get_logger('Benchmarks')
+
+
+def make_history(scheme_code: int, days: int, start: date = None):
+    '''
+        Deterministic mfapi style payload, newest entry first.
+    '''
+    start = start or date.today()
+    return {
+        'meta': {
+            'fund_house': 'Mock Mutual Fund',
+            'scheme_type': 'Open Ended Schemes',
+            'scheme_category': 'Equity Scheme - Large Cap Fund',
+            'scheme_code': scheme_code,
+            'scheme_name': f'Mock Fund {scheme_code} - Direct Plan - Growth',
+            'isin_growth': f'INF{scheme_code:09d}',
+            'isin_div_reinvestment': None,
+        },
+        'data': [
+            {
+                'date': (start - timedelta(days=offset)).strftime('%d-%m-%Y'),
+                'nav': f'{10 + ((scheme_code + offset) % 997) / 7:.5f}',
+            }
+            for offset in range(days)
+        ],
+        'status': 'SUCCESS',
+    }
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections_opened += 1
+
+    def _send_json(self, obj, status: int = 200):
+        body = json.dumps(obj).encode('utf-8')
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', etag)
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, compresslevel=5)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+        with self.server.lock:
+            self.server.bytes_sent += len(body)
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+
+        with server.lock:
+            server.requests_served += 1
+
+        parts = [part for part in self.path.split('/') if part]
+
+        if parts == ['mf']:
+            return self._send_json([
+                {
+                    'schemeCode': code,
+                    'schemeName': f'Mock Fund {code}',
+                    'isinGrowth': f'INF{code:09d}',
+                    'isinDivReinvestment': f'INR{code:09d}' if code % 2 else None,
+                }
+                for code in server.scheme_codes
+            ])
+
+        if len(parts) >= 2 and parts[0] == 'mf' and parts[1].isdigit():
+            latest = len(parts) == 3 and parts[2] == 'latest'
+            return self._send_json(make_history(int(parts[1]), 1 if latest else server.history_days))
+
+        if len(parts) == 2 and parts[0] == 'kuvera':
+            return self._send_json([{'code': parts[1], 'name': f'Mock {parts[1]}', 'nav': {'nav': 10.0}}])
+
+        self._send_json({'status': 'NOT_FOUND'}, status=404)
+
+
+class MockMFApiServer:
+    '''
+        Threaded stand-in for https://api.mfapi.in and https://mf.captnemo.in/kuvera.
+
+        with MockMFApiServer(latency=0.05) as server:
+            server.mf_url      -> "http://127.0.0.1:<port>/mf"
+            server.kuvera_url  -> "http://127.0.0.1:<port>/kuvera"
+    '''
+
+    def __init__(self, latency: float = 0.05, history_days: int = 365, scheme_codes=None):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _MockHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.request_queue_size = 1024
+        self.httpd.latency = latency
+        self.httpd.history_days = history_days
+        self.httpd.scheme_codes = list(scheme_codes or range(100000, 100100))
+        self.httpd.lock = threading.Lock()
+        self.httpd.requests_served = 0
+        self.httpd.connections_opened = 0
+        self.httpd.bytes_sent = 0
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def mf_url(self) -> str:
+        return f'{self.base_url}/mf'
+
+    @property
+    def kuvera_url(self) -> str:
+        return f'{self.base_url}/kuvera'
+
+    @property
+    def requests_served(self) -> int:
+        return self.httpd.requests_served
+
+    def counters(self):
+        '''
+            Snapshot of (requests, connections, body bytes) served so far.
+        '''
+        with self.httpd.lock:
+            return self.httpd.requests_served, self.httpd.connections_opened, self.httpd.bytes_sent
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _report(name: str, elapsed: float, total: int, errors: int):
+    log.info(f'{name:<14} {elapsed:8.2f}s  {total / elapsed:8.1f} req/s  errors={errors}')
+
+
+def bench_ingestion(schemes: int, workers: int, concurrency: int, latency: float, rate: float):
+    '''
+        Process pool `_mp_worker` fan-out vs `AsyncIngestionEngine` on the same task list.
+    '''
+    os.environ['RATE_LIMIT'] = str(rate)
+    codes = range(100000, 100000 + schemes)
+
+    with MockMFApiServer(latency=latency, scheme_codes=codes) as server:
+        tasks = [MPTask(server.mf_url, str(code), True) for code in codes]
+
+        log.header(f'Ingestion : {schemes} schemes, {latency * 1000:.0f} ms upstream latency')
+
+        get_rate_limiter(server.mf_url).reset()
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = dict(executor.map(RequestMixin._mp_worker, tasks))
+        _report(f'process x{workers}', time.perf_counter() - started, len(tasks),
+                sum(isinstance(value, Exception) for value in results.values()))
+        log_rate_limit_stats(server.mf_url)
+
+        get_rate_limiter(server.mf_url).reset()
+        started = time.perf_counter()
+        results = AsyncIngestionEngine(concurrency=concurrency).run(tasks)
+        _report(f'async x{concurrency}', time.perf_counter() - started, len(tasks),
+                sum(isinstance(value, Exception) for value in results.values()))
+        log_rate_limit_stats(server.mf_url)
+
+
+def _fresh_connection_worker(task: MPTask):
+    '''
+        The pre-pooling worker : module level `requests.get`, no compression, a new socket per call.
+    '''
+    url = f"{task.base_url}/{task.scheme_code}"
+    try:
+        response = requests.get(url, timeout=10, headers={'Accept-Encoding': 'identity'})
+        response.raise_for_status()
+        return task.scheme_code, response.json()
+    except Exception as e:
+        return task.scheme_code, e
+
+
+def bench_connections(schemes: int, workers: int, concurrency: int, history_days: int):
+    '''
+        Connections opened and bytes transferred per run : fresh sockets vs pooled keep-alive sessions.
+    '''
+    os.environ.setdefault('RATE_LIMIT', '1000')
+    codes = range(100000, 100000 + schemes)
+
+    with MockMFApiServer(latency=0.0, history_days=history_days, scheme_codes=codes) as server:
+        tasks = [MPTask(server.mf_url, str(code), False) for code in codes]
+
+        log.header(f'Connections : {schemes} full-history schemes ({history_days} days each)')
+
+        def run(name, fetch):
+            before = server.counters()
+            started = time.perf_counter()
+            results = fetch()
+            elapsed = time.perf_counter() - started
+            after = server.counters()
+            errors = sum(isinstance(value, Exception) for value in results.values())
+            log.info(
+                f'{name:<18} {elapsed:7.2f}s  requests={after[0] - before[0]:<6} '
+                f'connections={after[1] - before[1]:<6} bytes={after[2] - before[2]:<12,} errors={errors}'
+            )
+
+        def pool(worker):
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                return dict(executor.map(worker, tasks))
+
+        run(f'fresh x{workers}', lambda: pool(_fresh_connection_worker))
+        run(f'pooled x{workers}', lambda: pool(RequestMixin._mp_worker))
+        run(f'async x{concurrency}', lambda: AsyncIngestionEngine(concurrency=concurrency).run(tasks))
+
+
+def bench_cache(schemes: int, history_days: int):
+    '''
+        Full-history fetches through the response cache : cold, fresh hits, then 304 revalidation.
+    '''
+    from utilities import http_cache
+
+    os.environ.setdefault('RATE_LIMIT', '1000')
+    codes = range(100000, 100000 + schemes)
+
+    with tempfile.TemporaryDirectory() as cache_dir, \
+            MockMFApiServer(latency=0.0, history_days=history_days, scheme_codes=codes) as server:
+        os.environ['HTTP_CACHE_DIR'] = cache_dir
+        tasks = [MPTask(server.mf_url, str(code), False) for code in codes]
+
+        log.header(f'Response cache : {schemes} full-history schemes ({history_days} days each)')
+
+        for name, max_age in (('cold', 3600), ('fresh hits', 3600), ('revalidate', 0)):
+            os.environ['HTTP_CACHE_MAX_AGE'] = str(max_age)
+            http_cache._cache = None
+            before = server.counters()
+            started = time.perf_counter()
+            for task in tasks:
+                RequestMixin._mp_worker(task)
+            elapsed = time.perf_counter() - started
+            after = server.counters()
+            log.info(
+                f'{name:<12} {elapsed:7.2f}s  requests={after[0] - before[0]:<6} bytes={after[2] - before[2]:,}'
+            )
+
+        os.environ.pop('HTTP_CACHE_DIR')
+
+
+def _legacy_normalize(payloads):
+    '''
+        The per row loop `_mp_worker_db_dump` used before the columnar path.
+    '''
+    import pandas as pd
+
+    mappings = []
+    for payload in payloads:
+        scheme_code = payload.get('meta').get('scheme_code')
+        for item in payload.get('data'):
+            try:
+                mappings.append({
+                    'insert_date': datetime.now(),
+                    'scheme_code': scheme_code,
+                    'date': datetime.strptime(item.get('date'), '%d-%m-%Y').date(),
+                    'nav': Decimal(item.get('nav'))
+                })
+            except Exception:
+                continue
+    return pd.DataFrame(mappings, columns=['insert_date', 'scheme_code', 'date', 'nav'])
+
+
+def bench_normalize(schemes: int, history_days: int, repeat: int):
+    '''
+        Row loop vs columnar normalization, both including the parquet encode that follows.
+    '''
+    import pyarrow.parquet as pq
+    from utilities.normalize import normalize_nav_payloads, table_to_parquet_bytes
+
+    payloads = [make_history(code, history_days) for code in range(100000, 100000 + schemes)]
+    rows = schemes * history_days
+
+    log.header(f'Normalize : {schemes} payloads x {history_days} days = {rows:,} rows')
+
+    def run(name, fn):
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            out = fn()
+            best = min(best, time.perf_counter() - started)
+        log.info(f'{name:<10} {best:8.3f}s  {rows / best:12,.0f} rows/s  {len(out):,} bytes')
+        return best
+
+    legacy = run('row loop', lambda: _legacy_normalize(payloads).to_parquet())
+    columnar = run('columnar', lambda: table_to_parquet_bytes(normalize_nav_payloads(payloads)))
+    log.info(f'speedup    {legacy / columnar:8.1f}x')
+
+
+def bench_streaming(new_days: int, repeat: int):
+    '''
+        Whole-body json.loads + watermark filter vs the streaming parser, per scheme, by fund age.
+    '''
+    from utilities.dates import DateTimeMixin
+    from utilities.streaming import parse_history_until, STREAM_CHUNK
+
+    log.header(f'Streaming parse : {new_days} new days past the watermark')
+
+    def measure(fn):
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - started)
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return best, peak
+
+    for history_days in (250, 1000, 4000, 8000):
+        payload = make_history(100001, history_days)
+        body = json.dumps(payload).encode('utf-8')
+        cutoff = DateTimeMixin.serialize(payload['data'][new_days]['date'])
+        chunks = [body[i:i + STREAM_CHUNK] for i in range(0, len(body), STREAM_CHUNK)]
+
+        def whole():
+            data = json.loads(b''.join(chunks))
+            return [item for item in data['data'] if DateTimeMixin.serialize(item['date']) > cutoff]
+
+        full_time, full_peak = measure(whole)
+        stream_time, stream_peak = measure(lambda: parse_history_until(iter(chunks), cutoff))
+        log.info(
+            f'{history_days:>5} days ({len(body) / 1024:7.1f} KiB)  '
+            f'json.loads {full_time * 1000:7.2f} ms / {full_peak / 1024:8.1f} KiB peak   '
+            f'stream {stream_time * 1000:6.2f} ms / {stream_peak / 1024:6.1f} KiB peak'
+        )
+
+
+def bench_dates(config: str, threshold: int, repeat: int):
+    '''
+        Watermark gaps over run_time_config.json and a history filter :
+        uncached strptime loop vs memoized scalar parse vs one vectorized call.
+    '''
+    import numpy as np
+    from utilities.dates import DateTimeMixin, day_gaps, parse_dates, _parse_date
+
+    with open(config, 'r', encoding='utf-8') as f:
+        watermarks = json.load(f)
+    today = date.today()
+    log.header(f'Date handling : {len(watermarks):,} watermarks, threshold {threshold} days')
+
+    def best_of(fn):
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - started)
+        return best, result
+
+    def legacy_gap(value):
+        return (today - datetime.strptime(value, '%d-%m-%Y').date()).days
+
+    def legacy():
+        return {code: legacy_gap(value) for code, value in watermarks.items() if legacy_gap(value) <= threshold}
+
+    def cached():
+        return {code: gap for code, gap in ((code, DateTimeMixin.day_gap(value)) for code, value in watermarks.items()) if gap <= threshold}
+
+    def vectorized():
+        codes = list(watermarks)
+        gaps = day_gaps(watermarks.values(), today=today)
+        keep = np.flatnonzero(gaps <= threshold)
+        return {codes[i]: int(gaps[i]) for i in keep}
+
+    _parse_date.cache_clear()
+    expected, legacy_time = legacy(), None
+    for name, fn in (('legacy', legacy), ('cached', cached), ('vectorized', vectorized)):
+        elapsed, result = best_of(fn)
+        legacy_time = legacy_time or elapsed
+        assert result == expected, name
+        log.info(f'{name:<10} {elapsed * 1000:8.2f} ms  {legacy_time / elapsed:6.1f}x  {len(result):,} schemes due')
+    log.info(f'scalar cache {DateTimeMixin.date_cache_info()}')
+
+    history = [item['date'] for item in make_history(100001, 8000)['data']]
+    cutoff = DateTimeMixin.serialize(history[5])
+    legacy_time, _ = best_of(lambda: [d for d in history if datetime.strptime(d, '%d-%m-%Y').date() > cutoff])
+    batch_time, _ = best_of(lambda: parse_dates(history) > cutoff)
+    log.info(f'history filter ({len(history):,} dates)  strptime {legacy_time * 1000:7.2f} ms  batch {batch_time * 1000:6.2f} ms  {legacy_time / batch_time:6.1f}x')
+
+
+def _legacy_dump_worker(payloads):
+    '''
+        The pre-fusion dump : payloads pickled in from the parent, normalized and written here.
+    '''
+    from models.pandas_schema import NAV_SCHEMA
+    from utilities.normalize import normalize_nav_payloads, table_to_parquet_bytes
+    from utilities.storage import get_storage
+
+    table = normalize_nav_payloads(payloads).select(NAV_SCHEMA)
+    get_storage().upload(f'legacy/{os.getpid()}_{time.time_ns()}.parquet', table_to_parquet_bytes(table))
+    return {payload['meta']['scheme_code']: payload['data'][0]['date'] for payload in payloads}
+
+
+def _daily_memory_run(variant: str, schemes: int, workers: int, history_days: int, new_days: int, batch: int):
+    '''
+        One daily run in this process, prints the parent's peak RSS. Started in a fresh interpreter per variant.
+    '''
+    import resource
+    from utilities import DailyBatchTask
+    from utilities.dates import DateTimeMixin
+
+    os.environ.setdefault('RATE_LIMIT', '1000')
+    codes = [str(code) for code in range(100000, 100000 + schemes)]
+    cutoff = DateTimeMixin.serialize(date.today() - timedelta(days=new_days))
+
+    with MockMFApiServer(latency=0, history_days=history_days, scheme_codes=range(100000, 100000 + schemes)) as server, \
+            tempfile.TemporaryDirectory() as output_dir, ProcessPoolExecutor(max_workers=workers) as executor:
+        os.environ['STORAGE_BACKEND'] = 'local'
+        os.environ['STORAGE_LOCAL_ROOT'] = output_dir
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+
+        if variant == 'legacy':
+            results = dict(executor.map(RequestMixin._mp_worker, [MPTask(server.mf_url, code, False) for code in codes]))
+            cutoff_date = DateTimeMixin.serialize(cutoff)
+            ready = [
+                dict(payload, data=[item for item in payload['data'] if DateTimeMixin.serialize(item['date']) > cutoff_date])
+                for payload in results.values()
+            ]
+            manifests = list(executor.map(_legacy_dump_worker, [ready[i:i + batch] for i in range(0, len(ready), batch)]))
+            rows = sum(len(payload['data']) for payload in ready)
+        else:
+            tasks = [
+                DailyBatchTask(server.mf_url, f'batch_{i}', tuple((code, cutoff, False) for code in codes[i:i + batch]))
+                for i in range(0, len(codes), batch)
+            ]
+            manifests = dict(executor.map(RequestMixin._mp_worker_daily, tasks))
+            rows = sum(manifest['rows'] for manifest in manifests.values())
+
+        elapsed = time.perf_counter() - started
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(json.dumps({'elapsed': elapsed, 'rows': rows, 'baseline_kib': baseline, 'peak_kib': peak}))
+
+
+def bench_daily_memory(schemes: int, workers: int, history_days: int, new_days: int, batch: int):
+    '''
+        Parent peak RSS of a daily run : payloads pickled through the parent vs fused workers returning manifests.
+    '''
+    log.header(f'Daily run memory : {schemes} schemes x {history_days} days history, {new_days} new days')
+    for variant in ('legacy', 'fused'):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), 'daily-memory', '--variant', variant,
+             '--schemes', str(schemes), '--workers', str(workers), '--history-days', str(history_days),
+             '--new-days', str(new_days), '--batch', str(batch)],
+            check=True, capture_output=True, text=True
+        ).stdout.strip().splitlines()[-1]
+        stats = json.loads(output)
+        log.info(
+            f"{variant:<7} {stats['elapsed']:7.2f}s  {stats['rows']:,} rows  "
+            f"parent peak RSS {stats['peak_kib'] / 1024:7.1f} MiB (+{(stats['peak_kib'] - stats['baseline_kib']) / 1024:.1f} MiB)"
+        )
+
+
+def bench_storage(files: int, size_mb: float, workers: int):
+    '''
+        End-to-end write throughput through the storage backend (STORAGE_BACKEND, local by default here) :
+        one upload at a time vs `upload_many` with `workers` concurrent uploads.
+    '''
+    from utilities.storage import get_storage
+
+    os.environ.setdefault('STORAGE_BACKEND', 'local')
+    with tempfile.TemporaryDirectory() as root:
+        os.environ.setdefault('STORAGE_LOCAL_ROOT', os.path.join(root, 'container'))
+        storage = get_storage()
+        log.header(f'Storage : {files} files x {size_mb} MB to {type(storage).__name__}')
+
+        sources = []
+        for index in range(files):
+            source = os.path.join(root, f'source_{index}.parquet')
+            with open(source, 'wb') as f:
+                f.write(os.urandom(int(size_mb * 1024 * 1024)))
+            sources.append(source)
+        total_mb = files * size_mb
+
+        for name, upload in (
+            ('sequential', lambda items: [storage.upload_file(*item) for item in items]),
+            (f'concurrent x{workers}', lambda items: storage.upload_many(items, max_workers=workers)),
+        ):
+            items = [(source, f'bench/{name.split()[0]}/{index}.parquet') for index, source in enumerate(sources)]
+            started = time.perf_counter()
+            upload(items)
+            elapsed = time.perf_counter() - started
+            log.info(f'{name:<14} {elapsed:7.2f}s  {total_mb / elapsed:8.1f} MB/s')
+
+            for _, path in items:
+                storage.delete(path)
+
+
+def bench_parquet(schemes: int, history_days: int, row_group_rows: int):
+    '''
+        pandas `to_parquet()` defaults on Decimal objects vs the parquet profile (decimal / float64 NAV) :
+        write time, file size and a single scheme read that can skip row groups on statistics.
+    '''
+    import io
+    import pyarrow.parquet as pq
+    from utilities.normalize import normalize_nav_payloads
+    from utilities.parquet_profile import ParquetProfile, write_nav
+
+    payloads = [make_history(code, history_days) for code in range(100000, 100000 + schemes)]
+    table = normalize_nav_payloads(payloads).select(['insert_date', 'scheme_code', 'date', 'nav'])
+    frame = _legacy_normalize(payloads)
+    target = 100000 + schemes // 2
+    log.header(f'Parquet layout : {table.num_rows:,} rows, {row_group_rows:,} rows per row group')
+
+    def pandas_default(sink):
+        frame.to_parquet(sink, index=False, row_group_size=row_group_rows)
+
+    variants = [('pandas default', pandas_default)]
+    for nav_type in ('decimal', 'float64'):
+        profile = ParquetProfile(nav_type=nav_type, row_group_size=row_group_rows)
+        variants.append((f'profile {nav_type}', lambda sink, profile=profile: write_nav(table, sink, profile)))
+
+    for name, write in variants:
+        sink = io.BytesIO()
+        started = time.perf_counter()
+        write(sink)
+        written = time.perf_counter() - started
+
+        parquet_file = pq.ParquetFile(io.BytesIO(sink.getvalue()))
+        started = time.perf_counter()
+        rows = pq.read_table(io.BytesIO(sink.getvalue()), filters=[('scheme_code', '=', target)]).num_rows
+        read = time.perf_counter() - started
+        groups = parquet_file.metadata.num_row_groups
+        kept = 0
+        for group in range(groups):
+            stats = parquet_file.metadata.row_group(group).column(1).statistics
+            kept += not stats or stats.min <= target <= stats.max
+        log.info(
+            f'{name:<16} write {written:6.2f}s  {sink.tell() / 1024 / 1024:7.2f} MiB  '
+            f'scheme read {read * 1000:7.1f} ms ({rows} rows, {kept}/{groups} row groups)'
+        )
+
+
+def bench_bulk_load(schemes: int, history_days: int, batch_rows: int):
+    '''
+        Rows per second into mutual_fund_nav : ORM bulk_insert_mappings vs the native bulk loader
+        (plain inserts, a staging merge and a rerun of that merge),
+        on a SQLite stand-in and on PostgreSQL when BENCH_POSTGRES_URL is set.
+    '''
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from models.base import Base, MutualFundNAV, MutualFundScheme
+    from database.bulk_load import BulkLoader, iter_parquet_batches
+    from utilities.normalize import normalize_nav_payloads
+    from utilities.parquet_profile import ParquetProfile, write_nav
+
+    payloads = [make_history(code, history_days) for code in range(100000, 100000 + schemes)]
+    table = normalize_nav_payloads(payloads).select(['insert_date', 'scheme_code', 'date', 'nav'])
+    log.header(f'Bulk load : {table.num_rows:,} rows, {batch_rows:,} rows per batch')
+
+    with tempfile.TemporaryDirectory() as workdir:
+        extract = os.path.join(workdir, 'extract.parquet')
+        write_nav(table, extract, ParquetProfile(row_group_size=batch_rows))
+
+        targets = [('sqlite', lambda: create_engine(f"sqlite:///{os.path.join(workdir, 'bench.sqlite')}"))]
+        if os.environ.get('BENCH_POSTGRES_URL'):
+            targets.append(('postgresql', lambda: create_engine(os.environ['BENCH_POSTGRES_URL'])))
+        else:
+            log.info('BENCH_POSTGRES_URL not set, skipping PostgreSQL')
+
+        def orm(engine):
+            with Session(engine) as session:
+                for batch in iter_parquet_batches([extract], batch_rows):
+                    session.bulk_insert_mappings(MutualFundNAV, batch.to_pylist())
+                session.commit()
+
+        def loader(engine):
+            BulkLoader(engine).load(iter_parquet_batches([extract], batch_rows))
+
+        def merge(engine):
+            BulkLoader(engine).load(iter_parquet_batches([extract], batch_rows), mode='merge')
+
+        for backend, make_engine in targets:
+            for name, load in (('orm mappings', orm), ('bulk loader', loader), ('merge', merge), ('merge rerun', merge)):
+                engine = make_engine()
+                if name != 'merge rerun':  # the rerun merges into the rows the previous merge left behind
+                    Base.metadata.drop_all(engine, tables=[MutualFundNAV.__table__, MutualFundScheme.__table__])
+                    Base.metadata.create_all(engine, tables=[MutualFundScheme.__table__, MutualFundNAV.__table__])
+                    with Session(engine) as session:  # parent rows for the scheme_code foreign key
+                        session.bulk_insert_mappings(MutualFundScheme, [payload['meta'] for payload in payloads])
+                        session.commit()
+
+                started = time.perf_counter()
+                load(engine)
+                elapsed = time.perf_counter() - started
+                log.info(f'{backend:<10} {name:<14} {elapsed:6.2f}s  {table.num_rows / elapsed:12,.0f} rows/s')
+                engine.dispose()
+
+
+def _legacy_rolling_arima(history, steps: int):
+    '''
+        The dashboard's former ARIMA branch : a fresh fit for every forecast day.
+    '''
+    from statsmodels.tsa.arima.model import ARIMA
+
+    history = list(history)
+    predictions = []
+    for _ in range(steps):
+        forecast = ARIMA(history, order=(2, 1, 2)).fit().forecast(steps=1)
+        predictions.extend(forecast)
+        history.append(forecast[0])
+    return predictions
+
+
+def bench_arima(horizons: str, history_days: int, repeat: int):
+    '''
+        Request path latency per horizon : refit per day vs one fit for the whole horizon,
+        and a rolling update (append one NAV, forecast) on an already fitted model.
+    '''
+    import warnings
+    from forecasting.arima import ArimaForecaster
+
+    warnings.filterwarnings('ignore')
+    navs = [float(entry['nav']) for entry in reversed(make_history(120503, history_days)['data'])]
+    history = navs[-100:]
+    fitted = ArimaForecaster().fit(history)
+    log.header(f'ARIMA(2,1,2) latency : {len(history)} observations, best of {repeat}')
+
+    def timed(run):
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - started)
+        return best * 1000
+
+    for steps in (int(value) for value in horizons.split(',')):
+        legacy = timed(lambda: _legacy_rolling_arima(history, steps))
+        single = timed(lambda: ArimaForecaster().fit(history).forecast(steps))
+        rolling = timed(lambda: fitted.append(navs[-1:]).forecast(steps))
+        log.info(
+            f'horizon {steps:>2} : refit per day {legacy:8.1f} ms  fit once {single:7.1f} ms  '
+            f'append + forecast {rolling:6.1f} ms  ({legacy / single:5.1f}x)'
+        )
+
+
+def bench_windowing(schemes: int, history_days: int, look_back: int, repeat: int):
+    '''
+        LSTM training windows for every fund : per-window Python loop vs strided views
+        (plus the tabular features the views make cheap).
+    '''
+    import numpy as np
+    from forecasting.windowing import make_dataset, make_windows
+
+    navs = np.array([
+        [float(entry['nav']) for entry in reversed(make_history(code, history_days)['data'])]
+        for code in range(100000, 100000 + schemes)
+    ])
+    log.header(f'Windowing : {schemes} funds x {history_days} days, look back {look_back}')
+
+    def loop():
+        for fund in navs:
+            X, Y = [], []
+            for i in range(len(fund) - look_back):
+                X.append(fund[i:(i + look_back)])
+                Y.append(fund[i + look_back])
+            np.array(X), np.array(Y)
+
+    variants = [
+        ('python loop', loop),
+        ('views per fund', lambda: [make_windows(fund, look_back) for fund in navs]),
+        ('views batched', lambda: make_windows(navs, look_back)),
+        ('views + features', lambda: make_dataset(navs, look_back, lags=(1, 5), rolling=(5, 20))),
+    ]
+    baseline = None
+    for name, run in variants:
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - started)
+        baseline = baseline or best
+        log.info(f'{name:<18} {best * 1000:9.2f} ms  ({baseline / best:7.1f}x)')
+
+
+def _legacy_lstm_forecast(model, window, steps: int):
+    '''
+        The dashboard's former LSTM loop : one Keras predict() and one np.append per day.
+    '''
+    import numpy as np
+
+    input_seq = window.reshape(1, -1, 1)
+    preds = []
+    for _ in range(steps):
+        pred = model.predict(input_seq, verbose=0)[0][0]
+        preds.append(pred)
+        input_seq = np.append(input_seq[:, 1:, :], [[[pred]]], axis=1)
+    return preds
+
+
+def bench_lstm(horizons: str, funds: int, repeat: int):
+    '''
+        CPU forecast latency of the LSTM (training excluded) : per-step predict() loop vs the
+        compiled recursive loop vs a direct multi-horizon head, then a batch of funds in one call.
+    '''
+    import numpy as np
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    import tensorflow as tf
+    from forecasting.lstm import LSTMConfig, train_lstm
+
+    tf.config.set_visible_devices([], 'GPU')
+    steps_list = [int(value) for value in horizons.split(',')]
+    batch = np.array([
+        [float(entry['nav']) for entry in reversed(make_history(code, 100)['data'])]
+        for code in range(100000, 100000 + funds)
+    ])
+    navs = batch[0]
+    recursive = train_lstm(navs, LSTMConfig(epochs=1))
+    direct = train_lstm(navs, LSTMConfig(epochs=1, horizon=max(steps_list)))
+    shared = train_lstm(batch, LSTMConfig(epochs=1, horizon=max(steps_list)))
+    window = recursive.scale(navs)[-recursive.config.look_back:]
+    log.header(f'LSTM forecast latency on CPU : best of {repeat}, {funds} funds for the batched runs')
+
+    def timed(run, runs: int = repeat):
+        run()  # first call traces the graph
+        best = float('inf')
+        for _ in range(runs):
+            started = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - started)
+        return best * 1000
+
+    for steps in steps_list:
+        legacy = timed(lambda: _legacy_lstm_forecast(recursive.model, window, steps))
+        compiled = timed(lambda: recursive.forecast(navs, steps))
+        head = timed(lambda: direct.forecast(navs, steps))
+        log.info(
+            f'horizon {steps:>2} : predict loop {legacy:8.1f} ms  compiled recursive {compiled:6.1f} ms  '
+            f'direct head {head:6.1f} ms  ({legacy / head:6.1f}x)'
+        )
+
+    steps = max(steps_list)
+    per_fund = timed(lambda: [_legacy_lstm_forecast(recursive.model, recursive.scale(fund)[-30:], steps) for fund in batch], runs=1)
+    batched = timed(lambda: shared.forecast(batch, steps))
+    log.info(
+        f'{funds} funds x {steps} days : predict loop per fund {per_fund:9.1f} ms  '
+        f'one batched call {batched:6.1f} ms  ({per_fund / batched:6.1f}x)'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local performance benchmarks for the extraction pipeline.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingestion_parser = subparsers.add_parser('ingestion', help='Process pool vs asyncio ingestion throughput')
+    ingestion_parser.add_argument('--schemes', type=int, default=500)
+    ingestion_parser.add_argument('--workers', type=int, default=6)
+    ingestion_parser.add_argument('--concurrency', type=int, default=32)
+    ingestion_parser.add_argument('--latency', type=float, default=0.05, help='Mock upstream latency in seconds')
+    ingestion_parser.add_argument('--rate', type=float, default=500.0, help='Rate limit in requests per second')
+
+    connections_parser = subparsers.add_parser('connections', help='Connections opened and bytes transferred per run')
+    connections_parser.add_argument('--schemes', type=int, default=500)
+    connections_parser.add_argument('--workers', type=int, default=6)
+    connections_parser.add_argument('--concurrency', type=int, default=16)
+    connections_parser.add_argument('--history-days', type=int, default=1000)
+
+    cache_parser = subparsers.add_parser('cache', help='Cold vs cached vs revalidated full-history fetches')
+    cache_parser.add_argument('--schemes', type=int, default=200)
+    cache_parser.add_argument('--history-days', type=int, default=3000)
+
+    normalize_parser = subparsers.add_parser('normalize', help='Row loop vs columnar NAV normalization')
+    normalize_parser.add_argument('--schemes', type=int, default=200)
+    normalize_parser.add_argument('--history-days', type=int, default=3000)
+    normalize_parser.add_argument('--repeat', type=int, default=3)
+
+    streaming_parser = subparsers.add_parser('streaming', help='Whole-body vs streaming parse of full histories')
+    streaming_parser.add_argument('--new-days', type=int, default=3)
+    streaming_parser.add_argument('--repeat', type=int, default=5)
+
+    dates_parser = subparsers.add_parser('dates', help='Scalar vs cached vs vectorized watermark gaps')
+    dates_parser.add_argument('--config', default='run_time_config.json')
+    dates_parser.add_argument('--threshold', type=int, default=30)
+    dates_parser.add_argument('--repeat', type=int, default=5)
+
+    daily_parser = subparsers.add_parser('daily-memory', help='Parent peak RSS of pickled payloads vs fused daily workers')
+    daily_parser.add_argument('--schemes', type=int, default=1000)
+    daily_parser.add_argument('--workers', type=int, default=6)
+    daily_parser.add_argument('--history-days', type=int, default=3000)
+    daily_parser.add_argument('--new-days', type=int, default=3)
+    daily_parser.add_argument('--batch', type=int, default=100)
+    daily_parser.add_argument('--variant', choices=('legacy', 'fused'), help=argparse.SUPPRESS)
+
+    storage_parser = subparsers.add_parser('storage', help='Write throughput through the storage backend')
+    storage_parser.add_argument('--files', type=int, default=32)
+    storage_parser.add_argument('--size-mb', type=float, default=8)
+    storage_parser.add_argument('--workers', type=int, default=4)
+
+    parquet_parser = subparsers.add_parser('parquet', help='pandas defaults vs the tuned parquet profile')
+    parquet_parser.add_argument('--schemes', type=int, default=200)
+    parquet_parser.add_argument('--history-days', type=int, default=3000)
+    parquet_parser.add_argument('--row-group-rows', type=int, default=65536)
+
+    bulk_parser = subparsers.add_parser('bulk-load', help='ORM inserts vs native bulk loading and merges, in rows per second')
+    bulk_parser.add_argument('--schemes', type=int, default=200)
+    bulk_parser.add_argument('--history-days', type=int, default=3000)
+    bulk_parser.add_argument('--batch-rows', type=int, default=100000)
+
+    arima_parser = subparsers.add_parser('arima', help='Refit-per-day vs fit-once ARIMA forecast latency')
+    arima_parser.add_argument('--horizons', default='1,7,14,30', help='Comma separated forecast horizons in days')
+    arima_parser.add_argument('--history-days', type=int, default=400)
+    arima_parser.add_argument('--repeat', type=int, default=3)
+
+    windowing_parser = subparsers.add_parser('windowing', help='Loop vs strided-view LSTM training windows')
+    windowing_parser.add_argument('--schemes', type=int, default=200)
+    windowing_parser.add_argument('--history-days', type=int, default=1000)
+    windowing_parser.add_argument('--look-back', type=int, default=30)
+    windowing_parser.add_argument('--repeat', type=int, default=3)
+
+    lstm_parser = subparsers.add_parser('lstm', help='Per-step predict loop vs compiled / direct / batched LSTM forecasts')
+    lstm_parser.add_argument('--horizons', default='1,7,30', help='Comma separated forecast horizons in days')
+    lstm_parser.add_argument('--funds', type=int, default=20)
+    lstm_parser.add_argument('--repeat', type=int, default=3)
+
+    args = parser.parse_args()
+
+    if args.command == 'ingestion':
+        bench_ingestion(args.schemes, args.workers, args.concurrency, args.latency, args.rate)
+    elif args.command == 'connections':
+        bench_connections(args.schemes, args.workers, args.concurrency, args.history_days)
+    elif args.command == 'cache':
+        bench_cache(args.schemes, args.history_days)
+    elif args.command == 'normalize':
+        bench_normalize(args.schemes, args.history_days, args.repeat)
+    elif args.command == 'streaming':
+        bench_streaming(args.new_days, args.repeat)
+    elif args.command == 'dates':
+        bench_dates(args.config, args.threshold, args.repeat)
+    elif args.command == 'daily-memory':
+        if args.variant:
+            _daily_memory_run(args.variant, args.schemes, args.workers, args.history_days, args.new_days, args.batch)
+        else:
+            bench_daily_memory(args.schemes, args.workers, args.history_days, args.new_days, args.batch)
+    elif args.command == 'storage':
+        bench_storage(args.files, args.size_mb, args.workers)
+    elif args.command == 'parquet':
+        bench_parquet(args.schemes, args.history_days, args.row_group_rows)
+    elif args.command == 'bulk-load':
+        bench_bulk_load(args.schemes, args.history_days, args.batch_rows)
+    elif args.command == 'arima':
+        bench_arima(args.horizons, args.history_days, args.repeat)
+    elif args.command == 'windowing':
+        bench_windowing(args.schemes, args.history_days, args.look_back, args.repeat)
+    elif args.command == 'lstm':
+        bench_lstm(args.horizons, args.funds, args.repeat)
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
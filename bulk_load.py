@@ -0,0 +1,254 @@
+#  _         _ _     _              _
+# | |__ _  _| | |__ | |___  __ _ __| |
+# | '_ \ || | | / / | / _ \/ _` / _` |
+# |_.__/\_,_|_|_\_\ |_\___/\__,_\__,_|
+#
+# Native bulk loading of NAV extracts : PostgreSQL COPY, MSSQL fast_executemany, SQLite executemany.
+
+import io
+from typing import Iterable, Iterator, List, Sequence, Union
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from sqlalchemy import Column, MetaData, Table
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateTable
+
+from models.base import MutualFundNAV
+from models.pandas_schema import NAV_SCHEMA
+
+from logger import get_logger
+
+logger = get_logger('BulkLoader')
+
+BULK_BATCH_ROWS = 100_000
+
+LOAD_MODES = ('append', 'merge')
+NAV_KEY = ('scheme_code', 'date')
+MERGE_DIALECTS = ('postgresql', 'sqlite', 'mysql', 'mssql')  # dialects with an upsert statement below
+
+Batches = Iterable[Union[pa.RecordBatch, pa.Table]]
+
+
+def iter_parquet_batches(paths: Sequence[str], batch_rows: int = BULK_BATCH_ROWS, columns: List[str] = None) -> Iterator[pa.RecordBatch]:
+    '''
+        Stream record batches out of extract files without materializing them.
+    '''
+    for path in paths:
+        yield from pq.ParquetFile(path).iter_batches(batch_size=batch_rows, columns=columns or NAV_SCHEMA)
+
+
+def _rows(batch: pa.RecordBatch, columns: List[str]) -> List[tuple]:
+    return list(zip(*(batch.column(name).to_pylist() for name in columns)))
+
+
+def _as_text(batch: pa.RecordBatch) -> pa.RecordBatch:
+    '''
+        SQLite has no native date / decimal : dates and timestamps go in as ISO text
+        (the format SQLAlchemy reads back), NAV as a float.
+    '''
+    arrays = []
+    for field, column in zip(batch.schema, batch.columns):
+        if pa.types.is_date(field.type) or pa.types.is_timestamp(field.type):
+            column = pc.cast(column, pa.string())
+        elif pa.types.is_decimal(field.type):
+            column = pc.cast(column, pa.float64())
+        arrays.append(column)
+    return pa.RecordBatch.from_arrays(arrays, names=batch.schema.names)
+
+
+def dedupe_nav(engine: Engine, table: str = MutualFundNAV.__tablename__) -> int:
+    '''
+        Delete duplicate (scheme_code, date) rows left by append loads, keeping the latest insert_date
+        (then the highest id) of each key. Needed before the unique key index can be created.
+    '''
+    key = ', '.join(NAV_KEY)
+    with engine.begin() as connection:
+        deleted = connection.exec_driver_sql(
+            f'DELETE FROM {table} WHERE id IN ('
+            f'SELECT id FROM ('
+            f'SELECT id, ROW_NUMBER() OVER (PARTITION BY {key} ORDER BY '
+            f'CASE WHEN insert_date IS NULL THEN 1 ELSE 0 END, insert_date DESC, id DESC) AS row_rank '
+            f'FROM {table}) ranked WHERE row_rank > 1)'
+        ).rowcount
+    logger.info(f'Removed {deleted} duplicate (scheme_code, date) rows from {table}')
+    return deleted
+
+
+class BulkLoader:
+    '''
+        Loads Arrow batches into a table through the fastest path the engine's dialect offers :
+
+            - postgresql : COPY ... FROM STDIN (CSV), written straight from Arrow
+            - mssql      : pyodbc executemany with fast_executemany (array binding)
+            - sqlite     : executemany, all batches in one transaction
+            - others     : SQLAlchemy core executemany in one transaction
+
+        mode='append' inserts straight into the table. mode='merge' bulk loads a temporary
+        staging table the same way, then upserts it on (scheme_code, date) in one set-based
+        statement : new days are inserted, restated NAVs updated, unchanged rows left alone,
+        so re-running a day is a cheap no-op. Merge is available on MERGE_DIALECTS only.
+
+            loader = BulkLoader(get_engine('sqlite'))
+            loader.load(iter_parquet_batches(paths), mode='merge')
+    '''
+
+    def __init__(self, engine: Engine, table: str = MutualFundNAV.__tablename__, columns: List[str] = None):
+        self.engine = engine
+        self.table = table
+        self.columns = columns or list(NAV_SCHEMA)
+
+    @property
+    def dialect(self) -> str:
+        return self.engine.dialect.name
+
+    def _batches(self, batches: Batches) -> Iterator[pa.RecordBatch]:
+        for batch in batches:
+            if isinstance(batch, pa.Table):
+                yield from batch.select(self.columns).to_batches(max_chunksize=BULK_BATCH_ROWS)
+            else:
+                yield batch.select(self.columns)
+
+    def load(self, batches: Batches, mode: str = 'append') -> int:
+        '''
+            Write every row of `batches` in a single transaction, returns the row count loaded.
+        '''
+        if mode not in LOAD_MODES:
+            raise ValueError(f'Unknown load mode {mode!r}, expected one of {LOAD_MODES}')
+        if mode == 'merge' and self.dialect not in MERGE_DIALECTS:
+            raise ValueError(f'Merge mode is not supported on {self.dialect!r}, expected one of {MERGE_DIALECTS}')
+
+        with self.engine.begin() as connection:
+            if mode == 'merge':
+                staging = self._create_staging(connection)
+                rows = self._insert(connection, staging, self._batches(batches))
+                changed = connection.exec_driver_sql(self._merge_sql(staging)).rowcount
+                connection.exec_driver_sql(f'DROP TABLE {staging.name}')
+                logger.info(f'Merged {rows} staged rows into {self.table}, {changed} inserted or updated ({self.dialect})')
+            else:
+                rows = self._insert(connection, self._target(), self._batches(batches))
+                logger.info(f'Bulk loaded {rows} rows into {self.table} ({self.dialect})')
+        return rows
+
+    def _target(self) -> Table:
+        if self.table == MutualFundNAV.__tablename__:
+            return MutualFundNAV.__table__
+        return Table(self.table, MetaData(), autoload_with=self.engine)
+
+    def _create_staging(self, connection: Connection) -> Table:
+        '''
+            A keyless temporary copy of the loaded columns, private to this connection.
+        '''
+        target = self._target()
+        columns = [Column(name, target.c[name].type) for name in self.columns]
+        if self.dialect == 'mssql':
+            staging = Table(f'#{self.table}_staging', MetaData(), *columns)
+        else:
+            staging = Table(f'{self.table}_staging', MetaData(), *columns, prefixes=['TEMPORARY'])
+        connection.execute(CreateTable(staging))
+        return staging
+
+    def _insert(self, connection: Connection, table: Table, batches: Iterator[pa.RecordBatch]) -> int:
+        insert = {
+            'postgresql': self._insert_postgres,
+            'mssql': self._insert_mssql,
+            'sqlite': self._insert_sqlite,
+        }.get(self.dialect, self._insert_generic)
+        return insert(connection, table, batches)
+
+    def _insert_sql(self, table: Table) -> str:
+        return f"INSERT INTO {table.name} ({', '.join(self.columns)}) VALUES ({', '.join(['?'] * len(self.columns))})"
+
+    def _insert_postgres(self, connection: Connection, table: Table, batches: Iterator[pa.RecordBatch]) -> int:
+        import pyarrow.csv as pacsv
+
+        copy_sql = f"COPY {table.name} ({', '.join(self.columns)}) FROM STDIN WITH (FORMAT csv)"
+        options = pacsv.WriteOptions(include_header=False)
+        rows = 0
+        cursor = connection.connection.cursor()
+        for batch in batches:
+            buffer = io.BytesIO()
+            pacsv.write_csv(batch, buffer, options)
+            buffer.seek(0)
+            if hasattr(cursor, 'copy_expert'):  # psycopg2
+                cursor.copy_expert(copy_sql, buffer)
+            else:  # psycopg 3
+                with cursor.copy(copy_sql) as copy:
+                    copy.write(buffer.getvalue())
+            rows += batch.num_rows
+        return rows
+
+    def _insert_mssql(self, connection: Connection, table: Table, batches: Iterator[pa.RecordBatch]) -> int:
+        rows = 0
+        cursor = connection.connection.cursor()
+        cursor.fast_executemany = True
+        sql = self._insert_sql(table)
+        for batch in batches:
+            cursor.executemany(sql, _rows(batch, self.columns))
+            rows += batch.num_rows
+        return rows
+
+    def _insert_sqlite(self, connection: Connection, table: Table, batches: Iterator[pa.RecordBatch]) -> int:
+        rows = 0
+        cursor = connection.connection.cursor()
+        sql = self._insert_sql(table)
+        for batch in batches:
+            cursor.executemany(sql, _rows(_as_text(batch), self.columns))
+            rows += batch.num_rows
+        return rows
+
+    def _insert_generic(self, connection: Connection, table: Table, batches: Iterator[pa.RecordBatch]) -> int:
+        rows = 0
+        for batch in batches:
+            connection.execute(table.insert(), batch.to_pylist())
+            rows += batch.num_rows
+        return rows
+
+    def _merge_sql(self, staging: Table) -> str:
+        '''
+            One statement from staging into the target, keyed on (scheme_code, date).
+            Duplicate keys inside the staging table collapse to the latest insert_date first.
+        '''
+        columns = ', '.join(self.columns)
+        key = ', '.join(NAV_KEY)
+        values = [name for name in self.columns if name not in NAV_KEY]
+        source = (
+            f'SELECT {columns} FROM ('
+            f'SELECT {columns}, ROW_NUMBER() OVER (PARTITION BY {key} ORDER BY insert_date DESC) AS row_rank '
+            f'FROM {staging.name}) ranked WHERE row_rank = 1'
+        )
+
+        if self.dialect in ('postgresql', 'sqlite'):
+            distinct = 'IS DISTINCT FROM' if self.dialect == 'postgresql' else 'IS NOT'
+            return (
+                f'INSERT INTO {self.table} ({columns}) {source} '
+                f'ON CONFLICT ({key}) DO UPDATE SET '
+                + ', '.join(f'{name} = excluded.{name}' for name in values)
+                + f' WHERE {self.table}.nav {distinct} excluded.nav'
+            )
+
+        if self.dialect == 'mysql':
+            # nav is assigned last : the other columns compare against the row's current nav
+            assigned = sorted(values, key=lambda name: name == 'nav')
+            return (
+                f'INSERT INTO {self.table} ({columns}) {source} '
+                f'ON DUPLICATE KEY UPDATE '
+                + ', '.join(
+                    f'{name} = IF({self.table}.nav <=> VALUES(nav), {self.table}.{name}, VALUES({name}))'
+                    for name in assigned
+                )
+            )
+
+        if self.dialect == 'mssql':
+            match = ' AND '.join(f'target.{name} = source.{name}' for name in NAV_KEY)
+            return (
+                f'MERGE INTO {self.table} AS target USING ({source}) AS source ON {match} '
+                f'WHEN MATCHED AND target.nav <> source.nav THEN UPDATE SET '
+                + ', '.join(f'{name} = source.{name}' for name in values)
+                + f' WHEN NOT MATCHED THEN INSERT ({columns}) VALUES ('
+                + ', '.join(f'source.{name}' for name in self.columns)
+                + ');'
+            )
+
+        raise ValueError(f'Merge mode is not supported on {self.dialect!r}, expected one of {MERGE_DIALECTS}')
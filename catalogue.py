@@ -0,0 +1,145 @@
+#          _        _
+#  __ __ _| |_ __ _| |___  __ _ _  _ ___
+# / _/ _` |  _/ _` | / _ \/ _` | || / -_)
+# \__\__,_|\__\__,_|_\___/\__, |\_,_\___|
+#                         |___/
+#
+# Memoized mfapi scheme catalogue shared by every process and DAG task on the host.
+
+import os
+import json
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows : snapshot still works, refreshes are just not serialized
+    fcntl = None
+
+from logger import get_logger
+
+log = get_logger('SchemeCatalogue')
+
+
+class SchemeCatalogue:
+    '''
+        The `https://api.mfapi.in/mf` listing, fetched at most once per `ttl` seconds.
+
+        Lookup order : in-memory copy -> on-disk snapshot (by mtime) -> upstream.
+        Upstream refreshes are serialized with a lock file so concurrent DAG tasks
+        wait for the first one and then read its snapshot.
+
+        Indexed lookups :
+            - by_scheme_code(120503)
+            - by_isin('INF209K01YN0')  (growth or dividend reinvestment ISIN)
+    '''
+
+    ISIN_FIELDS = ('isinGrowth', 'isinDivReinvestment')
+
+    def __init__(self, fetch: Callable[[], List[Dict]], snapshot_path: str, ttl: float = 21600):
+        self.fetch = fetch
+        self.snapshot_path = snapshot_path
+        self.ttl = ttl
+        self._entries: Optional[List[Dict]] = None
+        self._loaded_at: float = 0.0
+        self._by_code: Dict[int, Dict] = {}
+        self._by_isin: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _snapshot_age(self) -> float:
+        try:
+            return time.time() - os.path.getmtime(self.snapshot_path)
+        except OSError:
+            return float('inf')
+
+    @contextmanager
+    def _refresh_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(f'{self.snapshot_path}.lock', 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_snapshot(self) -> List[Dict]:
+        with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_snapshot(self, entries: List[Dict]) -> None:
+        temp_path = f'{self.snapshot_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f)
+        os.replace(temp_path, self.snapshot_path)
+
+    def _index(self, entries: List[Dict]) -> None:
+        self._entries = entries
+        self._loaded_at = time.time()
+        self._by_code = {
+            int(doc['schemeCode']): doc
+            for doc in entries
+            if doc.get('schemeCode')
+        }
+        self._by_isin = {
+            doc[field]: doc
+            for doc in entries
+            for field in self.ISIN_FIELDS
+            if doc.get(field)
+        }
+
+    def entries(self, refresh: bool = False) -> List[Dict]:
+        '''
+            The whole catalogue, from the cheapest source that is still within `ttl`.
+        '''
+        with self._lock:
+            if not refresh and self._entries is not None and time.time() - self._loaded_at < self.ttl:
+                return self._entries
+
+            with self._refresh_lock():
+                if not refresh and self._snapshot_age() < self.ttl:
+                    try:
+                        self._index(self._read_snapshot())
+                        log.debug(f'Scheme catalogue served from {self.snapshot_path}')
+                        return self._entries
+                    except (OSError, ValueError):
+                        pass
+
+                entries = self.fetch()
+                self._write_snapshot(entries)
+                self._index(entries)
+                log.info(f'Scheme catalogue refreshed : {len(entries)} schemes')
+                return self._entries
+
+    def scheme_codes(self) -> List[int]:
+        self.entries()
+        return list(self._by_code)
+
+    def by_scheme_code(self, scheme_code) -> Optional[Dict]:
+        self.entries()
+        return self._by_code.get(int(scheme_code))
+
+    def by_isin(self, isin: str) -> Optional[Dict]:
+        self.entries()
+        return self._by_isin.get(isin)
+
+
+_catalogue: Optional[SchemeCatalogue] = None
+
+
+def get_scheme_catalogue(fetch: Callable[[], List[Dict]]) -> SchemeCatalogue:
+    '''
+        Process wide catalogue, CATALOGUE_SNAPSHOT picks the snapshot file and CATALOGUE_TTL its lifetime.
+    '''
+    global _catalogue
+    if _catalogue is None:
+        _catalogue = SchemeCatalogue(
+            fetch,
+            snapshot_path=os.environ.get('CATALOGUE_SNAPSHOT') or os.path.join(tempfile.gettempdir(), 'mfapi_catalogue.json'),
+            ttl=float(os.environ.get('CATALOGUE_TTL', 21600)),
+        )
+    return _catalogue
@@ -9,9 +9,70 @@
 # Mixin to add to handle Dates                     
                     
 
-from functools import singledispatch
+import os
+from functools import singledispatch, lru_cache
 from datetime import datetime, date
-from typing import Union
+from typing import Iterable, Union
+
+import numpy as np
+
+DATE_CACHE_SIZE = int(os.environ.get('DATE_CACHE_SIZE', 65536))
+
+# 'DD-MM-YYYY' character positions rearranged into 'YYYY-MM-DD'
+_ISO_ORDER = [6, 7, 8, 9, 2, 3, 4, 5, 0, 1]
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_date(arg: str) -> date:
+	"""
+		Memoized 'DD-MM-YYYY' parsing, NAV histories repeat the same few thousand dates.
+	"""
+	return datetime.strptime(arg, "%d-%m-%Y").date()
+
+def _to_day(iso: str) -> np.datetime64:
+	"""
+		One 'YYYY-MM-DD' string into datetime64[D], NaT when it is not a valid date.
+	"""
+	try:
+		return np.datetime64(iso, 'D')
+	except ValueError:
+		return np.datetime64('NaT', 'D')
+
+def parse_dates(values: Iterable[str], errors: str = 'raise') -> np.ndarray:
+	"""
+		Parse a whole batch of 'DD-MM-YYYY' strings into datetime64[D] in one go.
+		Anything that is not a valid 'DD-MM-YYYY' date raises ValueError with errors='raise' (the default),
+		or becomes NaT with errors='coerce' : NaT compares False, so cutoff filters drop those rows.
+	"""
+	if errors not in ('raise', 'coerce'):
+		raise ValueError(f"errors must be 'raise' or 'coerce', got {errors!r}")
+
+	# U11 keeps one extra character, so a longer string shows up instead of being truncated to 10
+	strings = np.asarray(list(values) if not isinstance(values, np.ndarray) else values, dtype='U11')
+	if strings.size == 0:
+		return np.empty(strings.shape, dtype='datetime64[D]')
+
+	chars = strings.reshape(-1, 1).view('U1')
+	malformed = (chars[:, 10] != '') | (chars[:, :10] == '').any(axis=1) \
+		| (chars[:, 2] != '-') | (chars[:, 5] != '-')
+	if errors == 'raise' and malformed.any():
+		raise ValueError("Dates must be formatted as 'DD-MM-YYYY'")
+
+	iso = np.ascontiguousarray(chars[:, _ISO_ORDER]).view('U10').ravel()
+	iso[malformed] = 'NaT'
+	try:
+		parsed = iso.astype('datetime64[D]')
+	except ValueError:  # well formed but not a date, e.g. '31-02-2025'
+		if errors == 'raise':
+			raise
+		parsed = np.array([_to_day(value) for value in iso], dtype='datetime64[D]')
+	return parsed.reshape(strings.shape)
+
+def day_gaps(values: Iterable[str], today: date = None) -> np.ndarray:
+	"""
+		Days between each 'DD-MM-YYYY' string and today, for all values in a single vectorized call.
+	"""
+	today = np.datetime64(today or date.today(), 'D')
+	return (today - parse_dates(values)).astype(np.int64)
 
 @singledispatch
 def _serialize(arg):
@@ -32,7 +93,7 @@ def _(arg: str) -> date:
 	"""
 		If the input is a string 'DD-MM-YYYY', parse it back into a date.
 	"""
-	return datetime.strptime(arg, "%d-%m-%Y").date()
+	return _parse_date(arg)
 
 class DateTimeMixin:
 	
@@ -47,8 +108,33 @@ class DateTimeMixin:
 	def serialize(arg):
 		"""
 			Delegates to the module-level singledispatch function `_serialize`.
+			Strings skip the dispatch and hit the parse cache directly.
 		"""
+		if type(arg) is str:
+			return _parse_date(arg)
 		return _serialize(arg)
+
+	@staticmethod
+	def parse_dates(values: Iterable[str], errors: str = 'raise') -> np.ndarray:
+		"""
+			Batch version of `serialize` for strings, returns datetime64[D].
+			errors='coerce' turns malformed dates into NaT instead of raising ValueError.
+		"""
+		return parse_dates(values, errors)
+
+	@staticmethod
+	def day_gaps(values: Iterable[str]) -> np.ndarray:
+		"""
+			Batch version of `day_gap`, relative to `DateTimeMixin.today()`.
+		"""
+		return day_gaps(values, today=DateTimeMixin.today())
+
+	@staticmethod
+	def date_cache_info():
+		"""
+			Hit / miss counters of the scalar parse cache.
+		"""
+		return _parse_date.cache_info()
 	
 	@staticmethod
 	def is_past(value) -> bool :
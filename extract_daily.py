@@ -12,25 +12,32 @@
 
 import json 
 import os
+
 from datetime import datetime
 
+import numpy as np
+
 from .extract_historical_data import MFHistoricalActuals
 from .metadata import MFMetaData
 from .base import BaseExtract 
 from .check import check_results, _remove_errors_from_load
+from .watermarks import WatermarkStore, SchemeDiff, diff_scheme_codes, ACTIVE, DORMANT
 
-from utilities import RequestMixin, MPTask, DateTimeMixin
+from utilities import RequestMixin, MPTask, HistoryTask, DailyBatchTask, DateTimeMixin, AsyncIngestionEngine
+from utilities.rate_limit import get_rate_limiter, log_rate_limit_stats
 from typing import List, Dict, Any
 
 from logger import get_logger 
 
 log = get_logger("Daily")
 
+DAILY_BATCH_SIZE = int(os.environ.get('DAILY_BATCH_SIZE', 100))  # schemes per worker task / output file
+
 class MFDaily(BaseExtract, MFMetaData, DateTimeMixin):
     '''
         Interface Class which is used to Handle Daily Mutual Fund Extracts.
     '''
-    def __init__(self, run_time_config_file: str, search_root: str = None):
+    def __init__(self, run_time_config_file: str, search_root: str = None, watermark_store: str = None):
 
         if os.path.isfile(run_time_config_file):
             self.config_path = run_time_config_file
@@ -55,6 +62,13 @@ class MFDaily(BaseExtract, MFMetaData, DateTimeMixin):
                 )
 
         self.config = self.config_path
+
+        # Watermarks live in SQLite (the source of truth), run_time_config.json is kept as an import / export shim :
+        # schemes added to the file by hand are merged in on every start, differing dates only warn.
+        store_path = watermark_store or os.environ.get('WATERMARK_STORE') \
+            or os.path.splitext(self.config_path)[0] + '.sqlite'
+        self.watermarks = WatermarkStore(store_path)
+        self.watermarks.merge_json(self.config_path)
         
     def open_file_get_contents(
             self,
@@ -74,28 +88,11 @@ class MFDaily(BaseExtract, MFMetaData, DateTimeMixin):
         indent: int = 2
     ) -> None:
         """
-            Open and update contents of the specified run-time configuration.
-            If writing the JSON fails, dump the `updates` dict to a temp/.txt file.
+            Upsert the changed watermarks in one transaction, then re-export the
+            run-time configuration atomically for readers of the JSON file.
         """
-        data = self.open_file_get_contents(self.config_path)
-        data.update(updates)
-        try:
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=indent)
-                f.write('\n')
-
-        except Exception as exc:
-            base_dir = os.path.dirname(self.config_path) or '.'
-            temp_dir = os.path.join(base_dir, 'temp')
-            os.makedirs(temp_dir, exist_ok=True)
-
-            timestamp = datetime.now().strftime('%Y%m%dT%H%M%SZ')
-            dump_path = os.path.join(temp_dir, f'updates_{timestamp}.txt')
-
-            with open(dump_path, 'w', encoding='utf-8') as tf:
-                tf.write(json.dumps(updates, indent=indent))
-                tf.write('\n')
-            raise
+        self.watermarks.upsert(updates)
+        self.watermarks.export_json(self.config_path, indent=indent)
 
     @staticmethod
     def list_difference(
@@ -103,27 +100,34 @@ class MFDaily(BaseExtract, MFMetaData, DateTimeMixin):
         list2: List
     ):
         '''
-            A helper to Compare to List
+            A helper to Compare to List, order of list1 is kept.
+        '''
+        exclude = set(list2)
+        return [item for item in list1 if item not in exclude]
+
+    def diff_schemes(self) -> SchemeDiff:
         '''
-        return [item for item in list1 if item not in list2]
+            Diff the upstream catalogue against the watermark store and record the outcome :
+            removed schemes go dormant (no longer scheduled), re-listed ones become active again.
+        '''
+        diff = diff_scheme_codes(
+            self.get_all_scheme_codes(),
+            active=self.watermarks.codes(ACTIVE),
+            dormant=self.watermarks.codes(DORMANT),
+        )
+        self.watermarks.apply_diff(diff)
+        log.info(
+            f'Schemes added : {len(diff.added)}, removed : {len(diff.removed)}, '
+            f'reactivated : {len(diff.reactivated)}'
+        )
+        return diff
     
     def check_for_new_scheme(self):
         '''
             Call Api and check runtime config for new Scheme Codes Availabe.
             hits endpoint : "https://api.mfapi.in/mf" to get all metadata
         '''
-
-        all_scheme_codes: List = self.get_all_scheme_codes()
-        current_codes : List = [
-            int(item) 
-            for item in list(
-                self.open_file_get_contents(self.config_path).keys()
-            )
-        ]
-        if diff := self.list_difference(all_scheme_codes,current_codes):
-            return diff
-        else:
-            return []
+        return sorted(self.diff_schemes().added)
 
     def get_data_after(self,
         json_obj: Dict[str, Any],
@@ -135,10 +139,15 @@ class MFDaily(BaseExtract, MFMetaData, DateTimeMixin):
         '''
         
         cutoff = self.serialize(cutoff_date) # single dispatch into datetime.date for comparision
-        filtered =  [
+        entries = json_obj.get('data', [])
+        dates = self.parse_dates([entry['date'] for entry in entries], errors='coerce') # one vectorized parse for the whole history
+        if malformed := int(np.isnat(dates).sum()):
+            log.warning(f"Skipping {malformed} NAVs with malformed dates for : {json_obj.get('meta', {}).get('scheme_code')}")
+        newer = dates > np.datetime64(cutoff, 'D') # NaT never passes the cutoff
+        filtered = [
             entry
-            for entry in json_obj.get('data', [])
-            if self.serialize(entry['date']) > cutoff # single dispatch into datetime.date for comparision
+            for entry, keep in zip(entries, newer)
+            if keep
         ]
         new_json : Dict = dict(json_obj)
         new_json["data"] = filtered # New Filtered Stuff for you! 
@@ -148,12 +157,16 @@ class MFDaily(BaseExtract, MFMetaData, DateTimeMixin):
     def extract_daily(
         self, 
         search_for_new_schemes : bool = True, 
-        threshold : int = 30
+        threshold : int = 30,
+        mode : str = 'process',
+        stream : bool = False
     ):
         '''
             The Daily Driver.
             if 'search_for_new_schemes' is True then look for new Mutual Funds and Load.
             else Start Daily Extracts.
+            'mode' picks the fetcher : 'process' (process pool) or 'async' (event loop).
+            'stream' parses full histories incrementally and stops at each scheme's watermark.
         '''
 
         if search_for_new_schemes:
@@ -163,80 +176,86 @@ class MFDaily(BaseExtract, MFMetaData, DateTimeMixin):
 
                 check_results(results) # Check this Actuals and Raise Error : NO
 
-                updates = {}
-                for key, value in results.items():
-                    updates[key] = value.get('date')
+                updates, inactive = {}, {}
+                for key, value in _remove_errors_from_load(results).items():
+                    if value.get('date') == 'no need': # no recent NAV : stored dormant so the next search skips it
+                        inactive[key] = value.get('last_date')
+                    else:
+                        updates[key] = value.get('date')
+                if inactive:
+                    self.watermarks.upsert(inactive, status=DORMANT)
+                    log.info(f'Recorded {len(inactive)} inactive schemes as dormant')
                 self.update_file_contents(updates)
 
         else:
-            scheme_data = self.open_file_get_contents(self.config_path)
+            scheme_data = self.watermarks.get_all()
             
-            required_schemes = {
-
-                scheme_code : self.day_gap(latest_update_date)
-                    for scheme_code, latest_update_date in scheme_data.items() 
-                    if self.day_gap(latest_update_date) <= threshold
-            }  # Get Required Schemes based on threshold.
+            required_schemes = self.watermarks.schemes_with_gap(threshold, today=self.today())  # Get Required Schemes based on threshold.
 
             error_flag = []
 
-            tasks: List[MPTask] = [
-                MPTask(
-                    base_url=self.BASE_URL, 
-                    scheme_code=code, 
-                    latest=latest_flags
+            schemes = [
+                (code, scheme_data[code], day == 1)
+                for code, day in required_schemes.items()
+            ] # (scheme_code, cutoff, latest) per scheme
+
+            insert_date = datetime.now() # one load timestamp for every row of the run
+            get_rate_limiter(self.BASE_URL).reset()
+            if mode == 'async':
+                tasks: List[MPTask] = [
+                    HistoryTask(base_url=self.BASE_URL, scheme_code=code, cutoff=cutoff)
+                    if stream and not latest else
+                    MPTask(base_url=self.BASE_URL, scheme_code=code, latest=latest)
+                    for code, cutoff, latest in schemes
+                ]
+                fetched = AsyncIngestionEngine().run(tasks)
+                results = {
+                    'async': RequestMixin.write_daily_batch(
+                        ((code, fetched.pop(code), cutoff) for code, cutoff, _ in schemes),
+                        insert_date
+                    )
+                }
+            else:
+                batches: List[DailyBatchTask] = [
+                    DailyBatchTask(
+                        base_url=self.BASE_URL,
+                        batch_id=f'batch_{index // DAILY_BATCH_SIZE}',
+                        schemes=tuple(schemes[index:index + DAILY_BATCH_SIZE]),
+                        stream=stream,
+                        insert_date=insert_date
+                    )
+                    for index in range(0, len(schemes), DAILY_BATCH_SIZE)
+                ] # Each Worker fetches, filters, normalizes and writes its own batch
+                results = self.Extract_Tasks(
+                    tasks=batches,
+                    type_of_worker = RequestMixin._mp_worker_daily
                 )
-                for code, latest_flags in 
-                    {
-                        intermediate : day == 1
-                        for intermediate, day in required_schemes.items()
-                    }.items()
-            ] # Prepare Tasks to Execute in Workers
-
-            results = self.Extract_Tasks(
-                tasks=tasks,
-                type_of_worker = RequestMixin._mp_worker
-            )
+            log_rate_limit_stats(self.BASE_URL)
 
             log.separator()
             log.alert('Starting Result Checking')
 
             if errors := check_results(results):
                 error_flag.append(errors)
-                results = _remove_errors_from_load(results)   # Remove Errored Results from Results 
-
-            ready_to_submit = []
-
+                results = _remove_errors_from_load(results)   # Remove Errored Batches from Results 
 
-            for key,value in results.items():
-                _data = self.get_data_after(value,scheme_data[key])
-                if _data_key := _data.get('data'):
-                    ready_to_submit.append(self.get_data_after(value,scheme_data[key]))
-                else:
+            merged = {}
+            scheme_errors = {}
+            for batch_id, manifest in results.items():
+                log.info(f"Task {batch_id} Processed {manifest['rows']} records up to {manifest['max_date']} : {manifest['path']}")
+                for key in manifest['empty']:
                     log.warning(f'Empty Data for : {key}')
-            
-            log.separator()
+                for key, rows in manifest['malformed'].items():
+                    log.warning(f'Skipped {rows} NAVs with malformed dates for : {key}')
+                scheme_errors.update(manifest['errors'])
+                merged.update(manifest['watermarks'])
+
+            if errors := check_results(scheme_errors):
+                error_flag.append(errors)
 
             log.separator()
-            if ready_to_submit:
-                results = self.Dump_Tasks(ready_to_submit)
-
-                for uuid, items in results.items():
-                    log.info(f'Task {uuid} Processed {len(items)} records')
-                    
-                if errors := check_results(results):
-                    error_flag.append(errors)
-                    results = _remove_errors_from_load(results)
-                
-                merged = {}
-                for inner in results.values():
-                    merged.update(inner)
-
-                self.update_file_contents(
-                    {
-                        str(key):value for key,value in merged.items()
-                    }
-                )
+            if merged:
+                self.update_file_contents(merged)
                 print(error_flag)
                 if error_flag:
                     raise Exception('Data Extraction Failed')
@@ -246,5 +265,3 @@ class MFDaily(BaseExtract, MFMetaData, DateTimeMixin):
                 log.alert('No Updated Data Found')
             
             log.separator()
-
-
@@ -9,10 +9,18 @@
 # (_{;}_)|   | |   |  \       /    (_I_)    '. \_/``".'  |  |  \    / \      /       
 # '(_,_) '---' '---'   `-...-'     '---'      '-----'    ''-'   `'-'   `-..-'        
                                                                                    
-from typing import List
+import os
+import uuid
+from datetime import datetime
+from typing import Dict, List
 
 from .metadata import MFMetaData
 from .base import BaseExtract
+from .check import check_results, _remove_errors_from_load
+
+from utilities import RequestMixin, HistoricalBatchTask
+from utilities.historical_writer import HISTORICAL_BUCKETS, bucket_of, metadata_path
+from utilities.parquet_profile import metadata_table, write_parquet
 
 from logger import get_logger
 
@@ -24,14 +32,69 @@ class MFHistoricalActuals(MFMetaData, BaseExtract):
         Historical Data Extraction for all Scheme Codes / Specified Codes.
     '''
     
-    def Extract_All_Data(self, scheme_codes : List = [], latest_flags : bool = False):
+    def Extract_All_Data(self, scheme_codes : List = [], latest_flags : bool = False, consolidated : bool = False):
         '''
             Start Extrating All the Data for Scheme Codes provided.
+            'consolidated' writes a few bucketed parquet files and one metadata table per run
+            instead of two small files per scheme.
         '''
         log.separator()
         log.alert('Running historical Extracts\n')
         log.info('attempting to extract all the Historical Data and Attepting to load into database')
         log.separator()
+        if consolidated:
+            return self.extract_consolidated(scheme_codes)
         return super().Extract_All_Data(scheme_codes, latest_flags)
+
+    def extract_consolidated(
+        self,
+        scheme_codes : List = [],
+        buckets : int = HISTORICAL_BUCKETS,
+        root : str = None
+    ) -> Dict:
+        '''
+            Historical load partitioned by scheme code bucket : one worker and one file per bucket,
+            NAV rows buffered into large row groups. Returns the per scheme results like `Extract_All_Data`.
+        '''
+        root = root or os.environ.get('HISTORICAL_OUTPUT_DIR', '.')
+        run_id = uuid.uuid4().hex
+        insert_date = datetime.now() # one load timestamp for every bucket of the run
+        scheme_codes = scheme_codes or self.get_all_scheme_codes()
+
+        grouped: Dict[int, List[str]] = {}
+        for code in scheme_codes:
+            grouped.setdefault(bucket_of(code, buckets), []).append(str(code))
+
+        tasks = [
+            HistoricalBatchTask(
+                base_url=self.BASE_URL,
+                run_id=run_id,
+                bucket=bucket,
+                scheme_codes=tuple(codes),
+                root=root,
+                insert_date=insert_date
+            )
+            for bucket, codes in sorted(grouped.items())
+        ]
+        manifests = self.Extract_Tasks(tasks=tasks, type_of_worker=RequestMixin._mp_worker_historical)
+
+        results, metadata = {}, []
+        if errors := check_results(manifests):
+            manifests = _remove_errors_from_load(manifests)
+            for bucket in errors:
+                results.update({code: errors[bucket] for code in grouped[bucket]})
+
+        for bucket, manifest in sorted(manifests.items()):
+            log.info(f"Bucket {bucket:03d} : {manifest['rows']} rows in {manifest['row_groups']} row groups -> {manifest['path']}")
+            results.update(manifest['results'])
+            metadata.extend(manifest['metadata'])
+
+        if metadata:
+            path = metadata_path(root, run_id)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_parquet(metadata_table(metadata), path)
+            log.info(f'Metadata for {len(metadata)} schemes -> {path}')
+
+        return results
     
 
@@ -1,64 +1,118 @@
 
 
+from typing import Dict, List, Tuple, Union
+
 from .metadata import MFMetaData
 from .base import BaseExtract
 from .check import check_results, check_results_kuvera, _remove_errors_from_load_kuvera
 
 from utilities.api import KuveraTask, RequestMixin
+from utilities.async_engine import AsyncIngestionEngine
+from utilities.rate_limit import get_rate_limiter, log_rate_limit_stats
 from logger import get_logger
 log = get_logger('KuveraPortfolioInformation')
 
+KUVERA_TYPES = ('isinGrowth', 'isinDivReinvestment')
+
 class KuveraPortfolioInformation(MFMetaData, RequestMixin, BaseExtract):
 
+    @staticmethod
+    def _resolve_types(types: Union[str, List[str]]) -> List[str]:
+        '''
+            'all' -> every ISIN type, 'isinGrowth,isinDivReinvestment' -> both, else the single type.
+            Raises ValueError on a type name Kuvera does not know.
+        '''
+        if isinstance(types, str):
+            types = KUVERA_TYPES if types == 'all' else types.split(',')
+        types = [item.strip() for item in types if item.strip()]
+        if unknown := [item for item in types if item not in KUVERA_TYPES]:
+            raise ValueError(f"Unknown Kuvera type(s) {', '.join(unknown)}, expected 'all' or any of {', '.join(KUVERA_TYPES)}")
+        if not types:
+            raise ValueError(f"No Kuvera type given, expected 'all' or any of {', '.join(KUVERA_TYPES)}")
+        return types
+
+    def build_isin_targets(self, types: List[str]) -> Dict[str, List[Tuple[str, str]]]:
+        '''
+            One entry per distinct ISIN across every requested type :
+                isin -> [(scheme_code, type_code), ...]
+            so ISINs shared between schemes or types are fetched once.
+        '''
+        targets: Dict[str, List[Tuple[str, str]]] = {}
+        for item in self.filter_available_isn():
+            for type_code in types:
+                if isin := item.get(type_code):
+                    targets.setdefault(isin, []).append((item.get('schemeCode'), type_code))
+        return targets
+
     def start_extract_kuvera(
         self,
-        types : str = 'isinDivReinvestment' 
+        types : Union[str, List[str]] = 'isinDivReinvestment',
+        mode : str = 'process'
     ): 
         '''
             Hit Kuvera api to search type as :
             1. isinDivReinvestment : Hits and searches isn availabe in mf api where there is a valid isn
             2. isinGrowth : Hits and searches isn availabe in mf api where there is a valid isn
+            3. all (or a comma separated list) : every type in a single pass
+
+            Each distinct ISIN is fetched once and fanned out to every (scheme_code, type_code) using it,
+            the whole run lands in one consolidated parquet.
+
+            'mode' picks the fetcher : 'process' (process pool) or 'async' (event loop).
         '''
         error_flag = []
+        types = self._resolve_types(types)
         log.separator()
+
+        targets = self.build_isin_targets(types)
         task_to_submit = [
             KuveraTask(
                 base_url=self.KUVERA_BASE_URL,
-                scheme_code = item.get('schemeCode'),
-                isn = item.get(types),
-                type_code= types
+                isin = isin,
+                type_code= users[0][1]
             )
-            for item in self.filter_available_isn()
-            if item.get(types) 
-        ]
-        task_to_submit = [
-            item for item in task_to_submit
-            if item.isn 
+            for isin, users in targets.items()
         ]
 
-        log.start(f'Submit Processing of {len(task_to_submit)} in Executor.\n')   
+        log.start(
+            f'Submit Processing of {len(task_to_submit)} distinct ISINs '
+            f'for {sum(len(users) for users in targets.values())} scheme / type pairs ({", ".join(types)}) in Executor.\n'
+        )   
         log.separator()
 
-        results =  self.Extract_Tasks(
-            tasks=task_to_submit,
-            type_of_worker= RequestMixin._mp_worker_kuvera
-        )
+        get_rate_limiter(self.KUVERA_BASE_URL).reset()
+        if mode == 'async':
+            results = AsyncIngestionEngine().run(task_to_submit)
+        else:
+            results =  self.Extract_Tasks(
+                tasks=task_to_submit,
+                type_of_worker= RequestMixin._mp_worker_kuvera
+            )
+        log_rate_limit_stats(self.KUVERA_BASE_URL)
 
         if errors := check_results_kuvera(results):
             error_flag.append(errors)
             results = _remove_errors_from_load_kuvera(results)   # Remove Errored Results from Results 
-        
-        ready_to_submit = [
-            item
-            for code, item in results.items()
-        ]
+
+        ready_to_submit = []
+        for isin, payload in results.items():
+            if not isinstance(payload, dict):
+                log.warning(f'Kuvera returned {payload} for : {isin}')
+                continue
+            for scheme_code, type_code in targets.get(isin, []):
+                ready_to_submit.append({
+                    **payload,
+                    'scheme_code': scheme_code,
+                    'isin': isin,
+                    'type_code': type_code
+                })
+
         if ready_to_submit:
             log.separator()
             log.start(f'Submit Objects {len(ready_to_submit)} to Database')
-            results = self.Dump_Tasks(
-                ready_to_submit,
-                type_of_worker=RequestMixin._mp_worker_db_dump_kuvera
-            )
+            results = {
+                'consolidated': RequestMixin._mp_worker_db_dump_kuvera(ready_to_submit)
+            }
 
             if errors := check_results(results):
                 error_flag.append(errors)
@@ -73,7 +127,3 @@ class KuveraPortfolioInformation(MFMetaData, RequestMixin, BaseExtract):
 
         else:
             log.alert('No Valid Data to Submit in Database')
-
-
-
-
@@ -0,0 +1,92 @@
+#  _    _    _           _         _
+# | |_ (_)__| |_ ___ _ _(_)__ __ _| |
+# | ' \| (_-<  _/ _ \ '_| / _/ _` | |
+# |_||_|_/__/\__\___/_| |_\__\__,_|_|
+#
+# Consolidated parquet output for historical loads : few large files, well sized row groups.
+
+import os
+from typing import List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .parquet_profile import NAV_SORT_KEYS, ParquetProfile, conform_nav, get_parquet_profile
+
+HISTORICAL_BUCKETS = int(os.environ.get('HISTORICAL_BUCKETS', 16))
+HISTORICAL_ROW_GROUP_ROWS = int(os.environ.get('HISTORICAL_ROW_GROUP_ROWS', 1 << 20))
+
+
+def bucket_of(scheme_code, buckets: int = HISTORICAL_BUCKETS) -> int:
+    '''
+        Stable scheme code -> bucket assignment, the same code always lands in the same partition.
+    '''
+    return int(scheme_code) % buckets
+
+
+def bucket_path(root: str, run_id: str, bucket: int) -> str:
+    return os.path.join(root, 'historicaldata', 'neededdata', f'run_id={run_id}', f'bucket={bucket:03d}', 'part-0.parquet')
+
+
+def metadata_path(root: str, run_id: str) -> str:
+    return os.path.join(root, 'historicaldata', 'metadata', f'mf_historical_metadata_{run_id}.parquet')
+
+
+class BufferedParquetWriter:
+    '''
+        Accumulates small per-scheme NAV tables and writes them as row groups of at least
+        `row_group_rows` rows, each sorted by (scheme_code, date), into a single parquet file
+        laid out by the parquet profile. The file is only created once there is something to write.
+
+            with BufferedParquetWriter(path) as writer:
+                for table in tables:
+                    writer.write(table)
+    '''
+
+    def __init__(self, path: str, row_group_rows: int = HISTORICAL_ROW_GROUP_ROWS, profile: ParquetProfile = None):
+        self.path = path
+        self.row_group_rows = row_group_rows
+        self.profile = profile or get_parquet_profile()
+        self.rows = 0
+        self.row_groups = 0
+        self._buffer: List[pa.Table] = []
+        self._buffered = 0
+        self._writer: Optional[pq.ParquetWriter] = None
+
+    def write(self, table: pa.Table) -> None:
+        if not table.num_rows:
+            return
+        self._buffer.append(table)
+        self._buffered += table.num_rows
+        if self._buffered >= self.row_group_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        table = conform_nav(pa.concat_tables(self._buffer), self.profile).combine_chunks()
+        if self._writer is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._writer = pq.ParquetWriter(
+                self.path, table.schema, **self.profile.writer_options(table.schema, NAV_SORT_KEYS)
+            )
+        self._writer.write_table(table, row_group_size=table.num_rows)
+        self.rows += table.num_rows
+        self.row_groups += 1
+        self._buffer, self._buffered = [], 0
+
+    def close(self) -> Optional[str]:
+        '''
+            Flush what is left, returns the file path or None when nothing was written.
+        '''
+        self.flush()
+        if self._writer is None:
+            return None
+        self._writer.close()
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,185 @@
+#  _   _   _                     _
+# | |_| |_| |_ _ __   __ __ _ __| |_  ___
+# | ' \  _|  _| '_ \ / _/ _` / _| ' \/ -_)
+# |_||_\__|\__| .__/ \__\__,_\__|_||_\___|
+#             |_|
+#
+# Content addressed on-disk cache for API responses, revalidated with conditional GETs.
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, NamedTuple, Optional
+
+from logger import get_logger
+
+log = get_logger('ResponseCache')
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS responses (
+        url           TEXT PRIMARY KEY,
+        digest        TEXT NOT NULL,
+        size          INTEGER NOT NULL,
+        etag          TEXT,
+        last_modified TEXT,
+        stored_at     REAL NOT NULL,
+        last_access   REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+    CREATE INDEX IF NOT EXISTS responses_digest ON responses (digest);
+"""
+
+
+class CacheEntry(NamedTuple):
+    """
+        One cached response.
+
+        - url: the request url, the cache key
+        - digest: sha256 of the body, names the object file
+        - etag / last_modified: validators for the conditional GET
+        - stored_at: epoch seconds of the last 200 / 304 from upstream
+    """
+    url: str
+    digest: str
+    size: int
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+
+
+class ResponseCache:
+    '''
+        Bodies live under `objects/<aa>/<sha256>` so identical payloads are stored once,
+        a SQLite index maps url -> body digest + validators + last access for LRU eviction.
+
+        Safe to share between the processes of a pool and between DAG tasks on one host,
+        each thread gets its own index connection so the asyncio engine can call it from `asyncio.to_thread`.
+    '''
+
+    def __init__(self, root: str, max_bytes: int = 1 << 30, max_age: float = 3600):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+        self._local = threading.local()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        local = self._local
+        if getattr(local, 'conn', None) is None or local.pid != os.getpid():
+            conn = sqlite3.connect(os.path.join(self.root, 'index.sqlite'), timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            local.conn, local.pid = conn, os.getpid()
+        return local.conn
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, 'objects', digest[:2], digest)
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        row = self.conn.execute(
+            'SELECT url, digest, size, etag, last_modified, stored_at FROM responses WHERE url = ?',
+            (url,)
+        ).fetchone()
+        if row and os.path.exists(self._object_path(row[1])):
+            return CacheEntry(*row)
+        return None
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        '''
+            Young enough to be served without asking upstream.
+        '''
+        return time.time() - entry.stored_at < self.max_age
+
+    @staticmethod
+    def conditional_headers(entry: Optional[CacheEntry]) -> Dict[str, str]:
+        headers = {}
+        if entry and entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry and entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def load(self, entry: CacheEntry) -> bytes:
+        self.conn.execute('UPDATE responses SET last_access = ? WHERE url = ?', (time.time(), entry.url))
+        with open(self._object_path(entry.digest), 'rb') as f:
+            return f.read()
+
+    def revalidated(self, entry: CacheEntry) -> bytes:
+        '''
+            Upstream answered 304, restart the freshness clock and serve the stored body.
+        '''
+        self.conn.execute('UPDATE responses SET stored_at = ? WHERE url = ?', (time.time(), entry.url))
+        return self.load(entry)
+
+    def store(self, url: str, body: bytes, headers) -> None:
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f'{path}.{os.getpid()}.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(body)
+            os.replace(temp_path, path)
+
+        now = time.time()
+        self.conn.execute(
+            'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (url, digest, len(body), headers.get('ETag'), headers.get('Last-Modified'), now, now)
+        )
+        self.evict()
+
+    def total_bytes(self) -> int:
+        return self.conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM responses)'
+        ).fetchone()[0]
+
+    def evict(self) -> int:
+        '''
+            Drop least recently used urls until the distinct bodies fit in `max_bytes`.
+        '''
+        total = self.total_bytes()
+        evicted = 0
+        if total <= self.max_bytes:
+            return evicted
+
+        rows = self.conn.execute('SELECT url, digest, size FROM responses ORDER BY last_access').fetchall()
+        for url, digest, size in rows:
+            if total <= self.max_bytes:
+                break
+            self.conn.execute('DELETE FROM responses WHERE url = ?', (url,))
+            evicted += 1
+            shared = self.conn.execute('SELECT 1 FROM responses WHERE digest = ? LIMIT 1', (digest,)).fetchone()
+            if not shared:
+                total -= size
+                try:
+                    os.remove(self._object_path(digest))
+                except FileNotFoundError:
+                    pass
+
+        log.debug(f'Evicted {evicted} cached responses, {total} bytes kept')
+        return evicted
+
+
+_cache = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    '''
+        The process wide cache, enabled by setting HTTP_CACHE_DIR.
+        HTTP_CACHE_MAX_BYTES bounds the disk usage, HTTP_CACHE_MAX_AGE is how long (seconds)
+        a body is served without a conditional GET.
+    '''
+    global _cache
+    root = os.environ.get('HTTP_CACHE_DIR')
+    if not root:
+        return None
+    if _cache is None or _cache.root != root:
+        _cache = ResponseCache(
+            root,
+            max_bytes=int(os.environ.get('HTTP_CACHE_MAX_BYTES', 1 << 30)),
+            max_age=float(os.environ.get('HTTP_CACHE_MAX_AGE', 3600)),
+        )
+    return _cache
@@ -0,0 +1,61 @@
+#  _   _   _                        _
+# | |_| |_| |_ _ __   ___ ___ _____(_)___ _ _
+# | ' \  _|  _| '_ \ (_-</ -_|_-<_-< / _ \ ' \
+# |_||_\__|\__| .__/ /__/\___/__/__/_\___/_||_|
+#             |_|
+#
+# Pooled keep-alive HTTP sessions, one per worker process / event loop.
+
+import os
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Dict
+
+DEFAULT_HEADERS: Dict[str, str] = {
+    'Accept': 'application/json',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+# Per process session, re-created after fork so pooled sockets are never shared with the parent.
+_session = None
+_session_pid = None
+
+
+def pool_size() -> int:
+    '''
+        Connections kept open per host, from HTTP_POOL_SIZE.
+    '''
+    return int(os.environ.get('HTTP_POOL_SIZE', 16))
+
+
+def get_http_session() -> requests.Session:
+    '''
+        Lazily build the pooled `requests.Session` of this worker and reuse it for every task it runs.
+    '''
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size(), max_retries=0)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update(DEFAULT_HEADERS)
+        _session, _session_pid = session, os.getpid()
+    return _session
+
+
+def get_async_session(timeout: int = 10, limit: int = None):
+    '''
+        `aiohttp.ClientSession` with a keep-alive connector, meant to live for one event loop run.
+    '''
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(
+        limit=limit or pool_size(),
+        keepalive_timeout=float(os.environ.get('HTTP_KEEPALIVE', 30)),
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=timeout),
+        headers=DEFAULT_HEADERS,
+    )
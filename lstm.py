@@ -0,0 +1,146 @@
+#  _    _
+# | |__| |_ _ __
+# | (_-<  _| '  \
+# |_/__/\__|_|_|_|
+#
+# LSTM NAV forecaster : direct multi-horizon or compiled recursive forecasts, for one fund or a batch.
+
+from typing import NamedTuple, Sequence
+
+import numpy as np
+
+from .windowing import make_windows
+
+
+class LSTMConfig(NamedTuple):
+    '''
+        Hyperparameters of the dashboard LSTM, part of the model cache key.
+        `horizon` is the width of the output head : 1 predicts the next day and is
+        rolled forward, N > 1 predicts N days directly (rolled in blocks beyond N).
+    '''
+    look_back: int = 30
+    units: int = 50
+    epochs: int = 20
+    batch_size: int = 16
+    learning_rate: float = 0.01
+    horizon: int = 1
+
+
+def build_lstm(config: LSTMConfig):
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Input, LSTM, Dense
+    from tensorflow.keras.optimizers import Adam
+
+    model = Sequential()
+    model.add(Input(shape=(config.look_back, 1)))
+    model.add(LSTM(config.units, return_sequences=True))
+    model.add(LSTM(config.units))
+    model.add(Dense(config.horizon))
+    model.compile(loss='mean_squared_error', optimizer=Adam(learning_rate=config.learning_rate))
+    return model
+
+
+def _compiled_forecast(model, look_back: int, horizon: int):
+    '''
+        One traced graph for the whole forecast : `blocks` calls of the model on the batch,
+        each block shifted into the window in place of a numpy append per step.
+    '''
+    import tensorflow as tf
+
+    @tf.function(input_signature=[
+        tf.TensorSpec([None, look_back, 1], tf.float32),
+        tf.TensorSpec([], tf.int32),
+    ])
+    def run(window, blocks):
+        outputs = tf.TensorArray(tf.float32, size=blocks)
+        for block in tf.range(blocks):
+            predicted = model(window, training=False)  # (batch, horizon)
+            outputs = outputs.write(block, predicted)
+            window = tf.concat([window[:, horizon:, :], predicted[:, :, tf.newaxis]], axis=1)
+        stacked = tf.transpose(outputs.stack(), [1, 0, 2])  # (batch, blocks, horizon)
+        return tf.reshape(stacked, [tf.shape(window)[0], -1])
+
+    return run
+
+
+class TrainedLSTM:
+    '''
+        A fitted model together with the min / max scaling of the NAVs it was trained on :
+        scalars for a single fund, one (min, max) per row for a model trained on a batch of funds.
+    '''
+
+    def __init__(self, model, data_min, data_max, config: LSTMConfig):
+        self.model = model
+        self.data_min = np.asarray(data_min, dtype='float64')
+        self.data_max = np.asarray(data_max, dtype='float64')
+        self.config = config
+        self._forecast = None
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(weight.nbytes for weight in self.model.get_weights()))
+
+    def _span(self) -> np.ndarray:
+        span = self.data_max - self.data_min
+        return np.where(span == 0, 1.0, span)
+
+    def scale(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype='float64')
+        if self.data_min.ndim:  # per fund scaling, one row per fund
+            return (values - self.data_min[:, np.newaxis]) / self._span()[:, np.newaxis]
+        return (values - self.data_min) / self._span()
+
+    def unscale(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype='float64')
+        if self.data_min.ndim:
+            return values * self._span()[:, np.newaxis] + self.data_min[:, np.newaxis]
+        return values * self._span() + self.data_min
+
+    def predict_scaled(self, windows: np.ndarray, steps: int) -> np.ndarray:
+        '''
+            (batch, look_back) scaled windows -> (batch, steps) scaled forecasts, in one compiled call.
+        '''
+        if self._forecast is None:
+            self._forecast = _compiled_forecast(self.model, self.config.look_back, self.config.horizon)
+        blocks = -(-steps // self.config.horizon)
+        windows = np.ascontiguousarray(windows, dtype='float32')[..., np.newaxis]
+        return self._forecast(windows, np.int32(blocks)).numpy()[:, :steps]
+
+    def forecast(self, navs: Sequence[float], steps: int) -> np.ndarray:
+        '''
+            Next `steps` NAVs after `navs` (oldest first). A 2-D (funds, time) input of a
+            model trained on a batch forecasts every fund at once and returns (funds, steps).
+        '''
+        look_back = self.config.look_back
+        windows = self.scale(navs)[..., -look_back:]
+        if windows.ndim == 1:
+            return self.unscale(self.predict_scaled(windows[np.newaxis], steps)[0])
+        return self.unscale(self.predict_scaled(windows, steps))
+
+    def save(self, path: str) -> None:
+        self.model.save(path)
+
+    @classmethod
+    def load(cls, path: str, data_min, data_max, config: LSTMConfig) -> 'TrainedLSTM':
+        from tensorflow.keras.models import load_model
+
+        return cls(load_model(path), data_min, data_max, config)
+
+
+def train_lstm(navs: Sequence[float], config: LSTMConfig = LSTMConfig()) -> TrainedLSTM:
+    '''
+        Fit the LSTM on `navs` (oldest first), scaled to [0, 1]. A 2-D (funds, time) input
+        trains one shared model on the windows of every fund, each fund scaled on its own.
+    '''
+    navs = np.asarray(navs, dtype='float64')
+    if navs.shape[-1] < config.look_back + config.horizon:
+        raise ValueError(f'Need at least {config.look_back + config.horizon} NAVs to train, got {navs.shape[-1]}')
+
+    trained = TrainedLSTM(None, navs.min(axis=-1), navs.max(axis=-1), config)
+    X_train, y_train = make_windows(trained.scale(navs), config.look_back, config.horizon)
+    X_train = X_train.reshape(-1, config.look_back, 1)
+    y_train = y_train.reshape(-1, config.horizon)
+
+    trained.model = build_lstm(config)
+    trained.model.fit(X_train, y_train, epochs=config.epochs, batch_size=config.batch_size, verbose=0)
+    return trained
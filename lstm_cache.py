@@ -0,0 +1,207 @@
+#  _    _                      _
+# | |__| |_ _ __    __ __ _ __| |_  ___
+# | (_-<  _| '  \  / _/ _` / _| ' \/ -_)
+# |_/__/\__|_|_|_| \__\__,_\__|_||_\___|
+#
+# LRU cache of trained LSTM models keyed by scheme, training window and hyperparameters, persisted to disk.
+
+import os
+import glob
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+from .lstm import LSTMConfig, TrainedLSTM, train_lstm
+
+from logger import get_logger
+
+log = get_logger('LSTMCache')
+
+LSTM_CACHE_DIR = os.environ.get('LSTM_CACHE_DIR', 'model_cache')
+LSTM_CACHE_MAX_BYTES = int(os.environ.get('LSTM_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+CacheKey = Tuple[str, str, LSTMConfig]
+
+
+def cache_key(scheme_code, last_date: Union[str, date, datetime], config: LSTMConfig) -> CacheKey:
+    '''
+        (scheme_code, ISO date of the newest training NAV, hyperparameters).
+    '''
+    if isinstance(last_date, datetime):
+        last_date = last_date.date()
+    if isinstance(last_date, date):
+        last_date = last_date.isoformat()
+    return (str(scheme_code), str(last_date)[:10], LSTMConfig(*config))
+
+
+class LSTMModelCache:
+    '''
+        Trained models per (scheme_code, last training date, hyperparameters).
+
+        - in memory : LRU, evicted once the weights held exceed `max_bytes`
+        - on disk   : `<directory>/<scheme>-<digest>.keras` + a json sidecar with the scaling,
+                      so a restarted server loads weights instead of re-training. Older
+                      training dates of the same scheme and hyperparameters are pruned.
+        - stats()   : hits, disk loads, misses, evictions and time spent training
+
+            cache = LSTMModelCache()
+            model = cache.get_or_train(scheme_code, last_date, navs)
+            preds = model.forecast(navs, 30)
+
+        A new NAV day changes the key, so stale models age out of the LRU by themselves.
+    '''
+
+    def __init__(self, directory: Optional[str] = LSTM_CACHE_DIR, max_bytes: int = LSTM_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._models: 'OrderedDict[CacheKey, TrainedLSTM]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = dict(hits=0, disk_hits=0, misses=0, evictions=0, trainings=0, training_seconds=0.0)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    def _path(self, key: CacheKey) -> str:
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:20]
+        return os.path.join(self.directory, f'{key[0]}-{digest}')
+
+    def _remember(self, key: CacheKey, model: TrainedLSTM) -> None:
+        with self._lock:
+            if key in self._models:
+                self._bytes -= self._models.pop(key).nbytes
+            self._models[key] = model
+            self._bytes += model.nbytes
+            while self._bytes > self.max_bytes and len(self._models) > 1:
+                _, evicted = self._models.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self._stats['evictions'] += 1
+
+    def _load(self, key: CacheKey) -> Optional[TrainedLSTM]:
+        if not self.directory or not os.path.exists(f'{self._path(key)}.json'):
+            return None
+        try:
+            with open(f'{self._path(key)}.json', 'r', encoding='utf-8') as f:
+                sidecar = json.load(f)
+            return TrainedLSTM.load(f'{self._path(key)}.keras', sidecar['data_min'], sidecar['data_max'], key[2])
+        except Exception as e:
+            log.warning(f'Ignoring unreadable cached model for {key} : {e}')
+            return None
+
+    def _persist(self, key: CacheKey, model: TrainedLSTM) -> None:
+        path = self._path(key)
+        temp_model = f'{path}.{os.getpid()}.tmp.keras'  # keras picks the format from the extension
+        model.save(temp_model)
+        os.replace(temp_model, f'{path}.keras')
+        temp_path = f'{path}.json.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'scheme_code': key[0],
+                'last_date': key[1],
+                'config': key[2]._asdict(),
+                'data_min': model.data_min.tolist(),
+                'data_max': model.data_max.tolist(),
+            }, f)
+        os.replace(temp_path, f'{path}.json')  # the sidecar marks the weights as complete
+        self._prune(key)
+
+    def _prune(self, key: CacheKey) -> None:
+        '''
+            Keep only the newest training date on disk for this scheme and hyperparameters,
+            a new NAV day supersedes the older models so the directory stays one model per scheme and config.
+        '''
+        dated = []
+        for sidecar_path in glob.glob(os.path.join(self.directory, f'{glob.escape(key[0])}-*.json')):
+            try:
+                with open(sidecar_path, 'r', encoding='utf-8') as f:
+                    sidecar = json.load(f)
+            except Exception:
+                continue
+            if sidecar.get('scheme_code') == key[0] and sidecar.get('config') == key[2]._asdict():
+                dated.append((sidecar['last_date'], sidecar_path))
+
+        for _, sidecar_path in sorted(dated)[:-1]:
+            try:
+                os.remove(sidecar_path)  # sidecar first : weights without one are never loaded
+                os.remove(sidecar_path[:-len('.json')] + '.keras')
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                log.warning(f'Could not prune cached model {sidecar_path} : {e}')
+
+    def get(self, scheme_code, last_date, config: LSTMConfig = LSTMConfig()) -> Optional[TrainedLSTM]:
+        '''
+            Memory first, then disk. None on a miss.
+        '''
+        key = cache_key(scheme_code, last_date, config)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self._stats['hits'] += 1
+                return self._models[key]
+
+        model = self._load(key)
+        if model is not None:
+            self._remember(key, model)
+            with self._lock:
+                self._stats['disk_hits'] += 1
+        return model
+
+    def get_or_train(
+        self,
+        scheme_code,
+        last_date,
+        navs: Sequence[float],
+        config: LSTMConfig = LSTMConfig()
+    ) -> TrainedLSTM:
+        '''
+            The cached model for this key, training (and persisting) it on a miss.
+        '''
+        model = self.get(scheme_code, last_date, config)
+        if model is not None:
+            return model
+
+        key = cache_key(scheme_code, last_date, config)
+        started = time.perf_counter()
+        model = train_lstm(navs, key[2])
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._stats['misses'] += 1
+            self._stats['trainings'] += 1
+            self._stats['training_seconds'] += elapsed
+        log.info(f'Trained LSTM for {key[0]} up to {key[1]} in {elapsed:.1f}s')
+
+        if self.directory:
+            self._persist(key, model)
+        self._remember(key, model)
+        return model
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats['hits'] + stats['disk_hits'] + stats['misses']
+            stats.update(
+                models=len(self._models),
+                bytes=self._bytes,
+                hit_ratio=round((stats['hits'] + stats['disk_hits']) / lookups, 3) if lookups else 0.0,
+                training_seconds=round(stats['training_seconds'], 2),
+            )
+            return stats
+
+    def log_stats(self) -> Dict[str, object]:
+        '''
+            Log and return the cache metrics.
+        '''
+        stats = self.stats()
+        log.info(
+            f"LSTM cache : {stats['hits']} hits, {stats['disk_hits']} disk loads, {stats['misses']} misses "
+            f"(hit ratio {stats['hit_ratio']}), {stats['models']} models / {stats['bytes'] / 1024 / 1024:.1f} MiB, "
+            f"{stats['evictions']} evictions, {stats['training_seconds']}s training"
+        )
+        return stats
@@ -1,3 +1,4 @@
+import os
 import streamlit as st
 import pyodbc
 import pandas as pd
@@ -5,46 +6,90 @@ from sklearn.linear_model import LinearRegression
 import matplotlib.pyplot as plt
 import json
 import plotly.express as px
-from statsmodels.tsa.arima.model import ARIMA
+from forecasting.arima import ArimaForecaster
 import numpy as np
 from statsmodels.tsa.holtwinters import ExponentialSmoothing
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import MinMaxScaler
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense
-from tensorflow.keras.optimizers import Adam
+from forecasting.lstm import LSTMConfig
+from forecasting.lstm_cache import LSTMModelCache
+from forecasting.batch_forecast import read_forecasts
+from database.router import read_frame
+from sqlalchemy import create_engine
+from typing import NamedTuple
 
 
 # DB Fetch
-@st.cache_data
-def fetch_data(scheme_code):
-    conn = pyodbc.connect(
-        "DRIVER={SQL Server};"
-        "SERVER=mutual-fund-server-storage.database.windows.net;"
-        "DATABASE=MutualFundS;"
-        "UID=cdac;"
-        "PWD=Azure@123;"
+# ODBC connection string, e.g. "DRIVER={SQL Server};SERVER=<host>;DATABASE=<db>;UID=<user>;PWD=<password>;"
+DASHBOARD_CONNECTION_STRING = os.environ.get("DASHBOARD_CONNECTION_STRING")
+DASHBOARD_POOL_SIZE = int(os.environ.get("DASHBOARD_POOL_SIZE", 5))
+DASHBOARD_CACHE_TTL = int(os.environ.get("DASHBOARD_CACHE_TTL", 900))  # seconds, NAVs change once a day
+
+NAV_QUERY = "SELECT [date], [nav] FROM [dbo].[ActiveMutualFundsNavs] WHERE scheme_code = ? ORDER BY [date];"
+META_QUERY = "SELECT * FROM [Prod].[KuveraPortfolioExtractsInformation] WHERE scheme_code = ?;"
+
+
+class FundView(NamedTuple):
+    navs: pd.DataFrame
+    meta: pd.DataFrame
+
+
+@st.cache_resource
+def get_connection_pool():
+    """
+        One pooled engine per Streamlit server process, shared by every session and rerun.
+    """
+    return create_engine(
+        "mssql+pyodbc://",
+        creator=lambda: pyodbc.connect(DASHBOARD_CONNECTION_STRING),
+        pool_size=DASHBOARD_POOL_SIZE,
+        max_overflow=DASHBOARD_POOL_SIZE,
+        pool_pre_ping=True,
+        pool_recycle=1800,
     )
-    df = pd.read_sql(f"SELECT [date] , [nav] FROM [dbo].[ActiveMutualFundsNavs]  where scheme_code = '{scheme_code}' order by date desc;", conn)
-    conn.close()
-    return df
-
-def meta_fund_data(scheme_code):
-    conn = pyodbc.connect(
-        "DRIVER={SQL Server};"
-        "SERVER=mutual-fund-server-storage.database.windows.net;"
-        "DATABASE=MutualFundS;"
-        "UID=cdac;"
-        "PWD=Azure@123;"
-    )
-    df = pd.read_sql(f"SELECT * FROM [Prod].[KuveraPortfolioExtractsInformation] where scheme_code = '{scheme_code}';", conn)
-    conn.close()
-    return df
+
+
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, show_spinner=False)
+def load_fund(scheme_code) -> FundView:
+    """
+        NAV history and fund metadata in a single round trip : one parameterized batch, two result sets.
+    """
+    connection = get_connection_pool().raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SET NOCOUNT ON; " + NAV_QUERY + " " + META_QUERY, str(scheme_code), str(scheme_code))
+        navs = read_frame(cursor)
+        cursor.nextset()
+        meta = read_frame(cursor)
+        cursor.close()
+    finally:
+        connection.close()  # back to the pool
+    return FundView(navs=navs, meta=meta)
+
+
+@st.cache_resource
+def get_lstm_cache():
+    """
+        Trained LSTMs per (scheme_code, last training date, hyperparameters), shared by all sessions.
+    """
+    return LSTMModelCache()
+
+
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, show_spinner=False)
+def precomputed_forecast(scheme_code, algorithm):
+    """
+        Nightly forecast of one scheme and algorithm (FundExtractor forecast), None when there is none.
+    """
+    return read_forecasts(scheme_code, algorithm)
+
 
 st.set_page_config(layout="wide")  # Use wide layout
 st.title("Mutual Fund NAV Forecasting")
 
+if not DASHBOARD_CONNECTION_STRING:
+    st.error("DASHBOARD_CONNECTION_STRING is not set, export the ODBC connection string of the NAV database and restart the dashboard.")
+    st.stop()
+
 with open("scheme_codes.json", "r") as f:
     funds_data = json.load(f)
 
@@ -59,8 +104,10 @@ st.success(f"Selected Scheme Code: {scheme_code}")
 
 # Fetch data when user enters scheme code
 if scheme_code:
-    df = fetch_data(scheme_code)
-    df2 = meta_fund_data(scheme_code)
+    fund = load_fund(scheme_code)
+    nav_scheme_code = scheme_code  # the fund `df` belongs to
+    df = fund.navs.copy()  # cached frames are shared across reruns, work on a copy
+    df2 = fund.meta
     st.success(f"Fetched {len(df)} records for Scheme Code: {scheme_code}")
 
 df["date"] = pd.to_datetime(df["date"])
@@ -187,12 +234,20 @@ algorithm = st.selectbox(
     "Select prediction algorithm",
     [
         "Linear Regression",
-        "ARIMA (Rolling Forecast ARIMA(2,1,2))",
+        "ARIMA(2,1,2) with 95% prediction interval",
         "Exponential Smoothing",
         "LSTM Neural Network"
     ]
 )
 
+# Dashboard label -> batch forecast algorithm. The nightly lstm_shared model is not the per-fund
+# LSTM trained here, so "LSTM Neural Network" has no precomputed forecast.
+ALGORITHM_KEYS = {
+    "Linear Regression": "linear_regression",
+    "ARIMA(2,1,2) with 95% prediction interval": "arima",
+    "Exponential Smoothing": "exponential_smoothing",
+}
+
 # Predict button
 if st.button("Predict"):
     # Prepare training data: last 100 days (or fewer if not available)
@@ -207,28 +262,38 @@ if st.button("Predict"):
 
         last_date = train_dates.iloc[-1]
         future_dates = pd.date_range(start=last_date + pd.Timedelta(days=1), periods=days_to_predict, freq="D")
+        interval = None
+
+        # Nightly forecasts answer instantly when they start from the same NAV as the chart
+        precomputed = None
+        if algorithm in ALGORITHM_KEYS:
+            precomputed = precomputed_forecast(nav_scheme_code, ALGORITHM_KEYS[algorithm])
+        if precomputed is not None and (
+            len(precomputed) < days_to_predict
+            or pd.Timestamp(precomputed["as_of"].iloc[0]) != last_date.normalize()
+        ):
+            precomputed = None
 
         try:
-            if algorithm == "Linear Regression":
+            if precomputed is not None:
+                precomputed = precomputed.sort_values("step").head(days_to_predict)
+                preds = precomputed["nav"].to_numpy()
+                if precomputed["lower"].notna().all():
+                    interval = (precomputed["lower"].to_numpy(), precomputed["upper"].to_numpy())
+                st.caption(f"Precomputed forecast from {precomputed['run_date'].iloc[0]}")
+
+            elif algorithm == "Linear Regression":
                 X = np.arange(len(train_nav)).reshape(-1, 1)
                 model = LinearRegression()
                 model.fit(X, train_nav)
                 future_X = np.arange(len(train_nav), len(train_nav) + days_to_predict).reshape(-1, 1)
                 preds = model.predict(future_X)
 
-            elif algorithm == "ARIMA (Rolling Forecast ARIMA(2,1,2))":
-                history_window = 100
-                history = list(train_nav[-history_window:])
-                predictions = []
-                step = 1
-                total_steps = days_to_predict
-                for i in range(total_steps):
-                    model = ARIMA(history, order=(2, 1, 2))
-                    model_fit = model.fit()
-                    forecast = model_fit.forecast(steps=step)
-                    predictions.extend(forecast)
-                    history.append(forecast[0])
-                preds = np.array(predictions)
+            elif algorithm == "ARIMA(2,1,2) with 95% prediction interval":
+                # one fit, the whole horizon and its interval from the fitted state space
+                result = ArimaForecaster(history_window=history_window).fit(train_nav).forecast(days_to_predict)
+                preds = result.mean
+                interval = (result.lower, result.upper)
 
             elif algorithm == "Exponential Smoothing":
                 esm = ExponentialSmoothing(train_nav, trend="add", seasonal=None, initialization_method="estimated")
@@ -236,44 +301,15 @@ if st.button("Predict"):
                 preds = esm_fit.forecast(steps=days_to_predict)
             
             elif algorithm == "LSTM Neural Network":
-                look_back = 30
-
-                def create_dataset(dataset, look_back=30):
-                    X, Y = [], []
-                    for i in range(len(dataset) - look_back):
-                        X.append(dataset[i:(i + look_back), 0])
-                        Y.append(dataset[i + look_back, 0])
-                    return np.array(X), np.array(Y)
-
-                nav_series = train_nav.reshape(-1, 1)
-                scaler = MinMaxScaler(feature_range=(0, 1))
-                data_scaled = scaler.fit_transform(nav_series)
-
-                X_train, y_train = create_dataset(data_scaled, look_back)
-                X_train = X_train.reshape((X_train.shape[0], X_train.shape[1], 1))
-
-                @st.cache_resource(show_spinner="Training LSTM model...")
-                def train_lstm_model():
-                    model = Sequential()
-                    model.add(LSTM(50, return_sequences=True, input_shape=(look_back, 1)))
-                    model.add(LSTM(50))
-                    model.add(Dense(1))
-                    model.compile(loss='mean_squared_error', optimizer=Adam(learning_rate=0.01))
-                    model.fit(X_train, y_train, epochs=20, batch_size=16, verbose=0)
-                    return model
-
-                model = train_lstm_model()
-
-                # Forecast next N days
-                input_seq = data_scaled[-look_back:].reshape(1, look_back, 1)
-                preds_scaled = []
-
-                for _ in range(days_to_predict):
-                    pred = model.predict(input_seq, verbose=0)[0][0]
-                    preds_scaled.append(pred)
-                    input_seq = np.append(input_seq[:, 1:, :], [[[pred]]], axis=1)
-
-                preds = scaler.inverse_transform(np.array(preds_scaled).reshape(-1, 1)).flatten()
+                lstm_cache = get_lstm_cache()
+                with st.spinner("Loading LSTM model..."):
+                    model = lstm_cache.get_or_train(nav_scheme_code, last_date, train_nav, LSTMConfig())
+                preds = model.forecast(train_nav, days_to_predict)
+                stats = lstm_cache.stats()
+                st.caption(
+                    f"LSTM cache: {stats['hits']} hits, {stats['disk_hits']} disk loads, "
+                    f"{stats['misses']} misses, {stats['training_seconds']}s spent training"
+                )
 
             # Plot
             forecast_df = pd.DataFrame({
@@ -296,6 +332,13 @@ if st.button("Predict"):
                 title=f"LSTM Forecast: last {min(len(df), 100)} days + next{days_to_predict} days",
             )
 
+            if interval is not None:
+                for bound, values in zip(("Lower 95%", "Upper 95%"), interval):
+                    fig_pred.add_scatter(
+                        x=forecast_df["date"], y=values, name=bound,
+                        mode="lines", line=dict(dash="dot", width=1)
+                    )
+
             fig_pred.update_layout(
                 xaxis_title="Date",
                 yaxis_title="NAV",
@@ -14,18 +14,28 @@ import os
 import json
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from typing import List, Dict
-from utilities import RequestMixin, MPTask
+from utilities import RequestMixin, MPTask, AsyncIngestionEngine
+from utilities.rate_limit import get_rate_limiter, log_rate_limit_stats
+from utilities.catalogue import get_scheme_catalogue
 from logger import get_logger
 
 log = get_logger('MFMetaData')
 
 class MFMetaData(RequestMixin):
 
-    def get_all_metadata(self):
+    @property
+    def catalogue(self):
+        '''
+            The memoized scheme catalogue, shared with every other process / DAG task on the host.
+        '''
+        return get_scheme_catalogue(self.hit_api_mf)
+
+    def get_all_metadata(self, refresh: bool = False):
         '''
             Request all the metadata and returns a dictonary containing all MF information.
+            Served from the catalogue snapshot unless it is older than CATALOGUE_TTL or 'refresh' is set.
         '''
-        return self.hit_api_mf()
+        return self.catalogue.entries(refresh=refresh)
 
     def filter_available_isn(self):
         '''
@@ -41,11 +51,7 @@ class MFMetaData(RequestMixin):
         '''
             Request all scheme codes for Mutual Funds.
         '''
-        return [
-            code.get("schemeCode")
-            for code in self.get_all_metadata()
-            if code.get("schemeCode")
-        ]
+        return self.catalogue.scheme_codes()
 
     def fetch_multiple_multiprocess(
             self,
@@ -96,13 +102,32 @@ class MFMetaData(RequestMixin):
 
         return results
 
-    def prepare_run_time_config(self, file_name : str, max_workers : int = 6):
+    def fetch_multiple_async(
+            self,
+            scheme_codes,
+            latest: bool = False,
+            concurrency: int = None,
+        ) -> Dict[str, object]:
+        """
+            Fetch metadata for each scheme_code on a single event loop,
+
+            Returns a dict mapping scheme_code → (JSON data or Exception).
+        """
+        tasks : List = [MPTask(self.BASE_URL, code, latest) for code in scheme_codes]
+        return AsyncIngestionEngine(concurrency=concurrency).run(tasks)
+
+    def prepare_run_time_config(self, file_name : str, max_workers : int = 6, mode : str = 'process'):
         from datetime import datetime
 
         codes : List = self.get_all_scheme_codes()
         run_time_config : Dict[str, object, Exception] = {}
 
-        mp_results = self.fetch_multiple_multiprocess(codes, latest=True, max_workers = max_workers)
+        get_rate_limiter(self.BASE_URL).reset()
+        if mode == 'async':
+            mp_results = self.fetch_multiple_async(codes, latest=True)
+        else:
+            mp_results = self.fetch_multiple_multiprocess(codes, latest=True, max_workers = max_workers)
+        log_rate_limit_stats(self.BASE_URL)
 
         for code, payload in mp_results.items():
             if isinstance(payload, Exception):
@@ -0,0 +1,297 @@
+#                     _      _                _
+#  _ _  __ ___ __  __| |__ _| |_ __ _ ___ ___| |_
+# | ' \/ _` \ V / / _` / _` |  _/ _` (_-</ -_)  _|
+# |_||_\__,_|\_/  \__,_\__,_|\__\__,_/__/\___|\__|
+#
+# Hive partitioned NAV dataset (year / month / scheme bucket) with a pruning manifest and compaction.
+
+import os
+import json
+import glob
+import uuid
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from .historical_writer import HISTORICAL_BUCKETS, HISTORICAL_ROW_GROUP_ROWS
+from .parquet_profile import NAV_SORT_KEYS, conform_nav, get_parquet_profile, write_nav
+
+from logger import get_logger
+
+log = get_logger('NavDataset')
+
+PARTITION_SCHEMA = pa.schema([('year', pa.int16()), ('month', pa.int8()), ('bucket', pa.int16())])
+PARTITION_KEYS = tuple(PARTITION_SCHEMA.names)
+
+
+def _write_json(path: str, obj) -> None:
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(obj, f)
+    os.replace(temp_path, path)
+
+
+def _latest_per_day(table: pa.Table) -> pa.Table:
+    '''
+        Sort by (scheme_code, date) and keep only the most recently inserted row of each pair.
+    '''
+    table = table.sort_by(NAV_SORT_KEYS + [('insert_date', 'descending')])
+    codes = table['scheme_code'].to_numpy()
+    days = table['date'].cast(pa.int32()).to_numpy()
+    keep = np.ones(len(codes), dtype=bool)
+    keep[1:] = (codes[1:] != codes[:-1]) | (days[1:] != days[:-1])
+    return table if keep.all() else table.filter(pa.array(keep))
+
+
+def _column_range(metadata: pq.FileMetaData, name: str):
+    '''
+        (min, max) of a column over all row groups, from the footer statistics.
+    '''
+    index = metadata.schema.names.index(name)
+    lows, highs = [], []
+    for group in range(metadata.num_row_groups):
+        stats = metadata.row_group(group).column(index).statistics
+        if stats is not None and stats.has_min_max:
+            lows.append(stats.min)
+            highs.append(stats.max)
+    return (min(lows), max(highs)) if lows else (None, None)
+
+
+class NavDataset:
+    '''
+        NAV rows laid out as `navs/year=YYYY/month=M/bucket=N/part-*.parquet` under `root`.
+
+        Every write drops a manifest fragment under `_manifest/` listing its files with
+        row counts and scheme code / date ranges, so readers prune by scheme and date
+        without listing the tree. `compact()` merges the files of each partition into one
+        file sorted by (scheme_code, date) and folds the fragments into `_manifest/snapshot.json`.
+        `root` is a local (or mounted) directory : readers open the pruned files with row filters.
+
+            dataset = NavDataset('/data/mf')
+            dataset.write(table)                                  # insert_date, scheme_code, date, nav
+            dataset.read(scheme_codes=[120503], start=date(2024, 1, 1))
+            dataset.compact()
+    '''
+
+    def __init__(self, root: str, buckets: int = None):
+        self.root = root
+        self.data_dir = os.path.join(root, 'navs')
+        self.manifest_dir = os.path.join(root, '_manifest')
+        os.makedirs(self.manifest_dir, exist_ok=True)
+
+        settings_path = os.path.join(self.manifest_dir, 'dataset.json')
+        if os.path.exists(settings_path):
+            with open(settings_path, 'r', encoding='utf-8') as f:
+                self.buckets = json.load(f)['buckets']
+        else:
+            self.buckets = buckets or HISTORICAL_BUCKETS
+            _write_json(settings_path, {'buckets': self.buckets})
+
+    def bucket_of(self, scheme_code) -> int:
+        return int(scheme_code) % self.buckets
+
+    def _with_partitions(self, table: pa.Table) -> pa.Table:
+        codes = pc.fill_null(table['scheme_code'], 0).to_numpy()
+        return (
+            table
+            .append_column('year', pc.year(table['date']).cast(pa.int16()))
+            .append_column('month', pc.month(table['date']).cast(pa.int8()))
+            .append_column('bucket', pa.array(codes % self.buckets, pa.int16()))
+        )
+
+    def _entry(self, path: str, metadata: pq.FileMetaData) -> Dict:
+        relative = os.path.relpath(path, self.root)
+        partition = dict(part.split('=', 1) for part in relative.split(os.sep) if '=' in part)
+        min_code, max_code = _column_range(metadata, 'scheme_code')
+        min_date, max_date = _column_range(metadata, 'date')
+        return {
+            'path': relative,
+            **{key: int(partition[key]) for key in PARTITION_KEYS},
+            'rows': metadata.num_rows,
+            'min_scheme_code': min_code,
+            'max_scheme_code': max_code,
+            'min_date': min_date.isoformat() if min_date else None,
+            'max_date': max_date.isoformat() if max_date else None,
+        }
+
+    def write(self, table: pa.Table, row_group_rows: int = HISTORICAL_ROW_GROUP_ROWS) -> List[Dict]:
+        '''
+            Append a NAV table, split into its partitions : one file per partition per write,
+            sorted by (scheme_code, date). Returns the manifest entries written.
+        '''
+        if not table.num_rows:
+            return []
+
+        write_id = uuid.uuid4().hex
+        profile = get_parquet_profile()._replace(row_group_size=row_group_rows)
+        table = self._with_partitions(conform_nav(table, profile, sort=False))
+        table = table.sort_by([(key, 'ascending') for key in PARTITION_KEYS])
+
+        keys = np.column_stack([table[key].to_numpy() for key in PARTITION_KEYS])
+        starts = np.flatnonzero(np.r_[True, (keys[1:] != keys[:-1]).any(axis=1)])
+        stops = np.r_[starts[1:], len(keys)]
+
+        entries = []
+        for start, stop in zip(starts, stops):
+            year, month, bucket = (int(value) for value in keys[start])
+            path = os.path.join(
+                self.data_dir, f'year={year}', f'month={month}', f'bucket={bucket}', f'part-{write_id}.parquet'
+            )
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_nav(table.slice(start, stop - start).drop_columns(list(PARTITION_KEYS)), path, profile)
+            entries.append(self._entry(path, pq.read_metadata(path)))
+
+        _write_json(os.path.join(self.manifest_dir, f'fragment-{write_id}.json'), entries)
+        return entries
+
+    def add_files(self, paths: Iterable[str]) -> int:
+        '''
+            Bring existing NAV parquet files (e.g. daily_extracts) into the dataset.
+        '''
+        added = 0
+        for path in paths:
+            self.write(pq.read_table(path))
+            added += 1
+        return added
+
+    def _fragment_paths(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.manifest_dir, 'fragment-*.json')))
+
+    def _load(self, paths: Iterable[str]) -> List[Dict]:
+        entries = []
+        for path in paths:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entries.extend(json.load(f))
+            except FileNotFoundError:  # folded into the snapshot by a concurrent compaction
+                continue
+        return entries
+
+    def _snapshot(self) -> Dict:
+        '''
+            {'files': live entries, 'absorbed': names of the fragments already folded into them}
+        '''
+        try:
+            with open(os.path.join(self.manifest_dir, 'snapshot.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'files': [], 'absorbed': []}
+
+    def manifest(self, fragments: List[str] = None) -> List[Dict]:
+        '''
+            Every live file, snapshot first then fragments, de-duplicated by path. Fragments
+            the snapshot absorbed (left behind by an interrupted compaction) are ignored.
+        '''
+        snapshot = self._snapshot()
+        absorbed = set(snapshot['absorbed'])
+        fragments = self._fragment_paths() if fragments is None else fragments
+        entries = snapshot['files'] + self._load(path for path in fragments if os.path.basename(path) not in absorbed)
+        return list({entry['path']: entry for entry in entries}.values())
+
+    def files(self, scheme_codes: Iterable = None, start: date = None, end: date = None) -> List[Dict]:
+        '''
+            Manifest entries that may hold rows for `scheme_codes` between `start` and `end` (inclusive).
+        '''
+        codes = {int(code) for code in scheme_codes} if scheme_codes is not None else None
+        buckets = {self.bucket_of(code) for code in codes} if codes is not None else None
+        start = start.isoformat() if start else None
+        end = end.isoformat() if end else None
+
+        selected = []
+        for entry in self.manifest():
+            if buckets is not None and entry['bucket'] not in buckets:
+                continue
+            if codes is not None and not any(entry['min_scheme_code'] <= code <= entry['max_scheme_code'] for code in codes):
+                continue
+            if start and entry['max_date'] < start:
+                continue
+            if end and entry['min_date'] > end:
+                continue
+            selected.append(entry)
+        return selected
+
+    def read(self, scheme_codes: Iterable = None, start: date = None, end: date = None, columns: List[str] = None) -> pa.Table:
+        '''
+            Rows for the given schemes / date range, only opening the files the manifest cannot rule out.
+        '''
+        scheme_codes = list(scheme_codes) if scheme_codes is not None else None
+        filters = []
+        if scheme_codes is not None:
+            filters.append(('scheme_code', 'in', [int(code) for code in scheme_codes]))
+        if start:
+            filters.append(('date', '>=', start))
+        if end:
+            filters.append(('date', '<=', end))
+
+        tables = [
+            pq.read_table(os.path.join(self.root, entry['path']), columns=columns, filters=filters or None)
+            for entry in self.files(scheme_codes, start, end)
+        ]
+        if not tables:
+            return pa.table({})
+        return pa.concat_tables(tables)
+
+    def compact(self, row_group_rows: int = HISTORICAL_ROW_GROUP_ROWS) -> Dict[str, int]:
+        '''
+            Merge every partition holding more than one file into a single file sorted by
+            (scheme_code, date), then fold the manifest fragments into one snapshot.
+            Rows loaded more than once for the same scheme and day keep the latest insert.
+
+            The new snapshot is the commit point : it is published before the old files are
+            deleted and records the fragments it absorbed, so readers never see a missing file
+            nor a row twice, and a compaction stopped half way is cleaned up by the next one.
+        '''
+        absorbed = set(self._snapshot()['absorbed'])
+        fragments, stale = [], []
+        for path in self._fragment_paths():  # writes landing meanwhile stay in their own fragments
+            (stale if os.path.basename(path) in absorbed else fragments).append(path)
+        entries = self.manifest(fragments)
+
+        partitions: Dict[tuple, List[Dict]] = {}
+        for entry in entries:
+            partitions.setdefault(tuple(entry[key] for key in PARTITION_KEYS), []).append(entry)
+
+        live, retired = [], []
+        for key, group in sorted(partitions.items()):
+            if len(group) == 1:
+                live.extend(group)
+                continue
+
+            table = _latest_per_day(pa.concat_tables([
+                pq.read_table(os.path.join(self.root, entry['path'])) for entry in group
+            ]))
+
+            directory = os.path.dirname(os.path.join(self.root, group[0]['path']))
+            path = os.path.join(directory, f'part-compacted-{uuid.uuid4().hex}.parquet')
+            write_nav(table, path, get_parquet_profile()._replace(row_group_size=row_group_rows))
+            live.append(self._entry(path, pq.read_metadata(path)))
+            retired.extend(group)
+
+        _write_json(
+            os.path.join(self.manifest_dir, 'snapshot.json'),
+            {'files': live, 'absorbed': [os.path.basename(path) for path in fragments + stale]}
+        )
+
+        live_paths = {entry['path'] for entry in live}
+        retired.extend(entry for entry in self._load(stale) if entry['path'] not in live_paths)
+        for path in [os.path.join(self.root, entry['path']) for entry in retired] + fragments + stale:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+        stats = {'partitions': len(partitions), 'files_before': len(entries), 'files_after': len(live)}
+        log.info(f"Compacted {stats['files_before']} files into {stats['files_after']} across {stats['partitions']} partitions")
+        return stats
+
+
+def get_nav_dataset() -> Optional[NavDataset]:
+    '''
+        The dataset under NAV_DATASET_DIR, None when it is not configured.
+    '''
+    root = os.environ.get('NAV_DATASET_DIR')
+    return NavDataset(root) if root else None
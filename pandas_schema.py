@@ -1,2 +1,3 @@
 METADATA_SCHEMA = ["scheme_code","fund_house","scheme_type","scheme_category","scheme_name","isin_growth","isin_div_reinvestment"]
-NAV_SCHEMA = ['insert_date','scheme_code','date','nav']
\ No newline at end of file
+NAV_SCHEMA = ['insert_date','scheme_code','date','nav']
+FORECAST_SCHEMA = ['run_date','scheme_code','algorithm','as_of','step','date','nav','lower','upper']
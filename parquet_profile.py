@@ -0,0 +1,163 @@
+#                               _
+#  _ __  __ _ _ _ __ _ _  _ ___| |_
+# | '_ \/ _` | '_/ _` | || / -_)  _|
+# | .__/\__,_|_| \__, |\_,_\___|\__|
+# |_|               |_|
+#
+# One place for how extracts are laid out in parquet : schema, sort order, codec, row groups, statistics.
+
+import os
+import json
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from models.arrow_schema import (
+    nav_arrow_schema,
+    METADATA_ARROW_SCHEMA,
+    KUVERA_ARROW_SCHEMA,
+    KUVERA_JSON_COLUMNS,
+)
+
+NAV_SORT_KEYS = [('scheme_code', 'ascending'), ('date', 'ascending')]
+
+# low cardinality columns worth a parquet dictionary, the rest is plain encoded
+DICTIONARY_COLUMNS = [
+    'scheme_code', 'date', 'insert_date',
+    'fund_house', 'scheme_type', 'scheme_category',
+    'type_code', 'category', 'fund_type', 'fund_category', 'plan', 'crisil_rating', 'maturity_type',
+]
+STATISTICS_COLUMNS = ['scheme_code', 'date', 'insert_date', 'nav', 'isin', 'code']
+
+
+class ParquetProfile(NamedTuple):
+    """
+        Writer settings shared by every extract.
+
+        - compression / compression_level: codec and its level (PARQUET_COMPRESSION / PARQUET_COMPRESSION_LEVEL)
+        - row_group_size: max rows per row group (PARQUET_ROW_GROUP_ROWS)
+        - nav_type: 'decimal' for exact decimal128(38, 5) or 'float64' (NAV_TYPE)
+        - page_index: write column / offset indexes so readers can skip pages (PARQUET_PAGE_INDEX)
+    """
+    compression: str = 'zstd'
+    compression_level: Optional[int] = 3
+    row_group_size: int = 1 << 20
+    nav_type: str = 'decimal'
+    page_index: bool = True
+
+    @property
+    def nav_schema(self) -> pa.Schema:
+        return nav_arrow_schema(self.nav_type)
+
+    def writer_options(self, schema: pa.Schema, sorting: List = None) -> Dict:
+        '''
+            Keyword arguments for `pq.write_table` / `pq.ParquetWriter`.
+        '''
+        options = {
+            'compression': self.compression,
+            'compression_level': self.compression_level,
+            'use_dictionary': [name for name in DICTIONARY_COLUMNS if name in schema.names],
+            'write_statistics': [name for name in STATISTICS_COLUMNS if name in schema.names],
+            'write_page_index': self.page_index,
+        }
+        if sorting:
+            options['sorting_columns'] = pq.SortingColumn.from_ordering(schema, sorting)
+        return options
+
+
+def get_parquet_profile() -> ParquetProfile:
+    level = os.environ.get('PARQUET_COMPRESSION_LEVEL', '3')
+    return ParquetProfile(
+        compression=os.environ.get('PARQUET_COMPRESSION', 'zstd'),
+        compression_level=int(level) if level else None,
+        row_group_size=int(os.environ.get('PARQUET_ROW_GROUP_ROWS', 1 << 20)),
+        nav_type=os.environ.get('NAV_TYPE', 'decimal'),
+        page_index=os.environ.get('PARQUET_PAGE_INDEX', '1') not in ('0', 'false', 'False'),
+    )
+
+
+def conform_nav(table: pa.Table, profile: ParquetProfile = None, sort: bool = True) -> pa.Table:
+    '''
+        Cast a NAV table to the profile schema and order it by (scheme_code, date).
+    '''
+    profile = profile or get_parquet_profile()
+    table = table.select(profile.nav_schema.names).cast(profile.nav_schema)
+    return table.sort_by(NAV_SORT_KEYS) if sort else table
+
+
+def metadata_table(rows: Iterable[Dict]) -> pa.Table:
+    '''
+        Scheme metadata rows -> METADATA_ARROW_SCHEMA, sorted by scheme code.
+    '''
+    table = pa.Table.from_pylist(
+        [{**row, 'scheme_code': int(row['scheme_code'])} for row in rows], schema=METADATA_ARROW_SCHEMA
+    )
+    return table.sort_by('scheme_code')
+
+
+def _coerce(value, kind: pa.DataType):
+    if value is None:
+        return None
+    if pa.types.is_string(kind) and not isinstance(value, str):
+        return json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+    if pa.types.is_floating(kind):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    if pa.types.is_integer(kind):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+    return value
+
+
+def kuvera_table(rows: Iterable[Dict]) -> pa.Table:
+    '''
+        `create_from_json` rows -> KUVERA_ARROW_SCHEMA. JSON columns are stored as JSON text,
+        values that do not fit their column type become null instead of failing the file.
+    '''
+    fields = [(field.name, field.type) for field in KUVERA_ARROW_SCHEMA]
+    columns = {name: [] for name, _ in fields}
+    for row in rows:
+        for name, kind in fields:
+            value = row.get(name)
+            if name in KUVERA_JSON_COLUMNS and value is not None:
+                value = json.dumps(value)
+            columns[name].append(_coerce(value, kind))
+    table = pa.table(columns, schema=KUVERA_ARROW_SCHEMA)
+    return table.sort_by([('scheme_code', 'ascending'), ('type_code', 'ascending')])
+
+
+def write_parquet(table: pa.Table, where, profile: ParquetProfile = None, sorting: List = None) -> None:
+    '''
+        `pq.write_table` with the profile applied. `where` is a path or a writable buffer.
+    '''
+    profile = profile or get_parquet_profile()
+    pq.write_table(
+        table, where,
+        row_group_size=profile.row_group_size,
+        **profile.writer_options(table.schema, sorting)
+    )
+
+
+def parquet_bytes(table: pa.Table, profile: ParquetProfile = None, sorting: List = None) -> bytes:
+    sink = pa.BufferOutputStream()
+    write_parquet(table, sink, profile, sorting)
+    return sink.getvalue().to_pybytes()
+
+
+def write_nav(table: pa.Table, where, profile: ParquetProfile = None) -> None:
+    '''
+        Conform + sort + write a NAV table.
+    '''
+    profile = profile or get_parquet_profile()
+    write_parquet(conform_nav(table, profile), where, profile, NAV_SORT_KEYS)
+
+
+def nav_parquet_bytes(table: pa.Table, profile: ParquetProfile = None) -> bytes:
+    sink = pa.BufferOutputStream()
+    write_nav(table, sink, profile)
+    return sink.getvalue().to_pybytes()
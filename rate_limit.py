@@ -0,0 +1,235 @@
+#           _         _ _       _ _
+#  _ _ __ _| |_ ___  | (_)_ __ (_) |_
+# | '_/ _` |  _/ -_) | | | '  \| |  _|
+# |_| \__,_|\__\___| |_|_|_|_|_|_|\__|
+#
+# Shared per-host token bucket to replace fixed sleeps in the workers.
+
+import os
+import json
+import time
+import asyncio
+import tempfile
+import threading
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+try:
+    import fcntl
+except ImportError:  # Windows : fall back to a per-process bucket
+    fcntl = None
+
+from logger import get_logger
+
+log = get_logger('RateLimiter')
+
+THROTTLE_STATUS = {429, 500, 502, 503, 504}
+
+# Requests per second allowed per upstream host, overridable from the environment.
+HOST_RATE_ENV = {
+    'api.mfapi.in': 'MFAPI_RATE_LIMIT',
+    'mf.captnemo.in': 'KUVERA_RATE_LIMIT',
+}
+DEFAULT_RATE = 10.0
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    '''
+        Retry-After is either delta-seconds or an HTTP-date, return seconds to wait.
+    '''
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    '''
+        Token bucket (GCRA form) for one host, configured in requests per second.
+
+        The bucket state lives in a small lock file so every process of a pool draws from the
+        same budget, the caller only reserves a slot under the lock and sleeps outside it.
+
+        On 429 / 5xx the rate is halved and `Retry-After` blocks the host, successes
+        grow it back additively towards the configured rate.
+    '''
+
+    def __init__(
+            self,
+            host: str,
+            rate: float,
+            burst: int = 1,
+            min_rate: float = None,
+            state_dir: str = None
+        ):
+        self.host = host
+        self.max_rate = float(rate)
+        self.min_rate = float(min_rate or max(rate / 16, 0.5))
+        self.burst = max(1, int(burst))
+        state_dir = state_dir or os.environ.get('RATE_LIMIT_DIR') or tempfile.gettempdir()
+        self.state_path = os.path.join(state_dir, f"mf_rate_{host.replace(':', '_')}.json")
+        self._thread_lock = threading.Lock()
+        self._memory_state = None
+
+    def _fresh_state(self) -> Dict:
+        return {
+            'tat': 0.0,
+            'rate': self.max_rate,
+            'blocked_until': 0.0,
+            'requests': 0,
+            'throttled': 0,
+            'waited': 0.0,
+            'first': None,
+            'last': None,
+        }
+
+    @contextmanager
+    def _state(self):
+        '''
+            Read-modify-write of the shared bucket state under an exclusive lock.
+        '''
+        with self._thread_lock:
+            if fcntl is None:
+                if self._memory_state is None:
+                    self._memory_state = self._fresh_state()
+                yield self._memory_state
+                return
+
+            with open(self.state_path, 'a+', encoding='utf-8') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    raw = f.read()
+                    try:
+                        state = json.loads(raw) if raw else self._fresh_state()
+                    except ValueError:
+                        state = self._fresh_state()
+                    yield state
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(state))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def reserve(self) -> float:
+        '''
+            Book the next send slot and return how long the caller has to wait for it.
+        '''
+        with self._state() as state:
+            now = time.time()
+            interval = 1.0 / state['rate']
+            start = max(now, state['blocked_until'])
+            tat = max(state['tat'], start)
+            send_at = max(start, tat - (self.burst - 1) * interval)
+            state['tat'] = tat + interval
+
+            delay = send_at - now
+            state['requests'] += 1
+            state['waited'] += delay
+            state['first'] = send_at if state['first'] is None else min(state['first'], send_at)
+            state['last'] = send_at if state['last'] is None else max(state['last'], send_at)
+            return delay
+
+    def acquire(self) -> float:
+        '''
+            Blocking acquire for process / thread workers.
+        '''
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self) -> float:
+        '''
+            Non-blocking acquire for the asyncio engine, the locked file read-modify-write
+            runs in a worker thread so the event loop keeps serving other requests.
+        '''
+        delay = await asyncio.to_thread(self.reserve)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def feedback(self, status_code: int, retry_after: Optional[str] = None) -> bool:
+        '''
+            Adapt the rate to the upstream answer, returns True when the request was throttled.
+        '''
+        throttled = status_code in THROTTLE_STATUS
+        with self._state() as state:
+            if throttled:
+                state['throttled'] += 1
+                state['rate'] = max(self.min_rate, state['rate'] / 2)
+                pause = parse_retry_after(retry_after)
+                if pause is None:
+                    pause = 1.0 / state['rate']
+                state['blocked_until'] = max(state['blocked_until'], time.time() + pause)
+            elif state['rate'] < self.max_rate:
+                state['rate'] = min(self.max_rate, state['rate'] + self.max_rate / 50)
+        return throttled
+
+    async def feedback_async(self, status_code: int, retry_after: Optional[str] = None) -> bool:
+        '''
+            `feedback` for the asyncio engine, off the event loop like `acquire_async`.
+        '''
+        return await asyncio.to_thread(self.feedback, status_code, retry_after)
+
+    def reset(self):
+        '''
+            Start a fresh measurement window, called by the parent before a fan-out.
+        '''
+        with self._state() as state:
+            state.clear()
+            state.update(self._fresh_state())
+
+    def stats(self) -> Dict[str, object]:
+        '''
+            Wait time and achieved rate across every process sharing this bucket.
+        '''
+        with self._state() as state:
+            span = (state['last'] or 0) - (state['first'] or 0)
+            return {
+                'host': self.host,
+                'rate_limit': self.max_rate,
+                'current_rate': round(state['rate'], 3),
+                'requests': state['requests'],
+                'throttled': state['throttled'],
+                'waited_seconds': round(state['waited'], 3),
+                'achieved_rps': round((state['requests'] - 1) / span, 3) if span > 0 else None,
+            }
+
+
+_limiters: Dict[str, RateLimiter] = {}
+
+
+def get_rate_limiter(url: str) -> RateLimiter:
+    '''
+        One limiter per host and process, every process of a pool shares its state file.
+    '''
+    host = urlparse(url).netloc or url
+    if host not in _limiters:
+        env_key = HOST_RATE_ENV.get(host.split(':')[0])
+        rate = float(os.environ.get(env_key or '', '') or os.environ.get('RATE_LIMIT', DEFAULT_RATE))
+        burst = int(os.environ.get('RATE_LIMIT_BURST', 1))
+        _limiters[host] = RateLimiter(host, rate, burst=burst)
+    return _limiters[host]
+
+
+def log_rate_limit_stats(url: str) -> Dict[str, object]:
+    '''
+        Log and return the limiter metrics for the host of `url`.
+    '''
+    stats = get_rate_limiter(url).stats()
+    log.info(
+        f"Rate limit {stats['host']} : {stats['requests']} requests, "
+        f"achieved {stats['achieved_rps']} req/s of {stats['rate_limit']}, "
+        f"waited {stats['waited_seconds']}s, throttled {stats['throttled']}"
+    )
+    return stats
@@ -7,13 +7,17 @@
                                                                                                                                                                                                       
 '''
 import os
+import time
+import threading
 from urllib.parse import quote_plus
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import Pool, QueuePool
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 
 from logger import get_logger
 
@@ -149,70 +153,192 @@ def get_database_url(db_type: str) -> str:
         raise DatabaseConnectionError(f"Error creating database URL for {db_type}: {str(e)}")
 
 
-def get_engine(db_type: str, **engine_kwargs) -> Engine:
+DEFAULT_ENGINE_CONFIGS = {
+    'postgres': {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_pre_ping': True,
+        'pool_recycle': 3600,
+    },
+    'mysql': {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_pre_ping': True,
+        'pool_recycle': 3600,
+    },
+    'oracle': {
+        'pool_size': 5,
+        'max_overflow': 10,
+        'pool_pre_ping': True,
+        'pool_recycle': 3600,
+    },
+    'snowflake': {
+        'pool_size': 5,
+        'max_overflow': 10,
+        'pool_pre_ping': True,
+    },
+    'mssql': {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_pre_ping': True,
+        'pool_recycle': 3600,
+    },
+    'sqlite': {
+        'pool_pre_ping': False,  
+    }
+}
+
+
+class PoolMetrics:
     """
-        Create and return a SQLAlchemy Engine for the given database type.
-        Additional keyword args are passed to create_engine().
-        
-        Default engine configurations are applied based on database type.
+        Counters fed by pool events and the metered pool class of one engine.
     """
-    url = get_database_url(db_type)
 
-    default_configs = {
-        'postgres': {
-            'pool_size': 10,
-            'max_overflow': 20,
-            'pool_pre_ping': True,
-            'pool_recycle': 3600,
-        },
-        'mysql': {
-            'pool_size': 10,
-            'max_overflow': 20,
-            'pool_pre_ping': True,
-            'pool_recycle': 3600,
-        },
-        'oracle': {
-            'pool_size': 5,
-            'max_overflow': 10,
-            'pool_pre_ping': True,
-            'pool_recycle': 3600,
-        },
-        'snowflake': {
-            'pool_size': 5,
-            'max_overflow': 10,
-            'pool_pre_ping': True,
-        },
-        'mssql': {
-            'pool_size': 10,
-            'max_overflow': 20,
-            'pool_pre_ping': True,
-            'pool_recycle': 3600,
-        },
-        'sqlite': {
-            'pool_pre_ping': False,  
-        }
-    }
-    
+    def __init__(self, db_type: str):
+        self.db_type = db_type
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.timeouts = 0
+            self.wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            self.timeouts += timed_out
+
+    def attach(self, engine: Engine) -> None:
+        def on_connect(dbapi_connection, connection_record):
+            with self._lock:
+                self.connects += 1
+
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            with self._lock:
+                self.checkouts += 1
+
+        def on_checkin(dbapi_connection, connection_record):
+            with self._lock:
+                self.checkins += 1
+
+        event.listen(engine, 'connect', on_connect)
+        event.listen(engine, 'checkout', on_checkout)
+        event.listen(engine, 'checkin', on_checkin)
+
+    def snapshot(self, pool: Pool) -> Dict[str, Any]:
+        with self._lock:
+            checkouts = self.checkouts
+            return {
+                'db_type': self.db_type,
+                'pool': type(pool).__name__.removeprefix('Metered'),
+                'size': pool.size() if isinstance(pool, QueuePool) else None,
+                'checked_out': pool.checkedout() if isinstance(pool, QueuePool) else checkouts - self.checkins,
+                'overflow': max(pool.overflow(), 0) if isinstance(pool, QueuePool) else 0,
+                'connects': self.connects,
+                'checkouts': checkouts,
+                'timeouts': self.timeouts,
+                'wait_seconds': round(self.wait_seconds, 4),
+                'avg_wait_ms': round(self.wait_seconds / checkouts * 1000, 3) if checkouts else 0.0,
+                'max_wait_ms': round(self.max_wait_seconds * 1000, 3),
+            }
+
+
+def _metered_pool_class(pool_class: type, metrics: PoolMetrics) -> type:
+    """
+        Subclass the pool so that every checkout is timed, including the wait for a free connection.
+        The subclass survives dispose(), which recreates the pool from its class.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = pool_class._do_get(self)
+        except PoolTimeoutError:
+            metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+    return type(f'Metered{pool_class.__name__}', (pool_class,), {'_do_get': _do_get})
+
+
+_engines: Dict[Tuple, Engine] = {}
+_metrics: Dict[Tuple, PoolMetrics] = {}
+_sessions: Dict[Tuple, sessionmaker] = {}
+_registry_lock = threading.Lock()
+_registry_pid = os.getpid()
+
+
+def _normalize_db_type(db_type: str) -> str:
     db_key = db_type.lower()
     if db_key in ['postgres', 'postgresql']:
         db_key = 'postgres'
     elif db_key in ['mssql', 'sqlserver']:
         db_key = 'mssql'
-    
-    config = default_configs.get(db_key, {})
-    config.update(engine_kwargs)  
-    
-    try:
-        engine = create_engine(url, **config)
+    return db_key
+
+
+def _freeze(kwargs: Dict[str, Any]) -> str:
+    return repr(sorted(kwargs.items()))
+
+
+def _check_pid() -> None:
+    """
+        A forked worker inherits the parent's pools and sockets : drop them without closing
+        (dispose(close=False)) so that the child opens its own connections and the parent's stay intact.
+    """
+    global _registry_pid
+    if _registry_pid != os.getpid():
+        for engine in _engines.values():
+            engine.dispose(close=False)
+        _engines.clear()
+        _metrics.clear()
+        _sessions.clear()
+        _registry_pid = os.getpid()
+
+
+def get_engine(db_type: str, **engine_kwargs) -> Engine:
+    """
+        Return the process-wide SQLAlchemy Engine for the given database type.
+        Additional keyword args are passed to create_engine().
+
+        Default engine configurations are applied based on database type. Engines are cached per
+        (db_type, effective URL, kwargs), so repeated calls share one connection pool.
+    """
+    url = get_database_url(db_type)
+    db_key = _normalize_db_type(db_type)
+    config = {**DEFAULT_ENGINE_CONFIGS.get(db_key, {}), **engine_kwargs}
+    key = (db_key, url, _freeze(config))
+
+    with _registry_lock:
+        _check_pid()
+        if key in _engines:
+            return _engines[key]
+
+        try:
+            metrics = PoolMetrics(db_key)
+            if 'poolclass' not in config:
+                pool_class = make_url(url).get_dialect().get_pool_class(make_url(url))
+                config['poolclass'] = _metered_pool_class(pool_class, metrics)
+            engine = create_engine(url, **config)
+            metrics.attach(engine)
+        except Exception as e:
+            raise DatabaseConnectionError(f"Failed to create engine for {db_type}: {str(e)}")
+
+        _engines[key], _metrics[key] = engine, metrics
         logger.debug(f"Successfully created {db_type} engine")
         return engine
-    except Exception as e:
-        raise DatabaseConnectionError(f"Failed to create engine for {db_type}: {str(e)}")
 
 
 def get_session(db_type: str, engine_kwargs: Optional[Dict[str, Any]] = None, **session_kwargs):
     """
-        Create and return a SQLAlchemy Session for the given database type.
+        Return a cached SQLAlchemy sessionmaker bound to the registry engine for the given database type.
         
         Args:
             db_type: Database type string
@@ -229,13 +355,69 @@ def get_session(db_type: str, engine_kwargs: Optional[Dict[str, Any]] = None, **
         'bind': engine
     }
     session_config.update(session_kwargs)
-    
-    try:
-        Session = sessionmaker(**session_config)
+    key = (id(engine), _freeze(session_config))
+
+    with _registry_lock:
+        if key in _sessions:
+            return _sessions[key]
+        try:
+            Session = sessionmaker(**session_config)
+        except Exception as e:
+            raise DatabaseConnectionError(f"Failed to create session for {db_type}: {str(e)}")
+        _sessions[key] = Session
         logger.debug(f"Successfully created {db_type} session")
         return Session
-    except Exception as e:
-        raise DatabaseConnectionError(f"Failed to create session for {db_type}: {str(e)}")
+
+
+def pool_metrics() -> List[Dict[str, Any]]:
+    """
+        Pool metrics of every engine created by this process : size, checked-out, overflow,
+        checkouts and the time spent waiting for a connection.
+    """
+    with _registry_lock:
+        _check_pid()
+        return [
+            _metrics[key].snapshot(engine.pool)
+            for key, engine in _engines.items()
+        ]
+
+
+def log_pool_metrics() -> List[Dict[str, Any]]:
+    """
+        Log and return the pool metrics of this process.
+    """
+    stats = pool_metrics()
+    for entry in stats:
+        logger.info(
+            f"Pool {entry['db_type']} ({entry['pool']}) : {entry['checked_out']} checked out of {entry['size']}, "
+            f"overflow {entry['overflow']}, {entry['checkouts']} checkouts over {entry['connects']} connections, "
+            f"waited {entry['wait_seconds']}s (avg {entry['avg_wait_ms']} ms, max {entry['max_wait_ms']} ms), "
+            f"timeouts {entry['timeouts']}"
+        )
+    return stats
+
+
+def read_frame(cursor):
+    """
+        Current result set of a DBAPI cursor as a DataFrame. Drivers return DECIMAL columns
+        (the nav) as decimal.Decimal, they are coerced to float so the models can fit them.
+    """
+    import pandas as pd
+
+    columns = [column[0] for column in cursor.description]
+    return pd.DataFrame.from_records([tuple(row) for row in cursor.fetchall()], columns=columns, coerce_float=True)
+
+
+def dispose_engines() -> None:
+    """
+        Close every pooled connection of this process and empty the registry.
+    """
+    with _registry_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _metrics.clear()
+        _sessions.clear()
 
 
 def test_connection(db_type: str) -> bool:
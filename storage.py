@@ -0,0 +1,194 @@
+#     _
+#  __| |_ ___ _ _ __ _ __ _ ___
+# (_-<  _/ _ \ '_/ _` / _` / -_)
+# /__/\__\___/_| \__,_\__, \___|
+#                     |___/
+#
+# Pluggable blob storage : Azure Blob or a local directory, one client per process.
+
+import os
+import shutil
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Iterable, List, Optional, Tuple, Union
+
+from logger import get_logger
+
+log = get_logger('Storage')
+
+STORAGE_MAX_CONCURRENCY = int(os.environ.get('STORAGE_MAX_CONCURRENCY', 4))
+STORAGE_BLOCK_SIZE = int(os.environ.get('STORAGE_BLOCK_SIZE', 4 * 1024 * 1024))
+
+
+class StorageBackend(ABC):
+    '''
+        Where extract files end up. Paths are '/' separated and relative to the container / root,
+        e.g. "daily_extracts/2025/01/31/mf_daily_navs_<uuid>_2025_01_31.parquet".
+    '''
+
+    @abstractmethod
+    def upload(self, path: str, data: Union[bytes, IO[bytes]]) -> str:
+        '''
+            Store `data` (bytes or a binary file object) at `path`, replacing what is there.
+        '''
+
+    @abstractmethod
+    def download(self, path: str) -> bytes:
+        '''
+            Content stored at `path`, FileNotFoundError when there is none.
+        '''
+
+    @abstractmethod
+    def list(self, prefix: str = '') -> List[str]:
+        pass
+
+    @abstractmethod
+    def delete(self, path: str) -> None:
+        pass
+
+    def upload_file(self, local_path: str, path: str) -> str:
+        with open(local_path, 'rb') as f:
+            return self.upload(path, f)
+
+    def upload_many(self, items: Iterable[Tuple[str, str]], max_workers: int = STORAGE_MAX_CONCURRENCY) -> List[str]:
+        '''
+            Upload (local_path, path) pairs concurrently, returns the stored paths in order.
+        '''
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda item: self.upload_file(*item), items))
+
+
+class LocalStorage(StorageBackend):
+    '''
+        A directory standing in for the container, for tests, benchmarks and laptop runs.
+    '''
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _local(self, path: str) -> str:
+        return os.path.join(self.root, *path.split('/'))
+
+    def upload(self, path: str, data: Union[bytes, IO[bytes]]) -> str:
+        target = self._local(path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp_path = f'{target}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as f:
+            if isinstance(data, (bytes, bytearray, memoryview)):
+                f.write(data)
+            else:
+                shutil.copyfileobj(data, f, STORAGE_BLOCK_SIZE)
+        os.replace(temp_path, target)
+        return path
+
+    def upload_file(self, local_path: str, path: str) -> str:
+        target = self._local(path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(local_path, f'{target}.{os.getpid()}.tmp')
+        os.replace(f'{target}.{os.getpid()}.tmp', target)
+        return path
+
+    def download(self, path: str) -> bytes:
+        with open(self._local(path), 'rb') as f:
+            return f.read()
+
+    def list(self, prefix: str = '') -> List[str]:
+        paths = []
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                relative = os.path.relpath(os.path.join(directory, name), self.root).replace(os.sep, '/')
+                if relative.startswith(prefix) and not relative.endswith('.tmp'):
+                    paths.append(relative)
+        return sorted(paths)
+
+    def delete(self, path: str) -> None:
+        try:
+            os.remove(self._local(path))
+        except FileNotFoundError:
+            pass
+
+
+class AzureBlobStorage(StorageBackend):
+    '''
+        One Azure container. The `BlobServiceClient` is built lazily once per process and
+        large uploads are split into `block_size` blocks sent `max_concurrency` at a time.
+    '''
+
+    def __init__(
+        self,
+        account_url: str,
+        credential: str,
+        container: str,
+        max_concurrency: int = STORAGE_MAX_CONCURRENCY,
+        block_size: int = STORAGE_BLOCK_SIZE
+    ):
+        self.account_url = account_url
+        self.credential = credential
+        self.container = container
+        self.max_concurrency = max_concurrency
+        self.block_size = block_size
+        self._client = None
+        self._client_pid = None
+
+    @property
+    def client(self):
+        if self._client is None or self._client_pid != os.getpid():
+            from azure.storage.blob import BlobServiceClient
+
+            service = BlobServiceClient(
+                self.account_url,
+                credential=self.credential,
+                max_block_size=self.block_size,
+                max_single_put_size=self.block_size,
+            )
+            self._client, self._client_pid = service.get_container_client(self.container), os.getpid()
+        return self._client
+
+    def upload(self, path: str, data: Union[bytes, IO[bytes]]) -> str:
+        self.client.upload_blob(path, data, overwrite=True, max_concurrency=self.max_concurrency)
+        return path
+
+    def download(self, path: str) -> bytes:
+        from azure.core.exceptions import ResourceNotFoundError
+
+        try:
+            return self.client.download_blob(path, max_concurrency=self.max_concurrency).readall()
+        except ResourceNotFoundError:
+            raise FileNotFoundError(f'{self.container}/{path}')
+
+    def list(self, prefix: str = '') -> List[str]:
+        return sorted(blob.name for blob in self.client.list_blobs(name_starts_with=prefix or None))
+
+    def delete(self, path: str) -> None:
+        from azure.core.exceptions import ResourceNotFoundError
+
+        try:
+            self.client.delete_blob(path)
+        except ResourceNotFoundError:
+            pass
+
+
+_storage: Optional[StorageBackend] = None
+_storage_key = None
+
+
+def get_storage() -> StorageBackend:
+    '''
+        The process wide backend picked by STORAGE_BACKEND :
+            - 'azure' (default) : ACCOUNT_URL, SAS_TOKEN, CONTAINER_NAME
+            - 'local' : STORAGE_LOCAL_ROOT (default ./storage)
+    '''
+    global _storage, _storage_key
+    backend = os.environ.get('STORAGE_BACKEND', 'azure').lower()
+    if backend == 'local':
+        key = (backend, os.environ.get('STORAGE_LOCAL_ROOT', 'storage'))
+    elif backend == 'azure':
+        key = (backend, os.getenv('ACCOUNT_URL'), os.getenv('SAS_TOKEN'), os.getenv('CONTAINER_NAME'))
+    else:
+        raise ValueError(f'Unknown STORAGE_BACKEND {backend!r}, expected azure or local')
+
+    if _storage is None or _storage_key != key:
+        _storage = LocalStorage(key[1]) if backend == 'local' else AzureBlobStorage(*key[1:])
+        _storage_key = key
+        log.debug(f'Storage backend : {backend}')
+    return _storage
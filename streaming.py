@@ -0,0 +1,158 @@
+#     _                      _
+#  __| |_ _ _ ___ __ _ _ __ (_)_ _  __ _
+# (_-<  _| '_/ -_) _` | '  \| | ' \/ _` |
+# /__/\__|_| \___\__,_|_|_|_|_|_||_\__, |
+#                                  |___/
+#
+# Incremental parser for full-history mfapi payloads that stops at the watermark.
+
+import json
+import codecs
+from datetime import date
+from typing import Dict, Iterable
+
+from .dates import DateTimeMixin
+
+STREAM_CHUNK = 16 * 1024
+_WHITESPACE = ' \t\r\n'
+_DELIMITERS = _WHITESPACE + ',]}'
+
+
+class HistoryStreamParser:
+    '''
+        Push parser for `{"meta": {...}, "data": [newest, ..., oldest], "status": ...}`.
+
+        Feed it body chunks as they arrive, it keeps every `data` entry newer than `cutoff`
+        and reports done at the first entry on or before it, so the caller can drop the
+        rest of the body unread :
+
+            parser = HistoryStreamParser(cutoff)
+            for chunk in response.iter_content(STREAM_CHUNK):
+                if parser.feed(chunk):
+                    break
+            payload = parser.close()
+
+        If `meta` were to come after `data` the remaining entries are skipped, not stored,
+        until it shows up.
+    '''
+
+    def __init__(self, cutoff: date):
+        self.cutoff = cutoff
+        self.result: Dict = {}
+        self.done = False
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._steps = self._parse()
+
+    def feed(self, chunk: bytes) -> bool:
+        '''
+            Consume one chunk, returns True once nothing more is needed.
+        '''
+        if not self.done:
+            self._buf += self._utf8.decode(chunk)
+            self._advance()
+        return self.done
+
+    def close(self) -> Dict:
+        '''
+            Signal end of body and return the filtered payload.
+        '''
+        if not self.done:
+            self._buf += self._utf8.decode(b'', final=True)
+            self._eof = True
+            self._advance()
+            if not self.done:
+                raise ValueError('Truncated JSON payload')
+        return self.result
+
+    def _advance(self):
+        try:
+            next(self._steps)
+        except StopIteration:
+            self.done = True
+
+    def _need_more(self):
+        if self._eof:
+            raise ValueError('Truncated JSON payload')
+
+    def _skip(self, chars: str = _WHITESPACE):
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in chars:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return
+            self._need_more()
+            yield
+
+    def _expect(self, char: str):
+        yield from self._skip()
+        if self._buf[self._pos] != char:
+            raise ValueError(f'Expected {char!r} at offset {self._pos}')
+        self._pos += 1
+
+    def _value(self):
+        yield from self._skip()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buf, self._pos)
+                # a scalar at the very end of the buffer may still be cut short, and a number
+                # is only whole once a delimiter follows : '12' of '12.5' decodes on its own
+                number = isinstance(value, (int, float)) and not isinstance(value, bool)
+                whole = end < len(self._buf) and (not number or self._buf[end] in _DELIMITERS)
+                if whole or self._eof:
+                    self._pos = end
+                    if self._pos > 1 << 16:
+                        self._buf, self._pos = self._buf[self._pos:], 0
+                    return value
+            except json.JSONDecodeError:
+                self._need_more()
+            yield
+
+    def _parse(self):
+        yield from self._expect('{')
+        stopped = False
+        while True:
+            yield from self._skip(_WHITESPACE + ',')
+            if self._buf[self._pos] == '}':
+                return
+
+            key = yield from self._value()
+            yield from self._expect(':')
+
+            if key != 'data':
+                self.result[key] = yield from self._value()
+                if stopped and 'meta' in self.result:
+                    return
+                continue
+
+            yield from self._expect('[')
+            entries = self.result['data'] = []
+            while True:
+                yield from self._skip(_WHITESPACE + ',')
+                if self._buf[self._pos] == ']':
+                    self._pos += 1
+                    break
+
+                entry = yield from self._value()
+                if stopped:
+                    continue
+                if DateTimeMixin.serialize(entry['date']) <= self.cutoff:
+                    stopped = True
+                    if 'meta' in self.result:
+                        return
+                    continue
+                entries.append(entry)
+
+
+def parse_history_until(chunks: Iterable[bytes], cutoff: date) -> Dict:
+    '''
+        Pull wrapper over `HistoryStreamParser` for an iterable of body chunks.
+    '''
+    parser = HistoryStreamParser(cutoff)
+    for chunk in chunks:
+        if parser.feed(chunk):
+            break
+    return parser.close()
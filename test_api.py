@@ -0,0 +1,49 @@
+#  _          _               _
+# | |_ ___ __| |_   __ _ _ __(_)
+# |  _/ -_|_-<  _| / _` | '_ \ |
+#  \__\___/__/\__| \__,_| .__/_|
+#                       |_|
+#
+# Daily batch writer : watermark filtering and per scheme error handling.
+
+from datetime import date, datetime
+
+import pyarrow.parquet as pq
+import pytest
+
+from utilities.api import RequestMixin
+from utilities.storage import get_storage
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setenv('STORAGE_BACKEND', 'local')
+    monkeypatch.setenv('STORAGE_LOCAL_ROOT', str(tmp_path))
+    monkeypatch.delenv('NAV_DATASET_DIR', raising=False)
+    return get_storage()
+
+
+def payload(scheme_code, *rows):
+    return {'meta': {'scheme_code': scheme_code}, 'data': [{'date': day, 'nav': nav} for day, nav in rows]}
+
+
+def test_one_bad_date_does_not_abort_the_batch(storage):
+    fetched = [
+        (101, payload(101, ('03-01-2026', '10.3'), ('02-01-2026', '10.2'), ('01-01-2026', '10.1')), '01-01-2026'),
+        (102, payload(102, ('03-01-2026', '20.3'), ('2026-01-02', '20.2'), ('01-01-2026', '20.1')), '01-01-2026'),
+        (103, payload(103, ('01-01-2026', '30.1')), '01-01-2026'),
+        (104, ValueError('HTTP 500'), '01-01-2026'),
+    ]
+    manifest = RequestMixin.write_daily_batch(fetched, insert_date=datetime(2026, 1, 4))
+
+    assert manifest['rows'] == 3
+    assert manifest['max_date'] == '2026-01-03'
+    assert manifest['watermarks'] == {'101': '03-01-2026', '102': '03-01-2026'}
+    assert manifest['malformed'] == {102: 1}
+    assert manifest['empty'] == [103]
+    assert list(manifest['errors']) == [104]
+
+    table = pq.read_table(storage._local(manifest['path']))
+    assert sorted(zip(table['scheme_code'].to_pylist(), table['date'].to_pylist())) == [
+        (101, date(2026, 1, 2)), (101, date(2026, 1, 3)), (102, date(2026, 1, 3)),
+    ]
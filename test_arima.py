@@ -0,0 +1,68 @@
+#  _          _              _
+# | |_ ___ __| |_   __ _ _ _(_)_ __  __ _
+# |  _/ -_|_-<  _| / _` | '_| | '  \/ _` |
+#  \__\___/__/\__| \__,_|_| |_|_|_|_\__,_|
+#
+# Fit-once ARIMA : state updates without refitting and the shape of the prediction interval.
+
+import numpy as np
+import pytest
+
+from forecasting.arima import ArimaForecaster
+
+pytestmark = pytest.mark.filterwarnings('ignore')  # statsmodels convergence chatter on short synthetic series
+
+
+@pytest.fixture
+def navs():
+    return 100.0 * np.cumprod(1.0 + np.random.default_rng(11).normal(0.0004, 0.008, 160))
+
+
+def fresh(series, params):
+    '''
+        The same parameters filtered over `series` from scratch.
+    '''
+    from statsmodels.tsa.arima.model import ARIMA
+
+    return ARIMA(series, order=(2, 1, 2)).filter(params)
+
+
+def test_append_matches_filtering_the_extended_series(navs):
+    forecaster = ArimaForecaster(history_window=150).fit(navs[:150])
+    params = forecaster._results.params
+
+    result = forecaster.append(navs[150:]).forecast(10)
+    expected = fresh(navs, params).get_forecast(10)
+    np.testing.assert_allclose(result.mean, expected.predicted_mean, rtol=1e-8)
+    np.testing.assert_allclose(result.lower, np.asarray(expected.conf_int(alpha=0.05))[:, 0], rtol=1e-8)
+
+
+def test_apply_slides_the_window_with_the_same_parameters(navs):
+    forecaster = ArimaForecaster(history_window=100).fit(navs[:100])
+    params = forecaster._results.params
+
+    result = forecaster.apply(navs).forecast(5)  # keeps the last 100 observations
+    np.testing.assert_allclose(result.mean, fresh(navs[-100:], params).get_forecast(5).predicted_mean, rtol=1e-8)
+    np.testing.assert_array_equal(forecaster._results.params, params)
+
+
+def test_state_update_stays_close_to_a_refit(navs):
+    updated = ArimaForecaster(history_window=160).fit(navs[:150]).append(navs[150:]).forecast(7)
+    refit = ArimaForecaster(history_window=160).fit(navs).forecast(7)
+    np.testing.assert_allclose(updated.mean, refit.mean, rtol=0.01)
+
+
+def test_forecast_interval_shape(navs):
+    forecaster = ArimaForecaster().fit(navs)
+    result = forecaster.forecast(30)
+    assert result.mean.shape == result.lower.shape == result.upper.shape == (30,)
+    assert (result.lower < result.mean).all() and (result.mean < result.upper).all()
+    assert np.all(np.diff(result.upper - result.lower) >= 0)  # uncertainty grows with the horizon
+
+    wider = forecaster.forecast(30, alpha=0.01)
+    assert (wider.upper - wider.lower > result.upper - result.lower).all()
+
+
+def test_unfitted_forecaster_raises():
+    with pytest.raises(RuntimeError):
+        ArimaForecaster().forecast(5)
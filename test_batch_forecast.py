@@ -0,0 +1,61 @@
+#  _          _     _          _      _       __                        _
+# | |_ ___ __| |_  | |__  __ _| |_ __| |_    / _|___ _ _ ___ __ __ _ __| |_
+# |  _/ -_|_-<  _| | '_ \/ _` |  _/ _| ' \  |  _/ _ \ '_/ -_) _/ _` (_-<  _|
+#  \__\___/__/\__| |_.__/\__,_|\__\__|_||_|_|_| \___/_| \___\__\__,_/__/\__|
+#                                        |___|
+#
+# Forecast table layout and the storage round trip of the nightly forecast file.
+
+from datetime import date
+
+import numpy as np
+import pyarrow as pa
+
+from models.arrow_schema import FORECAST_ARROW_SCHEMA
+from utilities.storage import LocalStorage
+from forecasting.batch_forecast import ForecastTask, _forecast_chunk, forecast_table, read_forecasts, write_forecasts
+
+
+def test_forecast_table_layout():
+    table = forecast_table(date(2026, 1, 5), 'arima', [101, 102], [date(2026, 1, 2), date(2026, 1, 3)],
+                           np.array([[1.0, 2.0], [3.0, 4.0]]), np.zeros((2, 2)), np.ones((2, 2)))
+    assert table.schema == FORECAST_ARROW_SCHEMA
+    assert table['scheme_code'].to_pylist() == [101, 101, 102, 102]
+    assert table['step'].to_pylist() == [1, 2, 1, 2]
+    assert table['date'].to_pylist() == [date(2026, 1, 3), date(2026, 1, 4), date(2026, 1, 4), date(2026, 1, 5)]
+
+
+def test_write_read_round_trip(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    path = 'forecasts/nav_forecasts.parquet'
+    run_date = date(2026, 1, 5)
+    table = forecast_table(run_date, 'linear_regression', [102, 101], [run_date] * 2, np.array([[1.0, 2.0], [3.0, 4.0]]))
+    lstm = forecast_table(run_date, 'lstm_shared', [101], [run_date], np.array([[5.0, 6.0]]))
+
+    assert write_forecasts(pa.concat_tables([table, lstm]), path, storage) == path
+
+    frame = read_forecasts(101, path=path, storage=storage)
+    assert sorted(set(frame['algorithm'])) == ['linear_regression', 'lstm_shared']
+
+    frame = read_forecasts(101, 'linear_regression', path=path, storage=storage)
+    assert frame['nav'].tolist() == [3.0, 4.0]
+    assert frame['step'].tolist() == [1, 2]
+    assert frame['lower'].isna().all()
+
+    assert read_forecasts(999, path=path, storage=storage) is None
+    assert read_forecasts(101, path='forecasts/missing.parquet', storage=storage) is None
+
+
+def test_short_histories_are_reported_not_fitted():
+    task = ForecastTask(
+        chunk_id='chunk_0',
+        run_date=date(2026, 1, 5),
+        horizon=3,
+        algorithms=('linear_regression',),
+        schemes=((101, date(2026, 1, 4), tuple(np.linspace(10, 11, 60))), (102, date(2026, 1, 4), (10.0, 10.1))),
+        min_history=50
+    )
+    chunk_id, result = _forecast_chunk(task)
+    assert chunk_id == 'chunk_0'
+    assert set(result['table']['scheme_code'].to_pylist()) == {101}
+    assert list(result['errors']) == ['102:linear_regression']
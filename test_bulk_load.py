@@ -0,0 +1,97 @@
+#  _          _     _         _ _     _              _
+# | |_ ___ __| |_  | |__ _  _| | |__ | |___  __ _ __| |
+# |  _/ -_|_-<  _| | '_ \ || | | / / | / _ \/ _` / _` |
+#  \__\___/__/\__| |_.__/\_,_|_|_\_\_|_\___/\__,_\__,_|
+#                                 |___|
+#
+# Bulk loads into SQLite : append, merge idempotency and create-db dedupe.
+
+from datetime import date, datetime
+
+import pyarrow as pa
+import pytest
+from sqlalchemy import create_engine, text
+
+from models.arrow_schema import nav_arrow_schema
+from models.base import Base
+from database.bulk_load import BulkLoader, dedupe_nav
+
+
+def nav_table(rows):
+    insert_date, codes, dates, navs = zip(*rows)
+    return pa.table({
+        'insert_date': list(insert_date),
+        'scheme_code': list(codes),
+        'date': list(dates),
+        'nav': pa.array(navs, pa.float64()),
+    }).cast(nav_arrow_schema('float64'))
+
+
+def stored(engine):
+    with engine.connect() as connection:
+        return [
+            (code, str(day)[:10], float(nav))
+            for code, day, nav in connection.execute(
+                text('SELECT scheme_code, date, nav FROM mutual_fund_nav ORDER BY scheme_code, date')
+            )
+        ]
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def test_merge_is_idempotent(engine):
+    loaded = datetime(2026, 1, 3)
+    table = nav_table([
+        (loaded, 101, date(2026, 1, 1), 10.0),
+        (loaded, 101, date(2026, 1, 2), 10.5),
+        (loaded, 102, date(2026, 1, 2), 20.0),
+    ])
+    loader = BulkLoader(engine)
+
+    assert loader.load([table], mode='merge') == 3
+    first = stored(engine)
+    loader.load([table], mode='merge')
+    assert stored(engine) == first == [
+        (101, '2026-01-01', 10.0), (101, '2026-01-02', 10.5), (102, '2026-01-02', 20.0),
+    ]
+
+
+def test_merge_updates_restated_navs_and_keeps_latest_staged_row(engine):
+    loader = BulkLoader(engine)
+    loader.load([nav_table([(datetime(2026, 1, 2), 101, date(2026, 1, 1), 10.0)])], mode='merge')
+
+    loader.load([nav_table([
+        (datetime(2026, 1, 3), 101, date(2026, 1, 1), 11.0),
+        (datetime(2026, 1, 4), 101, date(2026, 1, 1), 12.0),
+        (datetime(2026, 1, 4), 101, date(2026, 1, 2), 13.0),
+    ])], mode='merge')
+    assert stored(engine) == [(101, '2026-01-01', 12.0), (101, '2026-01-02', 13.0)]
+
+
+def test_merge_rejects_unsupported_dialects(engine):
+    loader = BulkLoader(engine)
+    loader.engine = type('Engine', (), {'dialect': type('Dialect', (), {'name': 'oracle'})()})()
+    with pytest.raises(ValueError):
+        loader.load([], mode='merge')
+
+
+def test_dedupe_nav_keeps_latest_insert():
+    engine = create_engine('sqlite://')
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            'CREATE TABLE mutual_fund_nav (id INTEGER PRIMARY KEY, insert_date TIMESTAMP, '
+            'scheme_code INTEGER, date DATE, nav NUMERIC)'
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO mutual_fund_nav (insert_date, scheme_code, date, nav) VALUES "
+            "('2026-01-02', 101, '2026-01-01', 10), ('2026-01-03', 101, '2026-01-01', 11), "
+            "(NULL, 101, '2026-01-01', 9), ('2026-01-02', 102, '2026-01-01', 5)"
+        )
+
+    assert dedupe_nav(engine) == 2
+    assert stored(engine) == [(101, '2026-01-01', 11.0), (102, '2026-01-01', 5.0)]
@@ -0,0 +1,59 @@
+#  _          _        _      _
+# | |_ ___ __| |_   __| |__ _| |_ ___ ___
+# |  _/ -_|_-<  _| / _` / _` |  _/ -_|_-<
+#  \__\___/__/\__| \__,_\__,_|\__\___/__/
+#
+# Vectorized 'DD-MM-YYYY' parsing.
+
+from datetime import date
+
+import numpy as np
+import pytest
+
+from utilities.dates import day_gaps, parse_dates
+
+
+def test_parse_dates_valid():
+    parsed = parse_dates(['01-02-2025', '29-02-2024'])
+    assert parsed.dtype == np.dtype('datetime64[D]')
+    assert parsed.tolist() == [date(2025, 2, 1), date(2024, 2, 29)]
+
+
+def test_parse_dates_keeps_shape():
+    parsed = parse_dates(np.array([['01-02-2025'], ['03-04-2025']]))
+    assert parsed.shape == (2, 1)
+
+
+def test_parse_dates_empty():
+    assert parse_dates([]).shape == (0,)
+
+
+@pytest.mark.parametrize('value', [
+    '01-02-20255',  # longer than DD-MM-YYYY, used to be truncated into a valid date
+    '01-02-202',
+    '1-2-2025',
+    '01/02/2025',
+    '2025-02-01',
+    '31-02-2025',
+    'aa-bb-cccc',
+    '',
+])
+def test_parse_dates_rejects_invalid(value):
+    with pytest.raises(ValueError):
+        parse_dates(['01-01-2025', value])
+
+
+def test_day_gaps():
+    assert day_gaps(['01-01-2026', '25-12-2025'], today=date(2026, 1, 1)).tolist() == [0, 7]
+
+
+def test_parse_dates_coerce():
+    parsed = parse_dates(['01-02-2025', '31-02-2025', '01-02-20255', '', 'aa-bb-cccc'], errors='coerce')
+    assert parsed[0] == np.datetime64('2025-02-01')
+    assert np.isnat(parsed[1:]).all()
+    assert not (parsed > np.datetime64('2000-01-01'))[1:].any()
+
+
+def test_parse_dates_unknown_errors_mode():
+    with pytest.raises(ValueError):
+        parse_dates(['01-02-2025'], errors='ignore')
@@ -0,0 +1,102 @@
+#  _          _     _   _   _                     _
+# | |_ ___ __| |_  | |_| |_| |_ _ __   __ __ _ __| |_  ___
+# |  _/ -_|_-<  _| | ' \  _|  _| '_ \ / _/ _` / _| ' \/ -_)
+#  \__\___/__/\__| |_||_\__|\__| .__/_\__\__,_\__|_||_\___|
+#                              |_| |___|
+#
+# On-disk response cache : validators, freshness and LRU eviction on a frozen clock.
+
+import os
+
+import pytest
+
+from utilities import http_cache
+from utilities.http_cache import ResponseCache
+
+
+class Clock:
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(http_cache, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return ResponseCache(str(tmp_path), max_bytes=10, max_age=60)
+
+
+def objects(cache):
+    return sorted(name for _, _, names in os.walk(os.path.join(cache.root, 'objects')) for name in names)
+
+
+def test_store_and_load(cache):
+    cache.store('https://api/1', b'body', {})
+    entry = cache.lookup('https://api/1')
+    assert (entry.size, entry.etag, entry.last_modified) == (4, None, None)
+    assert cache.load(entry) == b'body'
+    assert cache.lookup('https://api/2') is None
+
+
+def test_conditional_headers_from_validators(cache):
+    cache.store('https://api/1', b'body', {'ETag': '"v1"', 'Last-Modified': 'Fri, 02 Jan 2026 00:00:00 GMT'})
+    assert ResponseCache.conditional_headers(cache.lookup('https://api/1')) == {
+        'If-None-Match': '"v1"',
+        'If-Modified-Since': 'Fri, 02 Jan 2026 00:00:00 GMT',
+    }
+    assert ResponseCache.conditional_headers(None) == {}
+
+
+def test_max_age_and_revalidation(cache, clock):
+    cache.store('https://api/1', b'body', {'ETag': '"v1"'})
+    assert cache.is_fresh(cache.lookup('https://api/1'))
+
+    clock.now += 61
+    entry = cache.lookup('https://api/1')
+    assert not cache.is_fresh(entry)
+
+    assert cache.revalidated(entry) == b'body'  # upstream 304
+    assert cache.is_fresh(cache.lookup('https://api/1'))
+
+
+def test_identical_bodies_are_stored_once(cache):
+    cache.store('https://api/1', b'same', {})
+    cache.store('https://api/2', b'same', {})
+    assert len(objects(cache)) == 1
+    assert cache.total_bytes() == 4
+
+
+def test_evicts_least_recently_used(cache, clock):
+    cache.store('https://api/a', b'aaaa', {})
+    clock.now += 1
+    cache.store('https://api/b', b'bbbb', {})
+    clock.now += 1
+    cache.load(cache.lookup('https://api/a'))
+    clock.now += 1
+    cache.store('https://api/c', b'cccc', {})  # 12 bytes > 10 : b is the oldest access
+
+    assert cache.lookup('https://api/b') is None
+    assert cache.lookup('https://api/a') and cache.lookup('https://api/c')
+    assert cache.total_bytes() == 8
+    assert len(objects(cache)) == 2
+
+
+def test_eviction_keeps_bodies_still_referenced(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path), max_bytes=8, max_age=60)
+    for url, body in [('https://api/b', b'same'), ('https://api/a', b'aaaa'), ('https://api/d', b'same'), ('https://api/c', b'cccc')]:
+        cache.store(url, body, {})
+        clock.now += 1
+
+    assert cache.lookup('https://api/b') is None  # evicted first, its body is still used by d
+    assert cache.lookup('https://api/a') is None
+    assert cache.load(cache.lookup('https://api/d')) == b'same'
+    assert len(objects(cache)) == 2
@@ -0,0 +1,119 @@
+#  _          _     _    _                      _
+# | |_ ___ __| |_  | |__| |_ _ __    __ __ _ __| |_  ___
+# |  _/ -_|_-<  _| | (_-<  _| '  \  / _/ _` / _| ' \/ -_)
+#  \__\___/__/\__| |_/__/\__|_|_|_|_\__\__,_\__|_||_\___|
+#                                |___|
+#
+# LSTM model cache with training stubbed out : byte bounded LRU, disk reloads and pruning.
+
+import glob
+import os
+from datetime import date
+
+import numpy as np
+import pytest
+
+from forecasting import lstm_cache
+from forecasting.lstm import LSTMConfig, TrainedLSTM
+from forecasting.lstm_cache import LSTMModelCache
+
+
+class FakeKeras:
+    '''
+        Just enough of a keras model : weights of a given size and a save to disk.
+    '''
+
+    def __init__(self, nbytes):
+        self.weights = [np.zeros(nbytes // 8)]
+
+    def get_weights(self):
+        return self.weights
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            f.write(str(self.weights[0].nbytes))
+
+
+@pytest.fixture
+def trained(monkeypatch):
+    calls = []
+
+    def train_lstm(navs, config):
+        calls.append(len(navs))
+        return TrainedLSTM(FakeKeras(800), min(navs), max(navs), config)
+
+    monkeypatch.setattr(lstm_cache, 'train_lstm', train_lstm)
+    return calls
+
+
+@pytest.fixture
+def loaded(monkeypatch):
+    calls = []
+
+    def load(cls, path, data_min, data_max, config):
+        calls.append(os.path.basename(path))
+        with open(path) as f:
+            return cls(FakeKeras(int(f.read())), data_min, data_max, config)
+
+    monkeypatch.setattr(TrainedLSTM, 'load', classmethod(load))
+    return calls
+
+
+NAVS = [10.0, 10.5, 11.0]
+
+
+def test_lru_eviction_by_bytes(trained):
+    cache = LSTMModelCache(directory=None, max_bytes=2000)  # room for two 800 byte models
+    for code in (101, 102):
+        cache.get_or_train(code, date(2026, 1, 2), NAVS)
+    cache.get(101, date(2026, 1, 2))  # 102 becomes the least recently used
+    cache.get_or_train(103, date(2026, 1, 2), NAVS)
+
+    assert cache.get(102, date(2026, 1, 2)) is None
+    assert cache.get(101, date(2026, 1, 2)) is not None
+    stats = cache.stats()
+    assert (stats['models'], stats['bytes'], stats['evictions'], stats['trainings']) == (2, 1600, 1, 3)
+
+
+def test_hit_skips_training(trained):
+    cache = LSTMModelCache(directory=None)
+    first = cache.get_or_train(101, date(2026, 1, 2), NAVS)
+    assert cache.get_or_train(101, '2026-01-02', NAVS) is first
+    assert cache.get_or_train(101, date(2026, 1, 2), NAVS, LSTMConfig(epochs=1)) is not first
+    assert len(trained) == 2
+
+
+def test_restart_reloads_from_the_sidecar(tmp_path, trained, loaded):
+    LSTMModelCache(str(tmp_path)).get_or_train(101, date(2026, 1, 2), NAVS)
+
+    restarted = LSTMModelCache(str(tmp_path))
+    model = restarted.get_or_train(101, date(2026, 1, 2), NAVS)
+    assert len(trained) == 1 and len(loaded) == 1
+    assert (float(model.data_min), float(model.data_max), model.nbytes) == (10.0, 11.0, 800)
+    assert restarted.stats()['disk_hits'] == 1
+
+
+def test_unreadable_sidecar_retrains(tmp_path, trained, loaded):
+    cache = LSTMModelCache(str(tmp_path))
+    cache.get_or_train(101, date(2026, 1, 2), NAVS)
+    [sidecar] = glob.glob(str(tmp_path / '*.json'))
+    with open(sidecar, 'w') as f:
+        f.write('{not json')
+
+    LSTMModelCache(str(tmp_path)).get_or_train(101, date(2026, 1, 2), NAVS)
+    assert len(trained) == 2
+
+
+def test_prune_keeps_only_the_newest_date(tmp_path, trained, loaded):
+    cache = LSTMModelCache(str(tmp_path))
+    cache.get_or_train(101, date(2026, 1, 3), NAVS)
+    cache.get_or_train(101, date(2026, 1, 2), NAVS)  # late arrival of an older day
+    cache.get_or_train(101, date(2026, 1, 3), NAVS, LSTMConfig(epochs=1))
+    cache.get_or_train(102, date(2026, 1, 1), NAVS)
+
+    restarted = LSTMModelCache(str(tmp_path))
+    assert restarted.get(101, date(2026, 1, 2)) is None
+    assert restarted.get(101, date(2026, 1, 3)) is not None
+    assert restarted.get(101, date(2026, 1, 3), LSTMConfig(epochs=1)) is not None
+    assert restarted.get(102, date(2026, 1, 1)) is not None
+    assert len(glob.glob(str(tmp_path / '*.json'))) == len(glob.glob(str(tmp_path / '*.keras'))) == 3
@@ -0,0 +1,74 @@
+#  _          _                       _      _                _
+# | |_ ___ __| |_   _ _  __ ___ __ __| |__ _| |_ __ _ ___ ___| |_
+# |  _/ -_|_-<  _| | ' \/ _` \ V // _` / _` |  _/ _` (_-</ -_)  _|
+#  \__\___/__/\__| |_||_\__,_|\_/_\__,_\__,_|\__\__,_/__/\___|\__|
+#                              |___|
+#
+# Partitioned NAV dataset : manifest pruning and crash safe compaction.
+
+import os
+from datetime import date, datetime
+
+import pyarrow as pa
+import pytest
+
+from models.arrow_schema import nav_arrow_schema
+from utilities import nav_dataset
+from utilities.nav_dataset import NavDataset
+
+
+def nav_table(insert_date, rows):
+    codes, dates, navs = zip(*rows)
+    return pa.table({
+        'insert_date': [insert_date] * len(rows),
+        'scheme_code': list(codes),
+        'date': list(dates),
+        'nav': pa.array(navs, pa.float64()),
+    }).cast(nav_arrow_schema('float64'))
+
+
+def rows(dataset):
+    table = dataset.read().sort_by([('scheme_code', 'ascending'), ('date', 'ascending')])
+    return list(zip(table['scheme_code'].to_pylist(), table['date'].to_pylist(), table['nav'].to_pylist()))
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    dataset = NavDataset(str(tmp_path), buckets=4)
+    dataset.write(nav_table(datetime(2026, 1, 2), [(101, date(2026, 1, 1), 10.0), (102, date(2026, 1, 1), 20.0)]))
+    dataset.write(nav_table(datetime(2026, 1, 3), [(101, date(2026, 1, 1), 11.0), (101, date(2026, 1, 2), 12.0)]))
+    return dataset
+
+
+def test_files_prunes_by_bucket_and_date(dataset):
+    assert {entry['bucket'] for entry in dataset.files(scheme_codes=[101])} == {1}
+    assert dataset.files(scheme_codes=[101], start=date(2026, 2, 1)) == []
+
+
+def test_compact_merges_partitions_and_keeps_latest_insert(dataset):
+    stats = dataset.compact()
+    assert stats == {'partitions': 2, 'files_before': 3, 'files_after': 2}
+    assert rows(dataset) == [(101, date(2026, 1, 1), 11.0), (101, date(2026, 1, 2), 12.0), (102, date(2026, 1, 1), 20.0)]
+    assert sorted(os.listdir(dataset.manifest_dir)) == ['dataset.json', 'snapshot.json']
+
+
+def test_interrupted_compaction_neither_duplicates_nor_leaks(dataset, monkeypatch):
+    def crash(path):
+        raise OSError('disk went away')
+
+    monkeypatch.setattr(nav_dataset.os, 'remove', crash)
+    with pytest.raises(OSError):
+        dataset.compact()
+    monkeypatch.undo()
+
+    # snapshot published, fragments and merged files still on disk
+    assert len(dataset.manifest()) == 2
+    assert rows(dataset) == [(101, date(2026, 1, 1), 11.0), (101, date(2026, 1, 2), 12.0), (102, date(2026, 1, 1), 20.0)]
+
+    dataset.compact()
+    assert sorted(os.listdir(dataset.manifest_dir)) == ['dataset.json', 'snapshot.json']
+    on_disk = {
+        os.path.relpath(os.path.join(directory, name), dataset.root)
+        for directory, _, names in os.walk(dataset.data_dir) for name in names
+    }
+    assert on_disk == {entry['path'] for entry in dataset.manifest()}
@@ -0,0 +1,45 @@
+#  _          _                             _ _
+# | |_ ___ __| |_   _ _  ___ _ _ _ __  __ _| (_)______
+# |  _/ -_|_-<  _| | ' \/ _ \ '_| '  \/ _` | | |_ / -_)
+#  \__\___/__/\__| |_||_\___/_| |_|_|_\__,_|_|_/__\___|
+#
+# Date parsing and payload normalization of mfapi NAV payloads.
+
+from datetime import date, datetime
+
+import pyarrow as pa
+
+from utilities.normalize import normalize_nav_payloads, parse_mfapi_dates
+
+
+def test_parse_mfapi_dates_valid():
+    parsed = parse_mfapi_dates(pa.array(['01-02-2025', '29-02-2024', '31-12-2024']))
+    assert parsed.type == pa.date32()
+    assert parsed.to_pylist() == [date(2025, 2, 1), date(2024, 2, 29), date(2024, 12, 31)]
+
+
+def test_parse_mfapi_dates_nulls_impossible_days():
+    parsed = parse_mfapi_dates(pa.array(['31-02-2025', '29-02-2023', '31-04-2025', '32-01-2025']))
+    assert parsed.null_count == 4
+
+
+def test_parse_mfapi_dates_nulls_malformed():
+    parsed = parse_mfapi_dates(pa.array([None, '', 'not a date', '2025-02-01', '1-2-2025', '01-02-20255']))
+    assert parsed.null_count == len(parsed)
+
+
+def test_normalize_drops_invalid_rows_and_shares_insert_date():
+    insert_date = datetime(2026, 1, 5, 6, 30)
+    payloads = [
+        {'meta': {'scheme_code': 101}, 'data': [
+            {'date': '02-01-2026', 'nav': '10.123456789'},
+            {'date': '31-02-2025', 'nav': '10.0'},
+            {'date': '01-01-2026', 'nav': 'N.A.'},
+        ]},
+        {'meta': {'scheme_code': 102}, 'data': [{'date': '01-01-2026', 'nav': '5'}]},
+    ]
+    table = normalize_nav_payloads(payloads, insert_date=insert_date)
+    assert table['scheme_code'].to_pylist() == [101, 102]
+    assert table['date'].to_pylist() == [date(2026, 1, 2), date(2026, 1, 1)]
+    assert [str(nav) for nav in table['nav'].to_pylist()] == ['10.12346', '5.00000']
+    assert set(table['insert_date'].to_pylist()) == {insert_date}
@@ -0,0 +1,103 @@
+#  _          _              _         _ _       _ _
+# | |_ ___ __| |_   _ _ __ _| |_ ___  | (_)_ __ (_) |_
+# |  _/ -_|_-<  _| | '_/ _` |  _/ -_) | | | '  \| |  _|
+#  \__\___/__/\__| |_| \__,_|\__\___|_|_|_|_|_|_|_|\__|
+#                                  |___|
+#
+# Shared token bucket : slot spacing, throttling backoff and resets on a frozen clock.
+
+import pytest
+
+from utilities import rate_limit
+from utilities.rate_limit import RateLimiter
+
+
+class Clock:
+    '''
+        Stands in for the time module, sleeping only moves the clock.
+    '''
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+        self.slept = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def limiter(tmp_path, clock):
+    return RateLimiter('api.example.com', rate=10, state_dir=str(tmp_path))
+
+
+def test_reserve_spaces_slots_by_the_rate(limiter):
+    assert [round(limiter.reserve(), 6) for _ in range(4)] == [0.0, 0.1, 0.2, 0.3]
+
+
+def test_burst_sends_immediately_then_spaces(tmp_path, clock):
+    limiter = RateLimiter('api.example.com', rate=10, burst=3, state_dir=str(tmp_path))
+    assert [round(limiter.reserve(), 6) for _ in range(5)] == [0.0, 0.0, 0.0, 0.1, 0.2]
+
+
+def test_acquire_sleeps_until_the_slot(limiter, clock):
+    for _ in range(3):
+        limiter.acquire()
+    assert [round(seconds, 6) for seconds in clock.slept] == [0.1, 0.1]
+    assert round(limiter.reserve(), 6) == 0.1
+
+
+def test_instances_share_the_state_file(limiter, tmp_path):
+    other = RateLimiter('api.example.com', rate=10, state_dir=str(tmp_path))
+    limiter.reserve()
+    assert round(other.reserve(), 6) == 0.1
+    assert other.stats()['requests'] == 2
+
+
+def test_throttle_halves_rate_and_blocks_one_interval(limiter, clock):
+    assert limiter.feedback(429) is True
+    assert limiter.stats()['current_rate'] == 5.0
+    assert round(limiter.reserve(), 6) == 0.2  # blocked for 1 / new rate
+
+
+def test_retry_after_blocks_the_host(limiter, clock):
+    limiter.feedback(503, retry_after='3')
+    assert limiter.stats()['throttled'] == 1
+    assert round(limiter.reserve(), 6) == 3.0
+    assert round(limiter.reserve(), 6) == 3.2  # then spaced at the halved rate
+
+
+def test_rate_floor_and_recovery(limiter):
+    for _ in range(10):
+        limiter.feedback(429)
+    assert limiter.stats()['current_rate'] == limiter.min_rate
+
+    assert limiter.feedback(200) is False
+    assert limiter.stats()['current_rate'] == round(limiter.min_rate + 10 / 50, 3)
+
+
+def test_reset_starts_a_fresh_window(limiter):
+    for _ in range(3):
+        limiter.reserve()
+    limiter.feedback(429, retry_after='60')
+
+    limiter.reset()
+    stats = limiter.stats()
+    assert (stats['requests'], stats['throttled'], stats['current_rate']) == (0, 0, 10.0)
+    assert limiter.reserve() == 0.0
+
+
+def test_parse_retry_after(clock):
+    assert rate_limit.parse_retry_after('2.5') == 2.5
+    assert rate_limit.parse_retry_after(None) is None
+    assert rate_limit.parse_retry_after('soon') is None
@@ -0,0 +1,87 @@
+#  _          _                  _
+# | |_ ___ __| |_   _ _ ___ _  _| |_ ___ _ _
+# |  _/ -_|_-<  _| | '_/ _ \ || |  _/ -_) '_|
+#  \__\___/__/\__| |_| \___/\_,_|\__\___|_|
+#
+# Engine registry, post-fork pool handling, pool metrics and DBAPI result sets on SQLite.
+
+import os
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+
+from database import router
+from database.router import read_frame
+
+
+class Cursor:
+    description = (('date', None), ('nav', None))
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetchall(self):
+        return self.rows
+
+
+def test_read_frame_coerces_decimal_navs():
+    frame = read_frame(Cursor([(date(2026, 1, 1), Decimal('10.1234')), (date(2026, 1, 2), Decimal('10.5'))]))
+    assert list(frame.columns) == ['date', 'nav']
+    assert frame['nav'].dtype == float
+    assert frame['nav'].tolist() == [10.1234, 10.5]
+
+
+def test_read_frame_empty_result_set():
+    frame = read_frame(Cursor([]))
+    assert list(frame.columns) == ['date', 'nav'] and frame.empty
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    monkeypatch.setenv('SQLITE_PATH', str(tmp_path / 'navs.sqlite'))
+    router.dispose_engines()
+    yield str(tmp_path / 'navs.sqlite')
+    router.dispose_engines()
+
+
+def test_engines_are_shared_per_type_url_and_kwargs(sqlite_db, tmp_path, monkeypatch):
+    engine = router.get_engine('sqlite')
+    assert router.get_engine('SQLite') is engine
+    assert router.get_engine('sqlite', pool_size=2) is not engine
+    assert router.get_engine('sqlite', pool_size=2) is router.get_engine('sqlite', pool_size=2)
+
+    monkeypatch.setenv('SQLITE_PATH', str(tmp_path / 'other.sqlite'))
+    assert router.get_engine('sqlite') is not engine
+
+
+def test_sessions_are_cached_per_engine(sqlite_db):
+    assert router.get_session('sqlite') is router.get_session('sqlite')
+    assert router.get_session('sqlite') is not router.get_session('sqlite', expire_on_commit=False)
+
+
+def test_forked_worker_drops_inherited_pools(sqlite_db, monkeypatch):
+    inherited = router.get_engine('sqlite')
+    disposed = []
+    monkeypatch.setattr(inherited, 'dispose', lambda close=True: disposed.append(close))
+    monkeypatch.setattr(router, '_registry_pid', os.getpid() + 1)  # as seen from a forked child
+
+    engine = router.get_engine('sqlite')
+    assert engine is not inherited
+    assert disposed == [False]  # the parent's connections are left open
+    assert router._registry_pid == os.getpid()
+    assert router.get_engine('sqlite') is engine
+
+
+def test_pool_metrics_track_checkouts(sqlite_db):
+    engine = router.get_engine('sqlite', pool_size=2)
+    with engine.connect() as first, engine.connect() as second:
+        first.execute(text('SELECT 1'))
+        second.execute(text('SELECT 1'))
+        [busy] = router.pool_metrics()
+        assert (busy['pool'], busy['size'], busy['checked_out']) == ('QueuePool', 2, 2)
+
+    [idle] = router.pool_metrics()
+    assert (idle['checked_out'], idle['checkouts'], idle['connects'], idle['timeouts']) == (0, 2, 2, 0)
+    assert idle['db_type'] == 'sqlite'
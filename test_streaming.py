@@ -0,0 +1,71 @@
+#  _          _        _                      _
+# | |_ ___ __| |_   __| |_ _ _ ___ __ _ _ __ (_)_ _  __ _
+# |  _/ -_|_-<  _| (_-<  _| '_/ -_) _` | '  \| | ' \/ _` |
+#  \__\___/__/\__| /__/\__|_| \___\__,_|_|_|_|_|_||_\__, |
+#                                                   |___/
+#
+# Streaming history parser : chunk boundaries anywhere and the early stop at the cutoff.
+
+import json
+from datetime import date
+
+import pytest
+
+from utilities.streaming import HistoryStreamParser, parse_history_until
+
+META = {'scheme_code': 120503, 'scheme_name': 'Fund – "Growth" \\ Direct ₹', 'aum': 12345.678e2}
+DATA = [{'date': f'{day:02}-01-2026', 'nav': f'{10 + day / 100:.4f}'} for day in range(20, 0, -1)]
+
+
+def body(payload):
+    return json.dumps(payload, ensure_ascii=False, indent=1).encode('utf-8')
+
+
+def chunked(data, size):
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64, 1 << 20])
+def test_any_chunk_boundary(size):
+    payload = {'meta': META, 'data': DATA, 'status': 'SUCCESS', 'count': 3.25e-3}
+    assert parse_history_until(chunked(body(payload), size), date(2025, 12, 31)) == payload
+
+
+@pytest.mark.parametrize('split', ['Growth', '₹', '12345', '3.25', 'SUCCESS'])
+def test_split_inside_strings_and_numbers(split):
+    payload = {'meta': META, 'status': 'SUCCESS', 'count': 3.25, 'data': DATA}
+    data = body(payload)
+    cut = data.index(split.encode('utf-8')) + 1  # lands inside the token, mid code point for the rupee sign
+    assert parse_history_until([data[:cut], data[cut:]], date(2025, 12, 31)) == payload
+
+
+def test_stops_at_the_cutoff_without_reading_the_rest():
+    chunks = chunked(body({'meta': META, 'data': DATA, 'status': 'SUCCESS'}), 32)
+    consumed = []
+
+    def source():
+        for chunk in chunks:
+            consumed.append(chunk)
+            yield chunk
+
+    payload = parse_history_until(source(), date(2026, 1, 17))
+    assert [entry['date'] for entry in payload['data']] == ['20-01-2026', '19-01-2026', '18-01-2026']
+    assert payload['meta'] == META
+    assert len(consumed) < len(chunks)
+
+
+def test_meta_after_data_is_still_collected():
+    data = body({'data': DATA, 'meta': META})
+    parser = HistoryStreamParser(date(2026, 1, 18))
+    for chunk in chunked(data, 16):
+        if parser.feed(chunk):
+            break
+    payload = parser.close()
+    assert [entry['date'] for entry in payload['data']] == ['20-01-2026', '19-01-2026']
+    assert payload['meta'] == META
+
+
+def test_truncated_body_raises():
+    data = body({'meta': META, 'data': DATA})
+    with pytest.raises(ValueError):
+        parse_history_until([data[:-10]], date(2025, 12, 31))
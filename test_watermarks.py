@@ -0,0 +1,66 @@
+#  _          _                 _                          _
+# | |_ ___ __| |_  __ __ ____ _| |_ ___ _ _ _ __  __ _ _ _| |__ ___
+# |  _/ -_|_-<  _| \ V  V / _` |  _/ -_) '_| '  \/ _` | '_| / /(_-<
+#  \__\___/__/\__|  \_/\_/\__,_|\__\___|_| |_|_|_\__,_|_| |_\_\/__/
+#
+# SQLite watermark store : upserts, statuses and scheme diffs.
+
+import json
+from datetime import date
+
+import pytest
+
+from extractions.watermarks import ACTIVE, DORMANT, WatermarkStore, diff_scheme_codes
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = WatermarkStore(str(tmp_path / 'watermarks.sqlite'))
+    yield store
+    store.close()
+
+
+def test_upsert_inserts_and_updates(store):
+    assert store.upsert({'101': '01-01-2026', '102': '02-01-2026', '103': None}) == 2
+    store.upsert({'101': '05-01-2026'})
+    assert store.get_all() == {'101': '05-01-2026', '102': '02-01-2026'}
+    assert store.codes(ACTIVE) == {101, 102}
+
+
+def test_upsert_keeps_status_unless_given(store):
+    store.upsert({'101': '01-01-2026'}, status=DORMANT)
+    store.upsert({'101': '02-01-2026'})
+    assert store.codes(DORMANT) == {101}
+    assert store.get('101') == '02-01-2026'
+
+    store.upsert({'101': '03-01-2026'}, status=ACTIVE)
+    assert store.codes(ACTIVE) == {101}
+
+
+def test_apply_diff_parks_and_wakes_schemes(store):
+    store.upsert({'101': '01-01-2026', '102': '01-01-2026'})
+    store.upsert({'103': '01-01-2020'}, status=DORMANT)
+
+    diff = diff_scheme_codes([101, 103, 104], active=store.codes(ACTIVE), dormant=store.codes(DORMANT))
+    assert diff.added == {104}
+    assert diff.removed == {102}
+    assert diff.reactivated == {103}
+
+    store.apply_diff(diff)
+    assert store.codes(ACTIVE) == {101, 103}
+    assert store.codes(DORMANT) == {102}
+
+
+def test_dormant_schemes_are_not_scheduled(store):
+    store.upsert({'101': '30-12-2025', '102': '30-12-2025'})
+    store.set_status([102], DORMANT)
+    assert store.schemes_with_gap(30, today=date(2026, 1, 1)) == {'101': 2}
+
+
+def test_merge_json_only_adds_new_schemes(store, tmp_path):
+    path = tmp_path / 'run_time_config.json'
+    store.upsert({'101': '05-01-2026'})
+    path.write_text(json.dumps({'101': '01-01-2026', '102': '02-01-2026'}))
+
+    assert store.merge_json(str(path)) == 1
+    assert store.get_all() == {'101': '05-01-2026', '102': '02-01-2026'}
@@ -0,0 +1,81 @@
+#  _          _            _         _            _
+# | |_ ___ __| |_  __ __ _(_)_ _  __| |_____ __ _(_)_ _  __ _
+# |  _/ -_|_-<  _| \ V  V / | ' \/ _` / _ \ V  V / | ' \/ _` |
+#  \__\___/__/\__|  \_/\_/|_|_||_\__,_\___/\_/\_/|_|_||_\__, |
+#                                                       |___/
+#
+# Strided windows and prefix-sum features against a plain loop reference.
+
+import numpy as np
+import pytest
+
+from forecasting.windowing import make_dataset, make_windows, window_features
+
+
+def loop_windows(series, look_back, horizon):
+    X, y = [], []
+    for start in range(len(series) - look_back - horizon + 1):
+        X.append(series[start:start + look_back])
+        y.append(series[start + look_back:start + look_back + horizon])
+    return np.array(X), np.array(y)
+
+
+def loop_features(series, look_back, horizon, lags, rolling):
+    rows = []
+    for end in range(look_back - 1, len(series) - horizon):
+        row = [series[end - (lag - 1)] for lag in lags]
+        for span in rolling:
+            returns = series[end - span + 1:end + 1] / series[end - span:end] - 1.0
+            row.append(series[end - span + 1:end + 1].mean())
+            row.append(returns.std())
+            row.append(series[end] / series[end - span] - 1.0)
+        rows.append(row)
+    return np.array(rows)
+
+
+@pytest.fixture
+def navs():
+    return 100.0 * np.cumprod(1.0 + np.random.default_rng(7).normal(0.0005, 0.01, 250))
+
+
+@pytest.mark.parametrize('look_back, horizon', [(30, 1), (30, 7), (5, 3)])
+def test_make_windows_matches_loop(navs, look_back, horizon):
+    X, y = make_windows(navs, look_back, horizon)
+    expected_X, expected_y = loop_windows(navs, look_back, horizon)
+    np.testing.assert_array_equal(X, expected_X)
+    np.testing.assert_array_equal(y, expected_y)
+
+
+def test_make_windows_batch_and_views(navs):
+    batch = np.stack([navs, navs * 2])
+    X, y = make_windows(batch, 30, 7)
+    assert X.shape == (2, 250 - 30 - 7 + 1, 30)
+    np.testing.assert_array_equal(X[1], make_windows(navs * 2, 30, 7)[0])
+    assert np.shares_memory(X, batch) and not X.flags.writeable
+
+
+def test_make_windows_too_short():
+    with pytest.raises(ValueError):
+        make_windows(np.arange(5.0), 5, 1)
+
+
+def test_window_features_match_loop(navs):
+    lags, rolling = (1, 2, 5), (5, 20)
+    features, names = window_features(navs, 30, 7, lags, rolling)
+    np.testing.assert_allclose(features, loop_features(navs, 30, 7, lags, rolling), rtol=1e-9, atol=1e-12)
+    assert names == [
+        'lag_1', 'lag_2', 'lag_5',
+        'rolling_mean_5', 'volatility_5', 'return_5',
+        'rolling_mean_20', 'volatility_20', 'return_20',
+    ]
+
+
+def test_make_dataset_lines_up_windows_and_features(navs):
+    data = make_dataset(navs, 30, 7, lags=(1,), rolling=(5,))
+    assert data.X.shape[0] == data.y.shape[0] == data.features.shape[0]
+    np.testing.assert_array_equal(data.features[:, 0], data.X[:, -1])
+
+
+def test_window_features_spans_must_fit(navs):
+    with pytest.raises(ValueError):
+        window_features(navs, 10, 1, lags=(1,), rolling=(10,))
@@ -0,0 +1,238 @@
+#              _                          _
+# __ __ ____ _| |_ ___ _ _ _ __  __ _ _ _| |__ ___
+# \ V  V / _` |  _/ -_) '_| '  \/ _` | '_| / /(_-<
+#  \_/\_/\__,_|\__\___|_| |_|_|_\__,_|_| |_\_\/__/
+#
+# SQLite store for the per-scheme NAV watermarks behind run_time_config.json.
+
+import os
+import json
+import sqlite3
+from datetime import date, datetime
+from contextlib import contextmanager
+from typing import Dict, Iterable, NamedTuple, Optional, Set
+
+from logger import get_logger
+
+log = get_logger('WatermarkStore')
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS watermarks (
+        scheme_code TEXT PRIMARY KEY,
+        last_date   TEXT NOT NULL,
+        updated_at  TEXT NOT NULL,
+        status      TEXT NOT NULL DEFAULT 'active'
+    );
+    CREATE INDEX IF NOT EXISTS watermarks_last_date ON watermarks (last_date);
+"""
+
+MFAPI_FORMAT = '%d-%m-%Y'
+
+ACTIVE, DORMANT = 'active', 'dormant'
+
+
+class SchemeDiff(NamedTuple):
+    """
+        Upstream catalogue vs the store.
+
+        - added: listed upstream, never loaded
+        - removed: active in the store, gone upstream
+        - reactivated: dormant in the store, listed upstream again
+    """
+    added: Set[int]
+    removed: Set[int]
+    reactivated: Set[int]
+
+
+def diff_scheme_codes(upstream: Iterable[int], active: Set[int], dormant: Set[int]) -> SchemeDiff:
+    '''
+        One pass of set algebra over the hashed code sets.
+    '''
+    upstream = set(upstream)
+    return SchemeDiff(
+        added=upstream - active - dormant,
+        removed=active - upstream,
+        reactivated=upstream & dormant,
+    )
+
+
+def _to_iso(value: str) -> str:
+    '''
+        'DD-MM-YYYY' -> 'YYYY-MM-DD' so that dates sort and index as text.
+    '''
+    return datetime.strptime(value, MFAPI_FORMAT).date().isoformat()
+
+
+def _to_mfapi(value: str) -> str:
+    return date.fromisoformat(value).strftime(MFAPI_FORMAT)
+
+
+class WatermarkStore:
+    '''
+        Latest loaded NAV date per scheme code.
+
+        - upserts of a whole run happen in one transaction
+        - "schemes with gap <= threshold" is an indexed range query
+        - commits are atomic (WAL + synchronous FULL), a crash leaves the previous run intact
+        - import_json / export_json keep the run_time_config.json format as a shim,
+          merge_json folds schemes added to the file by hand into an existing store
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=FULL')
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(watermarks)')}
+        if 'status' not in columns:
+            self._conn.execute(f"ALTER TABLE watermarks ADD COLUMN status TEXT NOT NULL DEFAULT '{ACTIVE}'")
+
+    @contextmanager
+    def transaction(self):
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield self._conn
+        except Exception:
+            self._conn.execute('ROLLBACK')
+            raise
+        else:
+            self._conn.execute('COMMIT')
+
+    def __len__(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM watermarks').fetchone()[0]
+
+    def upsert(self, updates: Dict[str, str], status: str = None) -> int:
+        '''
+            Set the watermark ('DD-MM-YYYY') of every scheme in `updates`, all or nothing.
+            With `status` the schemes are also flagged, e.g. DORMANT for schemes loaded but no longer trading,
+            otherwise new schemes are active and existing ones keep their status.
+        '''
+        now = datetime.now().isoformat(timespec='seconds')
+        rows = [
+            (str(code), _to_iso(value), now, status or ACTIVE)
+            for code, value in updates.items()
+            if value
+        ]
+        on_conflict = 'last_date = excluded.last_date, updated_at = excluded.updated_at'
+        if status:
+            on_conflict += ', status = excluded.status'
+        with self.transaction() as conn:
+            conn.executemany(
+                'INSERT INTO watermarks (scheme_code, last_date, updated_at, status) VALUES (?, ?, ?, ?) '
+                f'ON CONFLICT (scheme_code) DO UPDATE SET {on_conflict}',
+                rows
+            )
+        return len(rows)
+
+    def codes(self, status: str = None) -> Set[int]:
+        '''
+            Scheme codes as ints, optionally only those with the given status.
+        '''
+        query = 'SELECT CAST(scheme_code AS INTEGER) FROM watermarks'
+        params = ()
+        if status:
+            query += ' WHERE status = ?'
+            params = (status,)
+        return {code for code, in self._conn.execute(query, params)}
+
+    def set_status(self, scheme_codes: Iterable, status: str) -> int:
+        '''
+            Flag schemes active / dormant in one transaction. Dormant schemes are not scheduled.
+        '''
+        now = datetime.now().isoformat(timespec='seconds')
+        rows = [(status, now, str(code)) for code in scheme_codes]
+        with self.transaction() as conn:
+            conn.executemany(
+                'UPDATE watermarks SET status = ?, updated_at = ? WHERE scheme_code = ?', rows
+            )
+        return len(rows)
+
+    def apply_diff(self, diff: SchemeDiff) -> None:
+        '''
+            Park removed schemes and wake re-listed ones, added schemes are inserted by `upsert` once loaded.
+        '''
+        if diff.removed:
+            self.set_status(diff.removed, DORMANT)
+        if diff.reactivated:
+            self.set_status(diff.reactivated, ACTIVE)
+
+    def get(self, scheme_code) -> Optional[str]:
+        row = self._conn.execute(
+            'SELECT last_date FROM watermarks WHERE scheme_code = ?', (str(scheme_code),)
+        ).fetchone()
+        return _to_mfapi(row[0]) if row else None
+
+    def get_all(self) -> Dict[str, str]:
+        '''
+            {scheme_code: 'DD-MM-YYYY'}, the same shape as run_time_config.json.
+        '''
+        return {
+            code: _to_mfapi(last_date)
+            for code, last_date in self._conn.execute('SELECT scheme_code, last_date FROM watermarks ORDER BY rowid')
+        }
+
+    def schemes_with_gap(self, threshold: int, today: date = None) -> Dict[str, int]:
+        '''
+            {scheme_code: days since watermark} for every active scheme at most `threshold` days behind.
+        '''
+        today = (today or date.today()).isoformat()
+        return {
+            code: int(gap)
+            for code, gap in self._conn.execute(
+                'SELECT scheme_code, julianday(?) - julianday(last_date) FROM watermarks '
+                'WHERE last_date >= date(?, ?) AND status = ? ORDER BY rowid',
+                (today, today, f'-{int(threshold)} days', ACTIVE)
+            )
+        }
+
+    def import_json(self, json_path: str) -> int:
+        '''
+            Load a run_time_config.json style file in one transaction.
+        '''
+        with open(json_path, 'r', encoding='utf-8') as f:
+            imported = self.upsert(json.load(f))
+        log.info(f'Imported {imported} watermarks from {json_path}')
+        return imported
+
+    def merge_json(self, json_path: str) -> int:
+        '''
+            Start-up sync with a run_time_config.json style file. The store is the source of truth :
+            schemes it already holds keep their watermark (a differing date in the file is only logged),
+            schemes found only in the file are inserted. Returns the number of schemes added.
+        '''
+        with open(json_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        stored = self.get_all()
+        added = {code: value for code, value in config.items() if str(code) not in stored}
+        differing = [
+            code for code, value in config.items()
+            if str(code) in stored and value and stored[str(code)] != value
+        ]
+        if differing:
+            log.warning(
+                f'{len(differing)} watermarks in {json_path} differ from {self.path}, keeping the store '
+                f'(e.g. {", ".join(map(str, differing[:5]))})'
+            )
+        merged = self.upsert(added) if added else 0
+        if merged:
+            log.info(f'Merged {merged} new watermarks from {json_path}')
+        return merged
+
+    def export_json(self, json_path: str, indent: int = 2) -> None:
+        '''
+            Write the watermarks back as run_time_config.json, atomically (temp file + rename).
+        '''
+        temp_path = f'{json_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.get_all(), f, indent=indent)
+            f.write('\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, json_path)
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,110 @@
+#         _         _            _
+# __ __ _(_)_ _  __| |_____ __ _(_)_ _  __ _
+# \ V  V / | ' \/ _` / _ \ V  V / | ' \/ _` |
+#  \_/\_/|_|_||_\__,_\___/\_/\_/|_|_||_\__, |
+#                                      |___/
+#
+# Sliding-window datasets for the NAV forecasters, built on zero-copy strided views.
+
+from typing import List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class WindowedDataset(NamedTuple):
+    '''
+        X : (..., windows, look_back) inputs, y : (..., windows, horizon) targets,
+        features : (..., windows, len(feature_names)) tabular features of each input window.
+    '''
+    X: np.ndarray
+    y: np.ndarray
+    features: np.ndarray
+    feature_names: List[str]
+
+
+def make_windows(series: np.ndarray, look_back: int, horizon: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+        Every (look_back inputs, next horizon targets) pair along the last axis.
+
+        `series` is one fund (time,) or a stacked batch (funds, time) of equal length.
+        Both outputs are read-only views into `series`, nothing is copied.
+    '''
+    series = np.asarray(series)
+    if series.shape[-1] < look_back + horizon:
+        raise ValueError(f'Need at least {look_back + horizon} observations, got {series.shape[-1]}')
+
+    X = sliding_window_view(series[..., :series.shape[-1] - horizon], look_back, axis=-1)
+    y = sliding_window_view(series[..., look_back:], horizon, axis=-1)
+    return X, y
+
+
+def _trailing_sums(values: np.ndarray, span: int) -> np.ndarray:
+    '''
+        Sum of every `span` consecutive values along the last axis, from one cumulative sum.
+    '''
+    cumulative = np.cumsum(values, axis=-1)
+    padded = np.concatenate([np.zeros(values.shape[:-1] + (1,)), cumulative], axis=-1)
+    return padded[..., span:] - padded[..., :-span]
+
+
+def window_features(
+    series: np.ndarray,
+    look_back: int,
+    horizon: int = 1,
+    lags: Sequence[int] = (1, 2, 5),
+    rolling: Sequence[int] = (5, 20)
+) -> Tuple[np.ndarray, List[str]]:
+    '''
+        Per input window of `make_windows(series, look_back, horizon)` : lagged values, and over
+        each trailing `rolling` span the mean, the volatility (std of daily returns) and the
+        total return. Computed from prefix sums over the series, O(time) per feature whatever the span.
+    '''
+    series = np.asarray(series, dtype='float64')
+    if max([*lags, *(span + 1 for span in rolling)], default=0) > look_back:
+        raise ValueError(f'Lags and rolling spans must fit in the look back of {look_back}')
+
+    windows = series.shape[-1] - look_back - horizon + 1
+    ends = slice(look_back - 1, look_back - 1 + windows)  # index of the newest value of every window
+
+    def at_end(values: np.ndarray, offset: int = 0) -> np.ndarray:
+        # values[..., k] aligned so that k = window end - offset
+        return values[..., ends.start - offset:ends.stop - offset]
+
+    columns, names = [], []
+    for lag in lags:
+        columns.append(at_end(series, lag - 1))
+        names.append(f'lag_{lag}')
+
+    daily_returns = series[..., 1:] / series[..., :-1] - 1.0  # daily_returns[..., j - 1] is the return into day j
+    for span in rolling:
+        mean = _trailing_sums(series, span)[..., ends.start - span + 1:ends.stop - span + 1] / span
+        returns_mean = _trailing_sums(daily_returns, span)[..., ends.start - span:ends.stop - span] / span
+        returns_square = _trailing_sums(daily_returns ** 2, span)[..., ends.start - span:ends.stop - span] / span
+        columns.append(mean)
+        columns.append(np.sqrt(np.clip(returns_square - returns_mean ** 2, 0.0, None)))
+        columns.append(at_end(series) / at_end(series, span) - 1.0)
+        names.extend([f'rolling_mean_{span}', f'volatility_{span}', f'return_{span}'])
+
+    if not columns:
+        return np.empty(series.shape[:-1] + (windows, 0)), names
+    return np.stack(columns, axis=-1), names
+
+
+def make_dataset(
+    series: np.ndarray,
+    look_back: int,
+    horizon: int = 1,
+    lags: Sequence[int] = (),
+    rolling: Sequence[int] = ()
+) -> WindowedDataset:
+    '''
+        Windows, targets and (optionally) tabular features for one fund or a stacked batch.
+
+            data = make_dataset(navs, look_back=30, horizon=7, lags=(1, 5), rolling=(5, 20))
+            data.X.reshape(-1, 30)    # LSTM inputs of every fund in one array
+    '''
+    series = np.asarray(series, dtype='float64')
+    X, y = make_windows(series, look_back, horizon)
+    features, names = window_features(series, look_back, horizon, lags, rolling)
+    return WindowedDataset(X=X, y=y, features=features, feature_names=names)